@@ -8,7 +8,36 @@ from app.utils.env import env
 class Settings(BaseSettings):
     """Initialize Settings."""
 
+    ENVIRONMENT: str = env.environment
+    LOG_LEVEL: str = env.log_level
+    LOG_FORMAT: str = env.log_format
+    LOG_FILE: str = env.log_file
+    LOG_QUEUE_SIZE: int = env.log_queue_size
+    LOG_RATE_LIMIT: int = env.log_rate_limit
+
+    SERVER_HOST: str = env.server_host
+    SERVER_PORT: int = env.server_port
+    SERVER_WORKERS: int = env.server_workers
+    SERVER_RELOAD: bool = env.server_reload
+    SERVER_GRACEFUL_TIMEOUT: int = env.server_graceful_timeout
+
+    METRICS_ENABLED: bool = env.metrics_enabled
+    METRICS_MULTIPROC_DIR: str = env.metrics_multiproc_dir
+    METRICS_SAMPLE_INTERVAL: int = env.metrics_sample_interval
+
+    PROFILING_ENABLED: bool = env.profiling_enabled
+    PROFILING_INTERVAL: int = env.profiling_interval
+    SLOW_QUERY_THRESHOLD: int = env.slow_query_threshold
+    SLOW_QUERY_LOG_FILE: str = env.slow_query_log_file
+
     DATABASE_URL: str = env.database_url
+    DB_POOL_SIZE: int = env.db_pool_size
+    DB_MAX_OVERFLOW: int = env.db_max_overflow
+    DB_POOL_TIMEOUT: int = env.db_pool_timeout
+    DB_POOL_RECYCLE: int = env.db_pool_recycle
+    DB_POOL_PRE_PING: bool = env.db_pool_pre_ping
+    DB_ECHO: bool = env.db_echo
+
     INFLUXDB_BUCKET: str = env.influxdb_bucket
     INFLUXDB_URL: str = env.influxdb_url
     INFLUXDB_TOKEN: str = env.influxdb_token
@@ -17,11 +46,69 @@ class Settings(BaseSettings):
     INFLUXDB_FLUSH_INTERVAL: int = env.influxdb_flush_interval
     INFLUXDB_JITTER_INTERVAL: int = env.influxdb_jitter_interval
     INFLUXDB_RETRY_INTERVAL: int = env.influxdb_retry_interval
+    INFLUXDB_QUERY_POOL_SIZE: int = env.influxdb_query_pool_size
+    INFLUXDB_QUERY_TIMEOUT: int = env.influxdb_query_timeout
+
+    INGEST_QUEUE_SIZE: int = env.ingest_queue_size
+    INGEST_BATCH_SIZE: int = env.ingest_batch_size
+    INGEST_FLUSH_INTERVAL: int = env.ingest_flush_interval
+    INGEST_HIGH_WATERMARK: int = env.ingest_high_watermark
+    INGEST_ENQUEUE_TIMEOUT: int = env.ingest_enqueue_timeout
+    INGEST_STREAM_CHUNK_SIZE: int = env.ingest_stream_chunk_size
+    INGEST_MAX_PAYLOAD_SIZE: int = env.ingest_max_payload_size
+    INGEST_SPILL_ENABLED: bool = env.ingest_spill_enabled
+    INGEST_SPILL_DIR: str = env.ingest_spill_dir
+    INGEST_SPILL_SEGMENT_SIZE: int = env.ingest_spill_segment_size
+    INGEST_SPILL_MAX_BYTES: int = env.ingest_spill_max_bytes
+    INGEST_SPILL_SYNC_INTERVAL: int = env.ingest_spill_sync_interval
+    INGEST_DEDUP_WINDOW: int = env.ingest_dedup_window
+    INGEST_LATE_POLICY: str = env.ingest_late_policy
+    INGEST_LATE_TOLERANCE: int = env.ingest_late_tolerance
+
+    MACHINE_CACHE_TTL: int = env.machine_cache_ttl
+    MACHINE_CACHE_NEGATIVE_TTL: int = env.machine_cache_negative_ttl
+
+    QUERY_CACHE_BUCKET: int = env.query_cache_bucket
+    QUERY_CACHE_TTL: int = env.query_cache_ttl
+    QUERY_CACHE_LIVE_TTL: int = env.query_cache_live_ttl
+    QUERY_CACHE_SETTLE: int = env.query_cache_settle
+    QUERY_CACHE_INVALIDATE_DELAY: int = env.query_cache_invalidate_delay
+    QUERY_CACHE_LOCK_TIMEOUT: int = env.query_cache_lock_timeout
+    FLEET_MAX_MACHINES: int = env.fleet_max_machines
+
+    LIVE_STATE_FLUSH_INTERVAL: int = env.live_state_flush_interval
+    LIVE_PUSH_INTERVAL: int = env.live_push_interval
+    LIVE_PUSH_MIN_INTERVAL: int = env.live_push_min_interval
+    LIVE_PUSH_MAX_SUBSCRIBERS: int = env.live_push_max_subscribers
+    LIVE_PUSH_KEEPALIVE: int = env.live_push_keepalive
+
+    RULES_ALERT_TOPIC: str = env.rules_alert_topic
+    RULES_REFRESH_INTERVAL: int = env.rules_refresh_interval
+
+    ROLLUP_ENABLED: bool = env.rollup_enabled
+    ROLLUP_INTERVAL: int = env.rollup_interval
+    ROLLUP_LAG: int = env.rollup_lag
+    ROLLUP_BACKFILL: int = env.rollup_backfill
+    ROLLUP_MAX_SPAN: int = env.rollup_max_span
+
+    MQTT_HOST: str = env.mqtt_host
+    MQTT_PORT: int = env.mqtt_port
+    MQTT_USERNAME: str = env.mqtt_username
+    MQTT_PASSWORD: str = env.mqtt_password
+    MQTT_CLIENT_ID: str = env.mqtt_client_id
+    MQTT_QOS: int = env.mqtt_qos
+    MQTT_SHARED_GROUP: str = env.mqtt_shared_group
+    MQTT_MAX_INFLIGHT: int = env.mqtt_max_inflight
 
     REDIS_HOST: str = env.redis_host
     REDIS_PORT: int = env.redis_port
     REDIS_DB: int = env.redis_db
     REDIS_EXPIRE: int = env.redis_expire
+    REDIS_MAX_CONNECTIONS: int = env.redis_max_connections
+    REDIS_CODEC: str = env.redis_codec
+    REDIS_COMPRESSION: str = env.redis_compression
+    REDIS_COMPRESS_THRESHOLD: int = env.redis_compress_threshold
+    REDIS_COMPRESSION_LEVEL: int = env.redis_compression_level
 
 
 settings = Settings()
@@ -0,0 +1,106 @@
+"""Pooled InfluxDB query executor."""
+
+import asyncio
+import queue
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import pyarrow as pa
+from pyarrow.flight import FlightTimedOutError
+
+from app.core.setting import settings
+from app.db.influx_db import create_query_client
+from app.db.slow_query import log_slow_query
+from app.lib.metrics import INFLUX_QUERY_ERRORS, INFLUX_QUERY_LATENCY
+from app.utils.logging import DevLogger
+
+logger = DevLogger("influx_query", to_file=True).get()
+
+
+class QueryTimeoutError(TimeoutError):
+    """An InfluxDB query ran past its timeout."""
+
+
+class InfluxQueryExecutor:
+    """Run SQL queries against InfluxDB off the event loop.
+
+    Queries run on a dedicated thread pool, never the default executor that
+    ingest writes use, and each running query holds one of ``pool_size``
+    Flight connections. Extra queries wait for a free connection, so slow
+    historical queries cannot pile up and starve the rest of the worker.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = settings.INFLUXDB_QUERY_POOL_SIZE,
+        timeout: int = settings.INFLUXDB_QUERY_TIMEOUT,
+        client_factory: Callable[[], Any] = create_query_client,
+    ):
+        """Initialize executor settings."""
+        self._pool_size = pool_size
+        self._timeout = timeout / 1000
+        self._client_factory = client_factory
+        self._clients: queue.SimpleQueue = queue.SimpleQueue()
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def start(self) -> None:
+        """Create the query thread pool."""
+        self._ensure_executor()
+
+    def _ensure_executor(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._pool_size, thread_name_prefix="influx-query")
+            logger.info(f"Influx query executor started (pool={self._pool_size})")
+
+    async def stop(self) -> None:
+        """Wait for running queries and close every pooled connection."""
+        if self._executor is None:
+            return
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+        while not self._clients.empty():
+            try:
+                self._clients.get_nowait().close()
+            except Exception as e:
+                logger.warning(f"Failed to close InfluxDB query client: {e}")
+        logger.info("Influx query executor stopped.")
+
+    async def query(self, sql: str, parameters: dict[str, Any] | None = None) -> pa.Table:
+        """Run a SQL query with bound ``$name`` parameters and return the result table."""
+        self._ensure_executor()
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            table = await loop.run_in_executor(self._executor, self._run, sql, parameters)
+        except QueryTimeoutError:
+            INFLUX_QUERY_ERRORS.labels("timeout").inc()
+            raise
+        except Exception:
+            INFLUX_QUERY_ERRORS.labels("error").inc()
+            raise
+        # includes the wait for a free connection, which is what callers see
+        duration = time.perf_counter() - start
+        INFLUX_QUERY_LATENCY.observe(duration)
+        log_slow_query("influx", sql, parameters, duration, table.num_rows)
+        return table
+
+    def _run(self, sql: str, parameters: dict[str, Any] | None) -> pa.Table:
+        # one worker thread per connection, so a client is never shared between running queries
+        try:
+            client = self._clients.get_nowait()
+        except queue.Empty:
+            client = self._client_factory()
+
+        try:
+            return client.query(sql, query_parameters=parameters or {}, timeout=self._timeout)
+        except Exception as e:
+            if isinstance(e, FlightTimedOutError) or isinstance(e.__context__, FlightTimedOutError):
+                raise QueryTimeoutError(f"InfluxDB query timed out after {self._timeout}s") from e
+            raise
+        finally:
+            self._clients.put(client)
+
+
+influx_query = InfluxQueryExecutor()
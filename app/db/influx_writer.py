@@ -0,0 +1,289 @@
+"""Batched InfluxDB writer."""
+
+import asyncio
+import contextlib
+import time
+from collections.abc import Callable
+from typing import Any
+
+from influxdb_client_3.exceptions import InfluxDBError
+
+from app.core.setting import settings
+from app.db.influx_db import create_write_client
+from app.db.spill_log import SpillLog, SpillStats
+from app.lib.metrics import (
+    INFLUX_WRITE_ERRORS,
+    INFLUX_WRITE_LATENCY,
+    INFLUX_WRITE_POINTS,
+    SPILL_BATCHES,
+    SPILL_PENDING,
+    WRITER_PENDING,
+)
+from app.modules.ingest.schema.ingest_schema import WriteStatus
+from app.utils.logging import DevLogger
+
+logger = DevLogger("influx_writer", to_file=True).get()
+
+RETRYABLE_STATUS = {408, 429}
+
+
+def retryable(error: Exception) -> bool:
+    """Whether writing the same points again may succeed.
+
+    InfluxDB answers malformed points with a 4xx status; those are dropped
+    rather than spilled, since no number of retries will write them.
+    """
+    if isinstance(error, InfluxDBError) and error.response is not None:
+        status = error.response.status
+        return not (400 <= status < 500) or status in RETRYABLE_STATUS
+    return True
+
+
+class InfluxWriter:
+    """Buffer line-protocol points on a bounded queue and flush them in batches.
+
+    A batch is flushed when it reaches ``batch_size`` points or when
+    ``flush_interval`` milliseconds have passed since its first point,
+    whichever comes first. Writes run in a worker thread so the event loop
+    never waits on InfluxDB.
+
+    With a ``spill`` log, batches that fail to write and points that do not
+    fit the queue go to disk instead of being dropped or rejected. While the
+    log holds anything, new batches are appended behind it so points reach
+    InfluxDB in the order they were flushed; a replay task writes the log
+    back oldest first, retrying every ``retry_interval`` milliseconds.
+    Spilling only buffers a batch in memory; the replay task does every
+    write, fsync and read of the log in a worker thread.
+    """
+
+    def __init__(
+        self,
+        max_size: int = settings.INGEST_QUEUE_SIZE,
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        flush_interval: int = settings.INGEST_FLUSH_INTERVAL,
+        high_watermark: int = settings.INGEST_HIGH_WATERMARK,
+        spill: SpillLog | None = None,
+        sync_interval: int = settings.INGEST_SPILL_SYNC_INTERVAL,
+        retry_interval: int = settings.INFLUXDB_RETRY_INTERVAL,
+        client_factory: Callable[[], Any] = create_write_client,
+    ):
+        """Initialize writer settings."""
+        self._max_size = max_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval / 1000
+        self._high_watermark = max_size * high_watermark // 100
+        self._queue: asyncio.Queue[str] | None = None
+        self._space: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._spill = spill
+        self._sync_interval = sync_interval / 1000
+        self._retry_interval = retry_interval / 1000
+        self._replay_task: asyncio.Task | None = None
+        self._client_factory = client_factory
+        self._client = None
+
+    @property
+    def pending(self) -> int:
+        """Number of points waiting to be flushed."""
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def spill_stats(self) -> SpillStats | None:
+        """Counters of the spill log, if one is configured."""
+        return self._spill.stats if self._spill else None
+
+    async def start(self) -> None:
+        """Create the write client and start the background flush task."""
+        if self._task is None:
+            self._client = self._client_factory()
+            self._queue = asyncio.Queue(maxsize=self._max_size)
+            self._space = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="influx-writer")
+            if self._spill is not None:
+                await asyncio.to_thread(self._spill.open)
+                self._replay_task = asyncio.create_task(self._replay(), name="influx-spill-replay")
+            logger.info(f"Influx writer started (batch={self._batch_size}, queue={self._max_size})")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out whatever is still buffered."""
+        if self._task is None:
+            return
+
+        for task in (self._task, self._replay_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._task = self._replay_task = None
+
+        while not self._queue.empty():
+            await self._flush(self._drain(self._batch_size))
+        if self._spill is not None:
+            # whatever is left is replayed by the next process to claim the slot
+            await asyncio.to_thread(self._spill.close)
+        try:
+            self._client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close InfluxDB write client: {e}")
+        self._client = None
+        logger.info("Influx writer stopped.")
+
+    def _fits(self, count: int) -> bool:
+        return self._queue is not None and self._max_size - self._queue.qsize() >= count
+
+    def submit(self, lines: list[str]) -> WriteStatus:
+        """Enqueue points without waiting.
+
+        The whole list is accepted or rejected as one unit, so a caller
+        never ends up with a partially written batch. When the queue is full
+        the points are spilled to disk if possible and reported as queued.
+        """
+        if not self._fits(len(lines)):
+            return WriteStatus.queued if self._spill_batch(lines) else WriteStatus.rejected
+
+        for line in lines:
+            self._queue.put_nowait(line)
+        return WriteStatus.queued if self._queue.qsize() > self._high_watermark else WriteStatus.accepted
+
+    async def enqueue(self, lines: list[str], timeout: int = settings.INGEST_ENQUEUE_TIMEOUT) -> WriteStatus:
+        """Enqueue points, waiting up to ``timeout`` milliseconds for buffer space.
+
+        Points that only fit after waiting are reported as ``queued`` so the
+        caller knows it is being throttled.
+        """
+        if self._fits(len(lines)):
+            return self.submit(lines)
+        if self._spill_batch(lines):
+            return WriteStatus.queued
+        if self._queue is None or len(lines) > self._max_size:
+            return WriteStatus.rejected
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout / 1000
+        while not self._fits(len(lines)):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return WriteStatus.rejected
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except TimeoutError:
+                return WriteStatus.rejected
+
+        self.submit(lines)
+        return WriteStatus.queued
+
+    async def write(self, lines: list[str]) -> None:
+        """Write points right away in batches, bypassing the queue and the spill log.
+
+        Raises when InfluxDB does not accept a batch, for callers that must
+        only record progress once their points have landed.
+        """
+        for offset in range(0, len(lines), self._batch_size):
+            await self._write(lines[offset:offset + self._batch_size])
+
+    def _drain(self, limit: int) -> list[str]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: list[str] = []
+        ready: list[str] = []
+        try:
+            while True:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self._flush_interval
+
+                while len(batch) < self._batch_size:
+                    batch.extend(self._drain(self._batch_size - len(batch)))
+                    if len(batch) >= self._batch_size:
+                        break
+
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+
+                self._space.set()
+                WRITER_PENDING.set(self._queue.qsize())
+                ready, batch = batch, []
+                await self._flush(ready)
+                ready = []
+        except asyncio.CancelledError:
+            # points already taken off the queue would otherwise be lost on shutdown,
+            # including a batch whose write was cut short; if that write still lands,
+            # replaying it only overwrites the same points
+            unsent = ready + batch
+            if unsent and not self._spill_batch(unsent):
+                await self._flush(unsent)
+            raise
+
+    async def _write(self, batch: list[str]) -> None:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._client.write, database=settings.INFLUXDB_BUCKET, record=batch)
+        except Exception as e:
+            INFLUX_WRITE_ERRORS.labels(str(retryable(e)).lower()).inc()
+            raise
+        INFLUX_WRITE_LATENCY.observe(time.perf_counter() - start)
+        INFLUX_WRITE_POINTS.observe(len(batch))
+
+    def _spill_batch(self, batch: list[str]) -> bool:
+        if self._spill is None or self._queue is None:
+            return False
+        if self._spill.empty:
+            logger.warning("Spilling InfluxDB writes to disk")
+        if not self._spill.append(batch):
+            SPILL_BATCHES.labels("dropped").inc()
+            logger.error(f"Spill log full, dropping {len(batch)} points")
+            return False
+        SPILL_BATCHES.labels("spilled").inc()
+        SPILL_PENDING.set(self._spill.stats.pending_bytes)
+        return True
+
+    async def _flush(self, batch: list[str]) -> None:
+        if not batch:
+            return
+        if self._spill is not None and not self._spill.empty:
+            # queue behind the spilled batches so points are written in order
+            self._spill_batch(batch)
+            return
+        try:
+            await self._write(batch)
+        except Exception as e:
+            if not retryable(e) or not self._spill_batch(batch):
+                logger.error(f"Failed to write {len(batch)} points to InfluxDB: {e}")
+
+    async def _replay(self) -> None:
+        while True:
+            await asyncio.to_thread(self._spill.sync)
+            record = None if self._spill.empty else await asyncio.to_thread(self._spill.peek)
+            if record is None:
+                await asyncio.sleep(self._sync_interval)
+                continue
+
+            lines, cursor = record
+            try:
+                await self._write(lines)
+            except Exception as e:
+                if retryable(e):
+                    logger.warning(f"Spill replay failed, retrying in {self._retry_interval}s: {e}")
+                    await asyncio.sleep(self._retry_interval)
+                    continue
+                logger.error(f"Dropping {len(lines)} spilled points InfluxDB refuses: {e}")
+                SPILL_BATCHES.labels("dropped").inc()
+            else:
+                SPILL_BATCHES.labels("replayed").inc()
+            await asyncio.to_thread(self._spill.commit, cursor)
+            SPILL_PENDING.set(self._spill.stats.pending_bytes)
+            if self._spill.empty:
+                logger.info(f"Spill log replayed ({self._spill.stats.replayed_batches} batches so far)")
+
+
+influx_writer = InfluxWriter(spill=SpillLog() if settings.INGEST_SPILL_ENABLED else None)
@@ -1,16 +1,21 @@
 """Initialize database."""
 
+import asyncio
+
 from sqlmodel import SQLModel
 
 from app.db.session import engine
 from app.modules.machine.model.machine_model import Machine  # noqa: F401
+from app.modules.machine.model.rule_model import MachineRule  # noqa: F401
 
 
-def init_db():
+async def init_db():
     """Initialize database."""
-    SQLModel.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    await engine.dispose()
     print("Database tables created successfully!")
 
 
 if __name__ == "__main__":
-    init_db()
+    asyncio.run(init_db())
@@ -0,0 +1,55 @@
+"""Slow query log.
+
+InfluxDB and Postgres queries that take longer than ``SLOW_QUERY_THRESHOLD``
+milliseconds are written with their SQL, parameters, duration and row
+count to ``SLOW_QUERY_LOG_FILE``.
+"""
+
+import time
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.setting import settings
+from app.utils.logging import DevLogger
+
+logger = DevLogger("slow_query", to_file=True, log_path=settings.SLOW_QUERY_LOG_FILE).get()
+
+
+def log_slow_query(
+    source: str,
+    statement: str,
+    parameters: Any,
+    duration: float,
+    rows: int,
+    threshold: int = settings.SLOW_QUERY_THRESHOLD,
+) -> bool:
+    """Log a query that took at least ``threshold`` milliseconds; return whether it was logged."""
+    if not threshold or duration * 1000 < threshold:
+        return False
+    # generated SQL spans several lines, the log keeps one line per query
+    logger.warning(
+        "Slow %s query: %.0f ms, %s rows: %s %s",
+        source, duration * 1000, rows, " ".join(statement.split()), parameters,
+    )
+    return True
+
+
+# the start time lives on the execution context, which is discarded with a
+# failed statement, so nothing is left behind when after_cursor_execute never runs
+def _before_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany) -> None:
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(_conn, cursor, statement, parameters, context, _executemany) -> None:
+    duration = time.perf_counter() - context._query_start
+    log_slow_query("postgres", statement, parameters, duration, cursor.rowcount)
+
+
+def watch_engine(engine: AsyncEngine) -> None:
+    """Time every statement an engine executes."""
+    target = engine.sync_engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,245 @@
+"""Disk spill log for the InfluxDB writer.
+
+Batches the writer cannot hand to InfluxDB are appended to segment files
+and replayed oldest first once it recovers. Each record is a header of
+payload length and CRC32 followed by the newline-joined lines; a torn
+record at the tail of the last segment (a crash mid-write) is cut off on
+``open``. ``append`` only buffers the record in memory, so callers on the
+event loop never touch the disk; ``sync`` writes the buffered records out
+and fsyncs them in one go. The writer runs ``sync``, ``peek`` and
+``commit`` in a worker thread; they serialize on an I/O lock.
+
+Each process claims its own ``slot-N`` directory with an exclusive
+``flock``, so several workers can share one volume and a restarted worker
+adopts whatever an earlier one left behind. The replay position is kept in
+a cursor file that is not fsynced: after a crash a few batches may be
+written twice, which InfluxDB treats as overwrites of the same points.
+"""
+
+import fcntl
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.setting import settings
+from app.utils.logging import DevLogger
+
+logger = DevLogger("spill_log", to_file=True).get()
+
+HEADER = struct.Struct("<II")  # payload length, crc32
+SUFFIX = ".log"
+CURSOR = "cursor"
+MAX_SLOTS = 64
+
+
+@dataclass
+class SpillStats:
+    """Counters of a spill log."""
+
+    segments: int = 0
+    pending_bytes: int = 0
+    spilled_batches: int = 0
+    replayed_batches: int = 0
+    dropped_batches: int = 0
+
+
+class SpillLog:
+    """Append-only segment log of line-protocol batches."""
+
+    def __init__(
+        self,
+        directory: str = settings.INGEST_SPILL_DIR,
+        segment_size: int = settings.INGEST_SPILL_SEGMENT_SIZE,
+        max_bytes: int = settings.INGEST_SPILL_MAX_BYTES,
+    ):
+        """Initialize log settings; nothing touches the disk before ``open``."""
+        self._root = Path(directory)
+        self._segment_size = segment_size
+        self._max_bytes = max_bytes
+        self._dir: Path | None = None
+        self._lock: int | None = None
+        self._segments: list[int] = []
+        self._writer = None
+        self._dirty = False
+        self._cursor = (0, 0)
+        self._buffer: deque[bytes] = deque()
+        self._buffered = 0
+        # guards the buffer and pending_bytes, which appends change from the event loop
+        self._mutex = threading.Lock()
+        self._io_lock = threading.Lock()
+        self.stats = SpillStats()
+
+    @property
+    def empty(self) -> bool:
+        """Whether nothing is waiting to be replayed."""
+        return self.stats.pending_bytes == 0
+
+    def open(self) -> None:
+        """Claim a slot directory and recover the segments left in it."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        for slot in range(MAX_SLOTS):
+            directory = self._root / f"slot-{slot}"
+            directory.mkdir(exist_ok=True)
+            fd = os.open(directory / "LOCK", os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            self._dir, self._lock = directory, fd
+            break
+        else:
+            raise RuntimeError(f"No free spill slot under {self._root}")
+
+        self._segments = sorted(int(path.stem) for path in self._dir.glob(f"*{SUFFIX}"))
+        if self._segments:
+            self._truncate_torn_tail(self._path(self._segments[-1]))
+        self._cursor = self._read_cursor()
+        self._measure()
+        if not self.empty:
+            logger.warning(f"Spill log {self._dir} holds {self.stats.pending_bytes} bytes to replay")
+
+    def close(self) -> None:
+        """Sync outstanding appends and release the slot."""
+        with self._io_lock:
+            self._write_buffered()
+            self._fsync()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self._lock is not None:
+                fcntl.flock(self._lock, fcntl.LOCK_UN)
+                os.close(self._lock)
+                self._lock = None
+
+    def _path(self, segment: int) -> Path:
+        return self._dir / f"{segment:020d}{SUFFIX}"
+
+    def _truncate_torn_tail(self, path: Path) -> None:
+        valid = 0
+        with path.open("rb") as f:
+            while len(header := f.read(HEADER.size)) == HEADER.size:
+                length, crc = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                valid = f.tell()
+        if valid < path.stat().st_size:
+            logger.warning(f"Truncating torn spill record in {path} at byte {valid}")
+            os.truncate(path, valid)
+
+    def _read_cursor(self) -> tuple[int, int]:
+        try:
+            segment, offset = (self._dir / CURSOR).read_text().split()
+            cursor = (int(segment), int(offset))
+        except (FileNotFoundError, ValueError):
+            cursor = (0, 0)
+        # a cursor older than the first segment would skip nothing; start there
+        first = self._segments[0] if self._segments else 0
+        return cursor if cursor[0] >= first else (first, 0)
+
+    def _measure(self) -> None:
+        segment, offset = self._cursor
+        sizes = {s: self._path(s).stat().st_size for s in self._segments if s >= segment}
+        self.stats.segments = len(self._segments)
+        with self._mutex:
+            self.stats.pending_bytes = sum(sizes.values()) - (offset if segment in sizes else 0) + self._buffered
+
+    def append(self, lines: list[str]) -> bool:
+        """Buffer a batch for the next ``sync``; False, counted as dropped, when the log is full."""
+        payload = "\n".join(lines).encode()
+        record = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._mutex:
+            if self.stats.pending_bytes + len(record) > self._max_bytes:
+                self.stats.dropped_batches += 1
+                return False
+            self._buffer.append(record)
+            self._buffered += len(record)
+            self.stats.pending_bytes += len(record)
+            self.stats.spilled_batches += 1
+        return True
+
+    def _write_buffered(self) -> None:
+        while True:
+            with self._mutex:
+                if not self._buffer:
+                    return
+                record = self._buffer.popleft()
+                self._buffered -= len(record)
+            if self._writer is None or self._writer.tell() + len(record) > self._segment_size:
+                self._roll()
+            self._writer.write(record)
+            self._writer.flush()
+            self._dirty = True
+
+    def _roll(self) -> None:
+        if self._writer is not None:
+            self._fsync()
+            self._writer.close()
+        segment = self._segments[-1] + 1 if self._segments else 1
+        self._segments.append(segment)
+        self._writer = self._path(segment).open("ab")
+        self.stats.segments = len(self._segments)
+
+    def _fsync(self) -> None:
+        if self._dirty and self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._dirty = False
+
+    def sync(self) -> None:
+        """Write out the buffered appends and fsync them."""
+        with self._io_lock:
+            self._write_buffered()
+            self._fsync()
+
+    def peek(self) -> tuple[list[str], tuple[int, int]] | None:
+        """Return the oldest batch and the cursor past it, without consuming it."""
+        with self._io_lock:
+            # buffered appends are the newest, but may be all that is left
+            self._write_buffered()
+            return self._peek()
+
+    def _peek(self) -> tuple[list[str], tuple[int, int]] | None:
+        segment, offset = self._cursor
+        for current in self._segments:
+            if current < segment:
+                continue
+            start = offset if current == segment else 0
+            with self._path(current).open("rb") as f:
+                f.seek(start)
+                header = f.read(HEADER.size)
+                if len(header) == HEADER.size:
+                    length, _ = HEADER.unpack(header)
+                    return f.read(length).decode().split("\n"), (current, start + HEADER.size + length)
+        return None
+
+    def commit(self, cursor: tuple[int, int]) -> None:
+        """Mark everything before ``cursor`` as replayed and remove finished segments."""
+        with self._io_lock:
+            self._commit(cursor)
+
+    def _commit(self, cursor: tuple[int, int]) -> None:
+        self._cursor = cursor
+        self.stats.replayed_batches += 1
+        self._measure()
+
+        if self.empty:
+            # forget the cursor first: a crash halfway replays duplicates rather than skipping data
+            (self._dir / CURSOR).unlink(missing_ok=True)
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                self._dirty = False
+            finished, self._segments, self._cursor = self._segments, [], (0, 0)
+        else:
+            (self._dir / CURSOR).write_text(f"{cursor[0]} {cursor[1]}")
+            finished = [s for s in self._segments if s < cursor[0]]
+            self._segments = [s for s in self._segments if s >= cursor[0]]
+
+        for segment in finished:
+            self._path(segment).unlink(missing_ok=True)
+        self.stats.segments = len(self._segments)
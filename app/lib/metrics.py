@@ -0,0 +1,176 @@
+"""Prometheus metrics.
+
+Metrics are module-level ``prometheus_client`` objects updated inline on
+the hot paths. Under ``app.server`` every worker writes them to
+memory-mapped files in ``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics``
+aggregates all workers, so a scrape sees the whole process group no matter
+which worker answers it. Without that variable (a single uvicorn process,
+the tests) the default in-process registry is served.
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.setting import settings
+from app.db.session import engine
+from app.utils.logging import DevLogger
+
+logger = DevLogger("metrics").get()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BATCH_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+INGEST_POINTS = Counter("ingest_points_total", "Points handed to the InfluxDB writer.", ["source"])
+INGEST_SKIPPED = Counter("ingest_skipped_points_total", "Duplicate or late points not written.", ["source"])
+INGEST_REJECTED = Counter("ingest_rejected_points_total", "Points rejected because the writer was full.", ["source"])
+INGEST_BATCH = Histogram("ingest_batch_points", "Points per ingested request or message.", ["source"],
+                         buckets=BATCH_BUCKETS)
+INFLUX_WRITE_LATENCY = Histogram("influx_write_duration_seconds", "InfluxDB batch write latency.",
+                                 buckets=LATENCY_BUCKETS)
+INFLUX_WRITE_ERRORS = Counter("influx_write_errors_total", "Failed InfluxDB batch writes.", ["retryable"])
+INFLUX_WRITE_POINTS = Histogram("influx_write_batch_points", "Points per InfluxDB write.", buckets=BATCH_BUCKETS)
+INFLUX_QUERY_LATENCY = Histogram("influx_query_duration_seconds", "InfluxDB query latency.", buckets=LATENCY_BUCKETS)
+INFLUX_QUERY_ERRORS = Counter("influx_query_errors_total", "Failed InfluxDB queries.", ["reason"])
+WRITER_PENDING = Gauge("influx_writer_pending_points", "Points waiting in the writer queue.",
+                       multiprocess_mode="livesum")
+SPILL_BATCHES = Counter("influx_spill_batches_total", "Batches spilled to, replayed from or dropped by the spill log.",
+                        ["event"])
+SPILL_PENDING = Gauge("influx_spill_pending_bytes", "Bytes in the spill log waiting to be replayed.",
+                      multiprocess_mode="livesum")
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"])
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out_connections", "Postgres connections in use.",
+                            multiprocess_mode="livesum")
+DB_POOL_SIZE = Gauge("db_pool_connections", "Postgres connections held by the pool.", multiprocess_mode="livesum")
+LOOP_LAG = Histogram("event_loop_lag_seconds", "Delay of a scheduled event loop wake-up.", buckets=LATENCY_BUCKETS)
+
+
+def count_cache(cache: str, hits: int, misses: int) -> None:
+    """Record cache hits and misses."""
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def count_ingest(source: str, points: int, skipped: int = 0, rejected: bool = False) -> None:
+    """Record one ingested request or message."""
+    if rejected:
+        INGEST_REJECTED.labels(source).inc(points)
+        return
+    INGEST_POINTS.labels(source).inc(points)
+    INGEST_BATCH.labels(source).observe(points)
+    if skipped:
+        INGEST_SKIPPED.labels(source).inc(skipped)
+
+
+def route_template(scope: Scope) -> str:
+    """Path template of the route that handled a request, e.g. ``/api/v1/data/machine/{machine_id}``."""
+    # newer FastAPI releases keep included routers nested and record the full template separately
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if getattr(context, "path", None):
+        return context.path
+    # unmatched paths share one label so scanners cannot grow the label set
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class RequestMetricsMiddleware:
+    """Time HTTP requests, labelled with the matched route template rather than the raw path."""
+
+    def __init__(self, app: ASGIApp):
+        """Wrap an ASGI app."""
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request."""
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUEST_LATENCY.labels(scope["method"], route_template(scope), str(status)).observe(elapsed)
+
+
+async def metrics_endpoint(_request: Request) -> Response:
+    """Serve every worker's metrics in the Prometheus text format."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+class RuntimeMonitor:
+    """Sample event loop lag and database pool usage in the background."""
+
+    def __init__(self, pool_engine: AsyncEngine = engine, interval: int = settings.METRICS_SAMPLE_INTERVAL):
+        """Initialize monitor settings."""
+        self._engine = pool_engine
+        self._interval = interval / 1000
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the sampling task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="runtime-monitor")
+
+    async def stop(self) -> None:
+        """Stop sampling and retire this worker's live gauges."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            multiprocess.mark_process_dead(os.getpid())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - expected))
+            self.sample_pool()
+
+    def sample_pool(self) -> None:
+        """Record how many pooled connections are open and in use."""
+        pool = self._engine.pool
+        # sqlite test engines use pools that do not count connections
+        if hasattr(pool, "checkedout"):
+            DB_POOL_CHECKED_OUT.set(pool.checkedout())
+            DB_POOL_SIZE.set(pool.checkedin() + pool.checkedout())
+
+
+runtime_monitor = RuntimeMonitor()
@@ -1,38 +1,141 @@
-"""MQTT lib."""
+"""MQTT lib.
 
-import json
+With ``MQTT_SHARED_GROUP`` set, telemetry is subscribed as
+``$share/<group>/<topic>``: the broker hands each message to one member of
+the group, so workers and replicas split the stream instead of all
+processing every message.
+
+Deduplication, rate and z-score rules and live state keep per-machine
+state in each process, so every message of a machine must reach the same
+worker. The broker therefore has to dispatch shared subscriptions by topic
+hash (EMQX ``mqtt.shared_subscription_strategy = hash_topic``, set in
+docker-compose.yml); the topic carries the machine id, so a machine sticks
+to one worker until the group's membership changes. A machine that mixes
+format suffixes publishes on several topics and may be split.
+
+QoS 1 and 2 messages are acknowledged once they have been handled, so
+``MQTT_MAX_INFLIGHT`` (the MQTT 5 receive maximum) bounds how many
+messages a connection processes at once. Handled means queued for the
+InfluxDB writer, not written: points still in a worker's queue are lost if
+it dies. Only a message in progress is redelivered, to whichever member
+its machine hashes to next. That worker's rule windows start empty and its
+deduplication window has not seen the message, so points that were already
+queued are written again, which InfluxDB stores as overwrites.
+"""
+
+import os
+import socket
+import uuid
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 from fastapi_mqtt import FastMQTT, MQTTClient, MQTTConfig
+from gmqtt.mqtt.constants import PubAckReasonCode
 
+from app.core.setting import settings
+from app.modules.ingest.service.telemetry_service import TELEMETRY_TOPICS, telemetry_service
 from app.utils.logging import DevLogger
 
 logger = DevLogger("mqtt").get()
 
-mqtt_config = MQTTConfig(
-    host="emqx",
-)
-fast_mqtt = FastMQTT(config=mqtt_config)
+MessageHandler = Callable[[MQTTClient, str, bytes, int, Any], Awaitable[Any]]
+
+
+def client_id(template: str = settings.MQTT_CLIENT_ID) -> str:
+    """Fill in the client id template; every connection needs a distinct id."""
+    return template.format(hostname=socket.gethostname(), pid=os.getpid(), uuid=uuid.uuid4().hex[:8])
+
+
+def shared_topic(topic: str, group: str = settings.MQTT_SHARED_GROUP) -> str:
+    """Subscribe ``topic`` through a shared subscription group, if one is configured."""
+    return f"$share/{group}/{topic}" if group else topic
+
+
+def acknowledged(dispatch: MessageHandler) -> MessageHandler:
+    """Wrap FastMQTT's dispatcher to return the PUBACK reason code gmqtt expects."""
+    async def handle(client: MQTTClient, topic: str, payload: bytes, qos: int, properties: Any) -> int:
+        try:
+            await dispatch(client, topic, payload, qos, properties)
+        except Exception as e:
+            # acknowledged anyway: redelivering a message that fails would fail again
+            logger.error("Failed to handle message on %s: %s", topic, e)
+        return PubAckReasonCode.SUCCESS.value
+
+    return handle
+
+
+def content_type(properties: Any) -> str | None:
+    """Read the MQTT 5 content type property, if the publisher set one."""
+    value = (properties or {}).get("content_type")
+    if isinstance(value, list | tuple):
+        value = value[0] if value else None
+    return value
+
 
-@fast_mqtt.on_connect()
 def connect(client: MQTTClient, flags: int, rc: int, properties: Any):
     """Connect."""
-    client.subscribe("/factory/A/machine/+/telemetry")
+    for topic in TELEMETRY_TOPICS:
+        client.subscribe(shared_topic(topic), qos=settings.MQTT_QOS)
     logger.info(f"Connected: {client}, {flags}, {rc}, {properties}")
 
-@fast_mqtt.on_message()
 async def message(client: MQTTClient, topic: str, payload: bytes, qos: int, properties: Any):
     """Message."""
-    payload_str = payload.decode()
-    try:
-        data = json.loads(payload_str)
-    except json.JSONDecodeError:
-        logger.error(f"Invalid JSON received on {topic}: {payload_str}")
-        return
-
-    logger.info(f"Processed message on {topic}: {data}")
+    if await telemetry_service.handle_message(topic, payload, content_type(properties)):
+        logger.debug("Processed message on %s", topic)
 
-@fast_mqtt.on_disconnect()
 def disconnect(client: MQTTClient, packet, exc=None):
     """Disconnect."""
     logger.info("MQTT Disconnected")
+
+
+class MQTTService:
+    """The worker's broker connection.
+
+    The client is only built in ``start``, inside the worker process, so a
+    forked worker never inherits another process's connection or client id.
+    """
+
+    def __init__(self):
+        """Initialize without a client."""
+        self.client: FastMQTT | None = None
+
+    def _create(self) -> FastMQTT:
+        config = MQTTConfig(
+            host=settings.MQTT_HOST,
+            port=settings.MQTT_PORT,
+            username=settings.MQTT_USERNAME or None,
+            password=settings.MQTT_PASSWORD or None,
+        )
+        fast_mqtt = FastMQTT(
+            config=config,
+            client_id=client_id(),
+            optimistic_acknowledgement=False,
+            receive_maximum=settings.MQTT_MAX_INFLIGHT,
+        )
+        fast_mqtt.on_connect()(connect)
+        fast_mqtt.on_message()(message)
+        fast_mqtt.on_disconnect()(disconnect)
+        fast_mqtt.client.on_message = acknowledged(fast_mqtt.client.on_message)
+        return fast_mqtt
+
+    async def start(self) -> None:
+        """Connect to the broker and subscribe to telemetry."""
+        if self.client is None:
+            self.client = self._create()
+            await self.client.mqtt_startup()
+
+    async def stop(self) -> None:
+        """Disconnect from the broker."""
+        if self.client is None:
+            return
+        client, self.client = self.client, None
+        await client.mqtt_shutdown()
+
+    def publish(self, topic: str, payload: Any, qos: int = 0) -> None:
+        """Publish a message on the worker's connection."""
+        if self.client is None:
+            raise RuntimeError("MQTT is not connected")
+        self.client.publish(topic, payload, qos=qos)
+
+
+mqtt_service = MQTTService()
@@ -0,0 +1,120 @@
+"""On-demand request profiling.
+
+With ``PROFILING_ENABLED``, a management user can profile a single request
+by sending an ``X-Profile`` header or a ``profile`` query parameter. The
+request runs normally under pyinstrument's sampling profiler, which follows
+the request's task across awaits, and the response is replaced by the
+profile: a call tree (``text``, the default), an interactive flame view
+(``html``) or a speedscope flame graph (``speedscope``). The status the
+request would have answered is kept in ``X-Profiled-Status``.
+
+Server-sent event streams never finish, so they are passed through
+unprofiled as soon as they start; WebSockets are never profiled.
+"""
+
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.setting import settings
+from app.utils.logging import DevLogger
+from app.utils.utlis import get_current_user
+
+logger = DevLogger("profiling").get()
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ROLES = ("management",)
+FORMATS = ("text", "html", "speedscope")
+STREAMING_TYPES = (b"text/event-stream",)
+
+
+def requested_format(scope: Scope) -> str | None:
+    """Profile format asked for by the request, or None when it did not ask."""
+    value = next((v.decode() for k, v in scope["headers"] if k == PROFILE_HEADER), None)
+    if value is None and b"profile" in scope.get("query_string", b""):
+        value = parse_qs(scope["query_string"].decode(), keep_blank_values=True).get("profile", [None])[-1]
+    if value is None:
+        return None
+    value = value.lower()
+    return value if value in FORMATS else "text"
+
+
+async def authorized(scope: Scope) -> bool:
+    """Whether the request carries a bearer token of a role allowed to profile."""
+    header = next((v.decode() for k, v in scope["headers"] if k == b"authorization"), "")
+    scheme, _, token = header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await get_current_user(token)
+    except HTTPException:
+        return False
+    return user.role in PROFILE_ROLES
+
+
+def streaming(message: Message) -> bool:
+    """Whether a response start message opens a stream that may never end."""
+    content_type = next((v for k, v in message.get("headers", []) if k.lower() == b"content-type"), b"")
+    return content_type.split(b";")[0].strip().lower() in STREAMING_TYPES
+
+
+def render(profiler: Profiler, fmt: str, status: int) -> Response:
+    """Build the response carrying a finished profile."""
+    headers = {"X-Profiled-Status": str(status)}
+    if fmt == "html":
+        return HTMLResponse(profiler.output_html(), headers=headers)
+    if fmt == "speedscope":
+        return Response(profiler.output(SpeedscopeRenderer()), media_type="application/json", headers=headers)
+    return PlainTextResponse(profiler.output_text(unicode=True), headers=headers)
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it and answer with the profile instead of the response."""
+
+    def __init__(self, app: ASGIApp, interval: int = settings.PROFILING_INTERVAL):
+        """Wrap an ASGI app; ``interval`` is the sampling interval in microseconds."""
+        self.app = app
+        self._interval = interval / 1_000_000
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request."""
+        fmt = requested_format(scope) if scope["type"] == "http" else None
+        if fmt is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await authorized(scope):
+            response = JSONResponse({"detail": "Profiling requires a management token"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        status = 500
+        passthrough = False
+        profiler = Profiler(interval=self._interval, async_mode="enabled")
+
+        async def discard(message: Message) -> None:
+            nonlocal status, passthrough
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # buffering a stream would hold the request and its memory forever
+                passthrough = streaming(message)
+                if passthrough:
+                    profiler.stop()
+            if passthrough:
+                await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, discard)
+        finally:
+            if profiler.is_running:
+                profiler.stop()
+        if passthrough:
+            logger.info("Not profiling streamed response of %s %s", scope["method"], scope["path"])
+            return
+        logger.info("Profiled %s %s in %.3fs", scope["method"], scope["path"], profiler.last_session.duration)
+        await render(profiler, fmt, status)(scope, receive, send)
@@ -1,17 +1,26 @@
 """Redis client library."""
 
-import json
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
 
 import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
 from redis.exceptions import RedisError
 
 from app.core.setting import settings
+from app.lib.redis_codec import ValueSerializer
 from app.utils.logging import DevLogger
 
 logger = DevLogger("redis", to_file=True).get()
 
+
 class RedisClient:
-    """Async Redis client with context management."""
+    """Async Redis client with context management.
+
+    All commands share one explicit connection pool; the app-wide instance
+    is ``redis_client``, connected and closed by the application lifespan.
+    """
 
     def __init__(
         self,
@@ -19,26 +28,38 @@ class RedisClient:
         port: int = settings.REDIS_PORT,
         db: int = settings.REDIS_DB,
         expire: int = settings.REDIS_EXPIRE,
+        max_connections: int = settings.REDIS_MAX_CONNECTIONS,
+        serializer: ValueSerializer | None = None,
     ):
         """Initialize Redis client settings."""
         self._host = host
         self._port = port
         self._db = db
         self._expire = expire
+        self._max_connections = max_connections
+        self._serializer = serializer or ValueSerializer(
+            codec=settings.REDIS_CODEC,
+            compression=settings.REDIS_COMPRESSION,
+            threshold=settings.REDIS_COMPRESS_THRESHOLD,
+            level=settings.REDIS_COMPRESSION_LEVEL,
+        )
+        self._pool: redis.ConnectionPool | None = None
         self._client: redis.Redis | None = None
 
     async def connect(self) -> redis.Redis:
         """Establish a connection to the Redis server."""
         if self._client is None:
             try:
-                self._client = redis.Redis(
+                self._pool = redis.ConnectionPool(
                     host=self._host,
                     port=self._port,
                     db=self._db,
-                    decode_responses=True,
+                    max_connections=self._max_connections,
+                    decode_responses=False,
                     socket_timeout=5,
                     retry_on_timeout=True,
                 )
+                self._client = redis.Redis(connection_pool=self._pool)
 
                 await self._client.ping()
                 logger.info(f"Connected to Redis at {self._host}:{self._port}/{self._db}")
@@ -52,53 +73,233 @@ class RedisClient:
         """Close the Redis connection."""
         if self._client:
             try:
-                await self._client.close()
+                await self._client.aclose()
+                await self._pool.disconnect()
                 logger.info("Redis connection closed.")
             except Exception as e:
                 logger.warning(f"Failed to close Redis connection: {e}")
             finally:
                 self._client = None
+                self._pool = None
 
     async def _get_client(self) -> redis.Redis:
         if self._client is None:
             return await self.connect()
         return self._client
 
-    async def get(self, key: str) -> dict | list | str | None:
+    async def get(self, key: str) -> Any:
         """Get the value of a key from Redis."""
         client = await self._get_client()
         try:
             value = await client.get(key)
-            if value is None:
-                return None
-
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value
-
         except RedisError as e:
             logger.error(f"Redis GET error for key '{key}': {e}")
             return None
 
-    async def set(self, key: str, value, expire: int | None = None) -> bool:
-        """Set key with auto JSON encoding and optional expire."""
+        return self.decode(key, value)
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value the way ``set`` stores it, for use in pipelines."""
+        return self._serializer.dumps(value)
+
+    def decode(self, key: str, value: bytes | None) -> Any:
+        """Decode a raw value read from Redis, None if missing or unreadable."""
+        if value is None:
+            return None
+        try:
+            return self._serializer.loads(value)
+        except Exception as e:
+            logger.error(f"Redis decode error for key '{key}': {e}")
+            return None
+
+    async def mget(self, keys: list[str]) -> list[Any]:
+        """Get many keys in one round trip, None for each missing key."""
+        if not keys:
+            return []
+        client = await self._get_client()
+        try:
+            values = await client.mget(keys)
+        except RedisError as e:
+            logger.error(f"Redis MGET error for {len(keys)} keys: {e}")
+            return [None] * len(keys)
+        return [self.decode(key, value) for key, value in zip(keys, values, strict=True)]
+
+    async def set(self, key: str, value: Any, expire: int | None = None) -> bool:
+        """Set key with codec encoding and optional expire."""
         client = await self._get_client()
         try:
-            json_value = json.dumps(value)
+            data = self.encode(value)
             exp: int = expire or self._expire
-            success = await client.set(key, json_value, ex=exp)
+            success = await client.set(key, data, ex=exp)
             return bool(success)
         except RedisError as e:
             logger.error(f"Redis SET error for key '{key}': {e}")
             return False
 
-    async def delete(self, key: str) -> bool:
-        """Delete a key."""
+    async def mset(self, mapping: dict[str, Any], expire: int | None = None) -> bool:
+        """Set many keys with the same expire in one round trip."""
+        if not mapping:
+            return True
+        exp: int = expire or self._expire
+        try:
+            async with self.pipeline() as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, self.encode(value), ex=exp)
+                return all(await pipe.execute())
+        except RedisError as e:
+            logger.error(f"Redis MSET error for {len(mapping)} keys: {e}")
+            return False
+
+    async def hgetall(self, key: str) -> dict[str, Any]:
+        """Get every field of a hash."""
+        client = await self._get_client()
+        try:
+            values = await client.hgetall(key)
+        except RedisError as e:
+            logger.error(f"Redis HGETALL error for key '{key}': {e}")
+            return {}
+        return {field.decode(): self.decode(key, value) for field, value in values.items()}
+
+    async def hset(self, key: str, mapping: dict[str, Any]) -> bool:
+        """Set fields of a hash."""
+        client = await self._get_client()
+        try:
+            await client.hset(key, mapping={field: self.encode(value) for field, value in mapping.items()})
+            return True
+        except RedisError as e:
+            logger.error(f"Redis HSET error for key '{key}': {e}")
+            return False
+
+    async def hmget(self, key: str, fields: list[str]) -> list[Any]:
+        """Get several fields of a hash, None for each missing field."""
+        if not fields:
+            return []
+        client = await self._get_client()
+        try:
+            values = await client.hmget(key, fields)
+        except RedisError as e:
+            logger.error(f"Redis HMGET error for key '{key}': {e}")
+            return [None] * len(fields)
+        return [self.decode(key, value) for value in values]
+
+    async def run_script(self, script: str, keys: list[str], args: list[Any]) -> Any:
+        """Run a Lua script by its SHA, loading it on first use; None on error.
+
+        Arguments are sent as given, so values the script stores must be
+        encoded with ``encode`` first.
+        """
+        client = await self._get_client()
+        try:
+            return await client.register_script(script)(keys=keys, args=args)
+        except RedisError as e:
+            logger.error(f"Redis script error for keys {keys}: {e}")
+            return None
+
+    async def publish(self, channel: str, value: Any) -> int:
+        """Publish an encoded value, returning how many subscribers received it."""
+        client = await self._get_client()
+        try:
+            return await client.publish(channel, self.encode(value))
+        except RedisError as e:
+            logger.error(f"Redis PUBLISH error on channel '{channel}': {e}")
+            return 0
+
+    async def subscribe(self, channel: str) -> AsyncIterator[Any]:
+        """Yield decoded values published on a channel until cancelled.
+
+        The subscription holds its own connection; Redis errors propagate so
+        the caller can decide how to resubscribe.
+        """
+        client = await self._get_client()
+        async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(channel)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield self.decode(channel, message["data"])
+
+    @asynccontextmanager
+    async def pipeline(self, transaction: bool = False) -> AsyncIterator[Pipeline]:
+        """Queue raw commands and send them with ``execute()`` in one round trip.
+
+        With ``transaction`` the commands run atomically inside MULTI/EXEC.
+        Values must be encoded with ``encode`` and read back with ``decode``.
+        """
+        client = await self._get_client()
+        async with client.pipeline(transaction=transaction) as pipe:
+            yield pipe
+
+    async def transaction(self, func: Callable[[Pipeline], Awaitable[Any]], *watches: str) -> Any:
+        """Run ``func`` as an optimistic transaction, retried while ``watches`` change."""
+        client = await self._get_client()
+        return await client.transaction(func, *watches, value_from_callable=True)
+
+    async def lock(self, key: str, expire: int) -> bool:
+        """Take a lock key that expires on its own, False if it is already held.
+
+        A Redis error counts as acquired so callers fall back to doing the
+        work themselves instead of waiting on a lock nobody holds.
+        """
+        client = await self._get_client()
+        try:
+            return bool(await client.set(key, "1", ex=expire, nx=True))
+        except RedisError as e:
+            logger.error(f"Redis LOCK error for key '{key}': {e}")
+            return True
+
+    async def expire(self, key: str, expire: int) -> bool:
+        """Reset a key's time to live, False if the key does not exist."""
+        client = await self._get_client()
+        try:
+            return bool(await client.expire(key, expire))
+        except RedisError as e:
+            logger.error(f"Redis EXPIRE error for key '{key}': {e}")
+            return False
+
+    async def zadd(self, key: str, mapping: dict[str, float], gt: bool = False) -> bool:
+        """Add scored members to a sorted set; with ``gt`` existing scores only ever increase."""
+        if not mapping:
+            return True
+        client = await self._get_client()
+        try:
+            await client.zadd(key, mapping, gt=gt)
+            return True
+        except RedisError as e:
+            logger.error(f"Redis ZADD error for key '{key}': {e}")
+            return False
+
+    async def ztake(self, key: str, max_score: float) -> list[str]:
+        """Remove and return the members of a sorted set scored at most ``max_score``."""
         client = await self._get_client()
         try:
-            deleted = await client.delete(key)
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zrangebyscore(key, "-inf", max_score)
+                pipe.zremrangebyscore(key, "-inf", max_score)
+                members, _ = await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Redis ZTAKE error for key '{key}': {e}")
+            return []
+        return [member.decode() for member in members]
+
+    async def scan(self, pattern: str) -> list[str]:
+        """Find the keys matching a glob pattern without blocking the server."""
+        client = await self._get_client()
+        try:
+            return [key.decode() async for key in client.scan_iter(match=pattern, count=1000)]
+        except RedisError as e:
+            logger.error(f"Redis SCAN error for pattern '{pattern}': {e}")
+            return []
+
+    async def delete(self, *keys: str) -> bool:
+        """Delete keys, True if any existed."""
+        if not keys:
+            return False
+        client = await self._get_client()
+        try:
+            deleted = await client.delete(*keys)
             return bool(deleted)
         except RedisError as e:
-            logger.error(f"Redis DELETE error for key '{key}': {e}")
+            logger.error(f"Redis DELETE error for {len(keys)} keys starting '{keys[0]}': {e}")
             return False
+
+
+redis_client = RedisClient()
@@ -0,0 +1,163 @@
+"""Binary value codecs for Redis.
+
+Every encoded value starts with one header byte, ``0x80 | codec << 2 |
+compression``. JSON text never starts with a byte above 0x7f, so values
+written before the header existed are still read back as JSON.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from typing import Any
+
+import msgpack
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import zstandard
+
+HEADER_FLAG = 0x80
+
+NONE = "none"
+ZSTD = "zstd"
+COMPRESSIONS = {NONE: 0, ZSTD: 1}
+
+
+class Codec(ABC):
+    """Turn cached values into bytes and back."""
+
+    id: int
+    name: str
+
+    def accepts(self, value: Any) -> bool:
+        """Whether this codec can encode the value."""
+        return True
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Encode a value."""
+
+    @abstractmethod
+    def decode(self, data: bytes | memoryview) -> Any:
+        """Decode a value."""
+
+
+class RawCodec(Codec):
+    """Store bytes as they are."""
+
+    id, name = 0, "raw"
+
+    def accepts(self, value: Any) -> bool:
+        """Accept bytes only."""
+        return isinstance(value, bytes | bytearray | memoryview)
+
+    def encode(self, value: Any) -> bytes:
+        """Encode bytes."""
+        return bytes(value)
+
+    def decode(self, data: bytes) -> bytes:
+        """Decode bytes."""
+        return bytes(data)
+
+
+class MsgpackCodec(Codec):
+    """Encode plain Python values with msgpack."""
+
+    id, name = 1, "msgpack"
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value."""
+        return msgpack.packb(value, use_bin_type=True, datetime=True)
+
+    def decode(self, data: bytes) -> Any:
+        """Decode a value."""
+        return msgpack.unpackb(data, raw=False, timestamp=3)
+
+
+class ArrowCodec(Codec):
+    """Encode Arrow tables as an IPC stream."""
+
+    id, name = 2, "arrow"
+
+    def accepts(self, value: Any) -> bool:
+        """Accept Arrow tables only."""
+        return isinstance(value, pa.Table)
+
+    def encode(self, value: pa.Table) -> bytes:
+        """Encode a table."""
+        sink = pa.BufferOutputStream()
+        with ipc.new_stream(sink, value.schema) as writer:
+            writer.write_table(value)
+        return sink.getvalue().to_pybytes()
+
+    def decode(self, data: bytes) -> pa.Table:
+        """Decode a table."""
+        return ipc.open_stream(pa.py_buffer(data)).read_all()
+
+
+class JsonCodec(Codec):
+    """Encode values as JSON text."""
+
+    id, name = 3, "json"
+
+    def encode(self, value: Any) -> bytes:
+        """Encode a value."""
+        return json.dumps(value).encode()
+
+    def decode(self, data: bytes) -> Any:
+        """Decode a value."""
+        return json.loads(bytes(data))
+
+
+CODECS: dict[int, Codec] = {codec.id: codec for codec in (RawCodec(), MsgpackCodec(), ArrowCodec(), JsonCodec())}
+CODECS_BY_NAME: dict[str, Codec] = {codec.name: codec for codec in CODECS.values()}
+
+
+class ValueSerializer:
+    """Pick a codec per value and compress large payloads.
+
+    Bytes and Arrow tables always use their own codecs; anything else
+    goes through ``codec``. Payloads of at least ``threshold`` bytes are
+    compressed with ``compression``.
+    """
+
+    def __init__(self, codec: str = "msgpack", compression: str = ZSTD, threshold: int = 1024, level: int = 3):
+        """Initialize serializer settings."""
+        if codec not in CODECS_BY_NAME:
+            raise ValueError(f"Unknown Redis codec {codec}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown Redis compression {compression}")
+        self._codec = CODECS_BY_NAME[codec]
+        self._compression = COMPRESSIONS[compression]
+        self._threshold = threshold
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def dumps(self, value: Any) -> bytes:
+        """Encode a value with its header byte."""
+        codec = next(
+            (c for c in (CODECS_BY_NAME["raw"], CODECS_BY_NAME["arrow"]) if c.accepts(value)),
+            self._codec,
+        )
+        data = codec.encode(value)
+        compression = COMPRESSIONS[NONE]
+        if self._compression and len(data) >= self._threshold:
+            data = self._compressor.compress(data)
+            compression = self._compression
+        return bytes([HEADER_FLAG | codec.id << 2 | compression]) + data
+
+    def loads(self, data: bytes) -> Any:
+        """Decode a value written by ``dumps`` or a legacy JSON string."""
+        if not data or not data[0] & HEADER_FLAG:
+            text = data.decode()
+            try:
+                return json.loads(text)
+            except json.JSONDecodeError:
+                return text
+
+        header = data[0]
+        codec = CODECS.get((header & 0x7f) >> 2)
+        if codec is None:
+            raise ValueError(f"Unknown Redis value header {header:#x}")
+        payload = memoryview(data)[1:]
+        if header & 0x03 == COMPRESSIONS[ZSTD]:
+            payload = self._decompressor.decompressobj().decompress(payload)
+        return codec.decode(payload)
@@ -1,25 +1,70 @@
 """Main application."""
 
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.lib import mqtt
-from app.lib.redis import RedisClient
+from app.core.setting import settings
+from app.db.influx_query import influx_query
+from app.db.influx_writer import influx_writer
+from app.db.session import SessionLocal, engine
+from app.lib.metrics import RequestMetricsMiddleware, metrics_endpoint, runtime_monitor
+from app.lib.mqtt import mqtt_service
+from app.lib.profiling import ProfilingMiddleware
+from app.lib.redis import redis_client
 from app.modules.auth.endpoint import auth_endpoint
 from app.modules.ingest.endpoint import ingest_endpoint
 from app.modules.machine.endpoint import machine_endpoint
+from app.modules.machine.service.live_push import live_hub
+from app.modules.machine.service.live_state import live_state
+from app.modules.machine.service.machine_service import MachineService, cache_invalidator
+from app.modules.machine.service.rollup_service import rollup_job
+from app.modules.machine.service.rule_engine import rule_engine
+from app.utils.logging import DevLogger
+
+logger = DevLogger("main").get()
+
+
+async def warm_machine_registry() -> None:
+    """Preload known machine ids so hot-path lookups skip Postgres."""
+    try:
+        async with SessionLocal() as db:
+            await MachineService(db).warm_registry()
+    except Exception as e:
+        logger.warning(f"Failed to warm machine registry: {e}")
 
-redis_client = RedisClient()
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    """Lifespan."""
-    await mqtt.fast_mqtt.mqtt_startup()
-    await redis_client.connect()
-    yield
-    await mqtt.fast_mqtt.mqtt_shutdown()
-    await redis_client.close()
+    """Lifespan.
+
+    Runs once per worker process: every connection, pool and background
+    task is created here rather than at import, and torn down in reverse
+    order on shutdown, including whatever had started when startup fails.
+    MQTT is stopped first so no new points arrive while the writer drains.
+    """
+    async with AsyncExitStack() as stack:
+        # a forked worker must not reuse database connections opened by its parent
+        await engine.dispose(close=False)
+        stack.push_async_callback(engine.dispose)
+        await redis_client.connect()
+        stack.push_async_callback(redis_client.close)
+        await warm_machine_registry()
+        if settings.METRICS_ENABLED:
+            await runtime_monitor.start()
+            stack.push_async_callback(runtime_monitor.stop)
+
+        for component in (influx_query, influx_writer, live_state, live_hub, cache_invalidator):
+            await component.start()
+            stack.push_async_callback(component.stop)
+        await rule_engine.start(mqtt_service.publish)
+        stack.push_async_callback(rule_engine.stop)
+        if settings.ROLLUP_ENABLED:
+            await rollup_job.start()
+            stack.push_async_callback(rollup_job.stop)
+        await mqtt_service.start()
+        stack.push_async_callback(mqtt_service.stop)
+        yield
 
 
 def create_app() -> FastAPI:
@@ -31,6 +76,13 @@ def create_app() -> FastAPI:
         lifespan=lifespan
     )
 
+    if settings.METRICS_ENABLED:
+        app.add_middleware(RequestMetricsMiddleware)
+        app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
+    if settings.PROFILING_ENABLED:
+        # added last so it is outermost and the profile covers the whole request
+        app.add_middleware(ProfilingMiddleware)
+
     # Include routers
     app.include_router(auth_endpoint.router, prefix="/api/v1/auth")
     app.include_router(machine_endpoint.router, prefix="/api/v1/data")
@@ -43,7 +95,7 @@ app = create_app()
 @app.post("/publish_topic")
 async def publish_topic():
     """Publish topic."""
-    mqtt.fast_mqtt.publish("/factory/A/machine/1/telemetry", {
+    mqtt_service.publish("/factory/A/machine/1/telemetry", {
         "temperature": 25,
         "pressure": 1013,
         "speed": 0,
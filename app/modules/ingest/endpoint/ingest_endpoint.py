@@ -1,26 +1,124 @@
 """"Ingest Endpoint."""
 
 
+import zlib
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.modules.ingest.schema.ingest_schema import IngestSchema
+from app.modules.ingest.schema.ingest_schema import IngestResult, IngestSchema, IngestStreamResult, WriteStatus
+from app.modules.ingest.service.ingest_codec import (
+    JSON,
+    PayloadError,
+    PayloadTooLargeError,
+    UnsupportedFormatError,
+    decode_payload,
+    media_format,
+)
 from app.modules.ingest.service.ingest_service import IngestService
+from app.modules.ingest.service.ndjson_reader import LineTooLongError
+from app.utils.base_response import BaseResponse
 
 router = APIRouter(
         tags=["Ingest"],
         prefix="/ingest"
 )
 
-def get_ingest_service(db: Annotated[Session, Depends(get_db)]):
+def get_ingest_service(db: Annotated[AsyncSession, Depends(get_db)]):
     """Get ingest service."""
     return IngestService(db)
 
-@router.post("")
-async def ingest_data(schema: IngestSchema, service: Annotated[IngestService, Depends(get_ingest_service)]):
+def ingest_response(response: Response, result: IngestResult) -> BaseResponse[IngestResult]:
+    """Map a write status onto the HTTP response."""
+    if result.status == WriteStatus.rejected:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = "1"
+        return BaseResponse(status=False, message="ingest buffer full, retry later", data=result)
+
+    response.status_code = status.HTTP_202_ACCEPTED
+    return BaseResponse(status=True, message="successfully ingesting data", data=result)
+
+
+BINARY_BODY = {"schema": {"type": "string", "format": "binary"}}
+# NDJSON content encodings and whether they mean the stream is gzipped; none sniffs it
+STREAM_ENCODINGS = {"": None, "identity": False, "gzip": True}
+
+
+@router.post(
+    "",
+    response_model=BaseResponse[IngestResult],
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {"schema": IngestSchema.model_json_schema()},
+                "application/msgpack": BINARY_BODY,
+                "application/vnd.apache.arrow.stream": BINARY_BODY,
+            },
+            "description": "IngestSchema as JSON or msgpack, columnar arrays (time, temperature, ...) as "
+            "compressed JSON or msgpack, or an Arrow IPC stream; gzip/zstd Content-Encoding is supported.",
+            "required": True,
+        }
+    },
+)
+async def ingest_data(
+    request: Request,
+    response: Response,
+    service: Annotated[IngestService, Depends(get_ingest_service)],
+):
     """Ingest data."""
-    await service.ingest_data(schema)
-    return {"status": True, "message": "successfully ingesting data"}
+    try:
+        fmt = media_format(request.headers.get("content-type"))
+        encoding = request.headers.get("content-encoding")
+        body = await request.body()
+        if fmt == JSON and not encoding:
+            # the common path keeps its Pydantic validation and error shape
+            result = await service.ingest_data(IngestSchema.model_validate_json(body))
+        else:
+            result = await service.ingest_table(decode_payload(body, fmt, encoding))
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e)) from e
+    except PayloadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(e)) from e
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from e
+    except PayloadError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e)) from e
+    return ingest_response(response, result)
+
+
+@router.post(
+    "/stream",
+    response_model=BaseResponse[IngestStreamResult],
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}},
+            "description": "One StreamRecord JSON object per line, optionally gzip-compressed.",
+        }
+    },
+)
+async def ingest_stream(
+    request: Request,
+    response: Response,
+    service: Annotated[IngestService, Depends(get_ingest_service)],
+):
+    """Ingest an NDJSON stream of records for any number of machines."""
+    encoding = request.headers.get("content-encoding", "").strip().lower()
+    if encoding not in STREAM_ENCODINGS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Unsupported content encoding {encoding}"
+        )
+    try:
+        result = await service.ingest_stream(request.stream(), STREAM_ENCODINGS[encoding])
+    except (LineTooLongError, zlib.error) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+    if not result.completed:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        response.headers["Retry-After"] = "1"
+        return BaseResponse(status=False, message="ingest buffer full, resume from the last chunk", data=result)
+    return BaseResponse(status=True, message="successfully ingesting stream", data=result)
@@ -2,10 +2,19 @@
 
 
 from datetime import datetime
+from enum import StrEnum
 
 from pydantic import BaseModel, Field
 
 
+class WriteStatus(StrEnum):
+    """Outcome of handing points to the writer."""
+
+    accepted = "accepted"  # buffered with headroom to spare
+    queued = "queued"  # buffered, but the buffer is under pressure
+    rejected = "rejected"  # nothing buffered, the caller should retry later
+
+
 class Record(BaseModel):
     """Record."""
 
@@ -14,8 +23,44 @@ class Record(BaseModel):
     pressure: float | None = None
     speed: float | None = None
 
+class StreamRecord(Record):
+    """Stream Record."""
+
+    machine_id: int
+
 class IngestSchema(BaseModel):
     """Ingest Schema."""
 
     machine_id: int
     sensor_data: list[Record] = Field(min_length=1)
+
+
+class IngestResult(BaseModel):
+    """Ingest Result."""
+
+    status: WriteStatus
+    points: int
+    pending: int
+    skipped: int = 0  # duplicate or late points not written
+
+
+class ChunkResult(BaseModel):
+    """Chunk Result."""
+
+    index: int
+    offset: int
+    lines: int
+    accepted: int
+    invalid: int
+    unknown_machine: int
+    skipped: int = 0
+    status: WriteStatus
+
+
+class IngestStreamResult(BaseModel):
+    """Ingest Stream Result."""
+
+    lines: int = 0
+    accepted: int = 0
+    completed: bool = True
+    chunks: list[ChunkResult] = []
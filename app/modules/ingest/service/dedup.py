@@ -0,0 +1,114 @@
+"""Ingest deduplication.
+
+MQTT QoS 1 redelivery and gateway retries deliver the same
+``(machine_id, time)`` reading more than once. ``Deduplicator.filter``
+drops rows whose timestamp is repeated within a table or was among the
+last ``window`` timestamps written for the machine; each machine's window
+is a single int64 Arrow array, so memory stays at ``8 * window`` bytes per
+machine and the check is one vectorized ``is_in``.
+
+Points older than the machine's newest timestamp minus ``tolerance``
+seconds are late. With the ``accept`` policy they are written like any
+other point (only deduplicated against the window); with ``drop`` they are
+discarded. The window only covers this process, so a duplicate landing on
+another worker is still written; InfluxDB stores it as an overwrite of the
+same point.
+"""
+
+from dataclasses import dataclass
+from enum import StrEnum
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.core.setting import settings
+
+
+class LatePolicy(StrEnum):
+    """What to do with points older than the late tolerance."""
+
+    accept = "accept"
+    drop = "drop"
+
+
+@dataclass
+class DedupStats:
+    """Counters of rows removed before the write."""
+
+    duplicates: int = 0
+    late: int = 0
+
+
+class Deduplicator:
+    """Per-machine sliding window of recently written timestamps."""
+
+    def __init__(
+        self,
+        window: int = settings.INGEST_DEDUP_WINDOW,
+        late_policy: str = settings.INGEST_LATE_POLICY,
+        tolerance: int = settings.INGEST_LATE_TOLERANCE,
+    ):
+        """Initialize window settings; a window of 0 disables deduplication."""
+        self._window = window
+        self._policy = LatePolicy(late_policy)
+        self._tolerance = tolerance * 1_000_000_000
+        self._recent: dict[int, pa.Array] = {}
+        self._watermark: dict[int, int] = {}
+        self.stats = DedupStats()
+
+    def filter(self, table: pa.Table) -> pa.Table:
+        """Return the rows of ``table`` worth writing, sorted by time per machine.
+
+        The window is not updated; call ``remember`` with the rows once the
+        writer has accepted them, so rejected points are not treated as
+        duplicates when the client retries.
+        """
+        if table.num_rows == 0 or (self._window == 0 and self._policy == LatePolicy.accept):
+            return table
+        machine_ids = pc.unique(table["machine_id"]).to_pylist()
+        if len(machine_ids) == 1:
+            return self._fresh(machine_ids[0], table)
+        return pa.concat_tables(
+            self._fresh(machine_id, table.filter(pc.equal(table["machine_id"], machine_id)))
+            for machine_id in machine_ids
+        )
+
+    def _fresh(self, machine_id: int, table: pa.Table) -> pa.Table:
+        table = table.sort_by("time")
+        times = pc.cast(table["time"], pa.int64()).combine_chunks()
+        drop = pa.repeat(False, len(times))
+
+        if self._window:
+            # sorted, so a repeat within the table directly follows its first occurrence
+            repeated = pa.concat_arrays(
+                [pa.array([False]), pc.equal(times.slice(1), times.slice(0, len(times) - 1))]
+            )
+            recent = self._recent.get(machine_id, pa.array([], pa.int64()))
+            drop = pc.or_(repeated, pc.is_in(times, value_set=recent))
+            self.stats.duplicates += pc.sum(drop).as_py() or 0
+
+        watermark = self._watermark.get(machine_id)
+        if watermark is not None:
+            late = pc.and_(pc.less(times, watermark - self._tolerance), pc.invert(drop))
+            self.stats.late += pc.sum(late).as_py() or 0
+            if self._policy == LatePolicy.drop:
+                drop = pc.or_(drop, late)
+
+        return table.filter(pc.invert(drop))
+
+    def remember(self, table: pa.Table) -> None:
+        """Add written rows to their machines' windows and advance the watermarks."""
+        if table.num_rows == 0:
+            return
+        times = pc.cast(table["time"], pa.int64())
+        for machine_id in pc.unique(table["machine_id"]).to_pylist():
+            written = times.filter(pc.equal(table["machine_id"], machine_id)).combine_chunks()
+            newest = pc.max(written).as_py()
+            self._watermark[machine_id] = max(self._watermark.get(machine_id, newest), newest)
+            if self._window:
+                recent = self._recent.get(machine_id)
+                combined = written if recent is None else pa.concat_arrays([recent, written])
+                self._recent[machine_id] = combined.slice(max(0, len(combined) - self._window))
+
+
+deduplicator = Deduplicator()
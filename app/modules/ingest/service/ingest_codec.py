@@ -0,0 +1,148 @@
+"""Ingest payload decoding.
+
+Telemetry arrives as JSON, msgpack or Arrow IPC streams, optionally gzip
+or zstd compressed. Every format decodes into a sensor data Arrow table
+so the encoder and writer never see format-specific objects.
+"""
+
+import json
+import zlib
+from typing import Any
+
+import msgpack
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import zstandard
+from pydantic import ValidationError
+
+from app.core.setting import settings
+from app.modules.ingest.schema.ingest_schema import IngestSchema, Record
+from app.modules.ingest.service.line_protocol import FIELDS, normalize_table, records_to_table
+
+JSON = "json"
+MSGPACK = "msgpack"
+ARROW = "arrow"
+
+MEDIA_TYPES = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class PayloadError(ValueError):
+    """The payload could not be decoded into sensor data."""
+
+
+class UnsupportedFormatError(PayloadError):
+    """The payload's media type or content encoding is not supported."""
+
+
+class PayloadTooLargeError(PayloadError):
+    """The payload decompresses to more than the allowed size."""
+
+
+def media_format(content_type: str | None) -> str:
+    """Map a Content-Type (or MQTT content type) onto a payload format."""
+    if not content_type:
+        return JSON
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type.endswith("+json"):
+        return JSON
+    if media_type not in MEDIA_TYPES:
+        raise UnsupportedFormatError(f"Unsupported media type {media_type}")
+    return MEDIA_TYPES[media_type]
+
+
+def _gunzip(data: bytes, limit: int) -> bytes:
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    output = decompressor.decompress(data, limit + 1)
+    if len(output) <= limit and not decompressor.eof:
+        raise PayloadError("Invalid gzip payload: truncated")
+    return output
+
+
+def _unzstd(data: bytes, limit: int) -> bytes:
+    with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+        return reader.read(limit + 1)
+
+
+def decompress(data: bytes, encoding: str | None = None, limit: int = settings.INGEST_MAX_PAYLOAD_SIZE) -> bytes:
+    """Undo gzip/zstd compression, sniffing magic bytes when no encoding is given.
+
+    At most ``limit`` bytes are ever inflated, so a small compressed
+    payload cannot expand without bound.
+    """
+    encoding = (encoding or "").strip().lower()
+    output = None
+    try:
+        if encoding == "gzip" or (not encoding and data.startswith(GZIP_MAGIC)):
+            output = _gunzip(data, limit)
+        elif encoding == "zstd" or (not encoding and data.startswith(ZSTD_MAGIC)):
+            output = _unzstd(data, limit)
+    except (zlib.error, zstandard.ZstdError) as e:
+        raise PayloadError(f"Invalid {encoding or 'compressed'} payload: {e}") from e
+    if output is not None:
+        if len(output) > limit:
+            raise PayloadTooLargeError(f"Payload decompresses to more than {limit} bytes")
+        return output
+
+    if encoding not in ("", "identity"):
+        raise UnsupportedFormatError(f"Unsupported content encoding {encoding}")
+    return data
+
+
+def _payload_machine_id(payload_id: Any, machine_id: int | None) -> int | None:
+    # the caller's id (the MQTT topic, already checked against the registry)
+    # wins; a payload may repeat it but never name another machine
+    if machine_id is None or payload_id is None:
+        return machine_id if machine_id is not None else payload_id
+    if int(payload_id) != machine_id:
+        raise PayloadError(f"Payload machine_id {payload_id} does not match machine {machine_id}")
+    return machine_id
+
+
+def _table_from_object(obj: Any, machine_id: int | None) -> pa.Table:
+    # columnar: {"machine_id": 1, "time": [...], "temperature": [...], ...}
+    if isinstance(obj, dict) and isinstance(obj.get("time"), list):
+        columns = {name: obj[name] for name in ("time", *FIELDS) if name in obj}
+        return normalize_table(pa.table(columns), _payload_machine_id(obj.get("machine_id"), machine_id))
+
+    # row-oriented IngestSchema body
+    if isinstance(obj, dict) and "sensor_data" in obj:
+        schema = IngestSchema.model_validate(obj)
+        return records_to_table(_payload_machine_id(schema.machine_id, machine_id), schema.sensor_data)
+
+    # bare Record or list of Records, machine id taken from the caller (MQTT topic)
+    if machine_id is None:
+        raise PayloadError("machine_id is required")
+    items = obj if isinstance(obj, list) else [obj]
+    return records_to_table(machine_id, [Record.model_validate(item) for item in items])
+
+
+def decode_payload(
+    data: bytes,
+    fmt: str = JSON,
+    encoding: str | None = None,
+    machine_id: int | None = None,
+) -> pa.Table:
+    """Decode a telemetry payload into a sensor data table.
+
+    Raises ``ValidationError`` for row-oriented bodies that fail schema
+    validation and ``PayloadError`` for anything else that cannot be read.
+    """
+    data = decompress(data, encoding)
+    try:
+        if fmt == ARROW:
+            return normalize_table(ipc.open_stream(data).read_all(), machine_id)
+        obj = json.loads(data) if fmt == JSON else msgpack.unpackb(data, timestamp=3)
+        return _table_from_object(obj, machine_id)
+    except ValidationError:
+        raise
+    except (ValueError, TypeError, KeyError, pa.ArrowException, msgpack.UnpackException) as e:
+        raise PayloadError(f"Invalid {fmt} payload: {e}") from e
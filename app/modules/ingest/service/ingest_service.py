@@ -1,37 +1,155 @@
 """Ingest Service."""
 
-from sqlalchemy.orm import Session
+from collections import defaultdict
+from collections.abc import AsyncIterator
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.setting import settings
-from app.db.influx_db import client
-from app.modules.ingest.schema.ingest_schema import IngestSchema
-from app.modules.machine.service.machine_service import MachineService
+from app.db.influx_writer import InfluxWriter, influx_writer
+from app.lib.metrics import count_ingest
+from app.modules.ingest.schema.ingest_schema import (
+    ChunkResult,
+    IngestResult,
+    IngestSchema,
+    IngestStreamResult,
+    StreamRecord,
+    WriteStatus,
+)
+from app.modules.ingest.service.dedup import Deduplicator, deduplicator
+from app.modules.ingest.service.line_protocol import encode_table, records_to_table
+from app.modules.ingest.service.ndjson_reader import iter_batches, iter_lines
+from app.modules.machine.service.live_state import LiveState, live_state
+from app.modules.machine.service.machine_service import MachineService, cache_invalidator
+from app.modules.machine.service.rollup_service import RollupJob, rollup_job
+from app.modules.machine.service.rule_engine import RuleEngine, rule_engine
+from app.modules.machine.service.series_cache import CacheInvalidator
 from app.utils.logging import DevLogger
 
 logger = DevLogger("ingest_service", to_file=True).get()
 
+
 class IngestService:
     """Initialize Ingest service."""
 
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: AsyncSession,
+        writer: InfluxWriter = influx_writer,
+        live: LiveState = live_state,
+        rules: RuleEngine = rule_engine,
+        dedup: Deduplicator = deduplicator,
+        rollup: RollupJob = rollup_job,
+        cache: CacheInvalidator = cache_invalidator,
+    ):
         """Initialize constructor."""
         self.db = db
+        self.writer = writer
+        self.live = live
+        self.rules = rules
+        self.dedup = dedup
+        self.rollup = rollup
+        self.cache = cache
         self.machine_service = MachineService(db)
 
-    async def ingest_data(self, schema: IngestSchema):
+    async def ingest_data(self, schema: IngestSchema) -> IngestResult:
         """Ingest data."""
-        self.machine_service.fetch_machine(schema.machine_id)
-        logger.debug({"payload": schema.model_dump()})
+        await self.machine_service.fetch_machine(schema.machine_id)
+        logger.debug("Ingest payload: %s", schema)
+
+        return await self._enqueue(records_to_table(schema.machine_id, schema.sensor_data))
+
+    async def ingest_table(self, table: pa.Table) -> IngestResult:
+        """Ingest a decoded sensor data table covering one or more machines."""
+        for machine_id in pc.unique(table["machine_id"]).to_pylist():
+            await self.machine_service.fetch_machine(machine_id)
+        logger.debug("Ingest table: %s rows of %s", table.num_rows, table.schema)
+
+        return await self._enqueue(table)
+
+    async def _enqueue(self, table: pa.Table) -> IngestResult:
+        fresh = self.dedup.filter(table)
+        lines = encode_table(fresh)
+        status = await self.writer.enqueue(lines)
+        skipped = table.num_rows - fresh.num_rows
+        count_ingest("http", len(lines), skipped, rejected=status == WriteStatus.rejected)
+        if status == WriteStatus.rejected:
+            logger.warning("Ingest buffer full, rejected %s points", len(lines))
+        else:
+            self._observe(fresh)
+        return IngestResult(status=status, points=len(lines), pending=self.writer.pending, skipped=skipped)
+
+    def _observe(self, table: pa.Table) -> None:
+        # accepted points update live state, are checked against the rules,
+        # have their bins rolled up again when they arrive late and drop the
+        # cached history windows they land in
+        self.dedup.remember(table)
+        self.live.update(table)
+        self.rules.evaluate(table)
+        self.rollup.mark_late(table)
+        self.cache.mark(table)
+
+    async def ingest_stream(
+        self,
+        stream: AsyncIterator[bytes],
+        compressed: bool | None = None,
+        chunk_size: int = settings.INGEST_STREAM_CHUNK_SIZE,
+    ) -> IngestStreamResult:
+        """Ingest an NDJSON stream of StreamRecord lines chunk by chunk.
+
+        Each chunk is validated, encoded and enqueued before the next one is
+        read. When the writer rejects a chunk the stream stops and the
+        result records the line offset to resume from.
+        """
+        result = IngestStreamResult()
+        async for batch in iter_batches(iter_lines(stream, compressed), chunk_size):
+            chunk = await self._ingest_chunk(len(result.chunks), result.lines, batch)
+            result.chunks.append(chunk)
+            result.lines += chunk.lines
+            result.accepted += chunk.accepted
+            if chunk.status == WriteStatus.rejected:
+                result.completed = False
+                logger.warning("Ingest buffer full, stream stopped at line %s", chunk.offset)
+                break
+        return result
 
-        lines = []
-        for r in schema.sensor_data:
-            lines.append(
-                f"machine_sensor_data,"
-                f"machine_id={schema.machine_id} "
-                f"temperature={r.temperature},pressure={r.pressure},speed={r.speed} "
-                f"{int(r.timestamp.timestamp() * 1e9)}"
-            )
+    async def _ingest_chunk(self, index: int, offset: int, lines: list[bytes]) -> ChunkResult:
+        invalid = 0
+        by_machine: dict[int, list[StreamRecord]] = defaultdict(list)
+        for line in lines:
+            try:
+                record = StreamRecord.model_validate_json(line)
+            except ValidationError:
+                invalid += 1
+                continue
+            by_machine[record.machine_id].append(record)
 
-        client.write(database=settings.INFLUXDB_BUCKET, record=lines)
-        return lines
+        unknown = 0
+        tables = []
+        for machine_id, records in by_machine.items():
+            if await self.machine_service.machine_exists(machine_id):
+                tables.append(records_to_table(machine_id, records))
+            else:
+                unknown += len(records)
 
+        table = self.dedup.filter(pa.concat_tables(tables)) if tables else None
+        points = encode_table(table) if table is not None else []
+        status = await self.writer.enqueue(points) if points else WriteStatus.accepted
+        if points and status != WriteStatus.rejected:
+            self._observe(table)
+        skipped = len(lines) - invalid - unknown - len(points)
+        count_ingest("stream", len(points), skipped, rejected=status == WriteStatus.rejected)
+        accepted = 0 if status == WriteStatus.rejected else len(points)
+        return ChunkResult(
+            index=index,
+            offset=offset,
+            lines=len(lines),
+            accepted=accepted,
+            invalid=invalid,
+            unknown_machine=unknown,
+            skipped=skipped,
+            status=status,
+        )
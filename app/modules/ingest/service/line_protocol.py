@@ -0,0 +1,112 @@
+"""Columnar line-protocol encoder.
+
+Sensor data is turned into an Arrow table once and every line is then
+built with vectorized Arrow compute kernels, so encoding cost no longer
+grows with per-record Python string formatting.
+"""
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.modules.ingest.schema.ingest_schema import Record
+
+MEASUREMENT = "machine_sensor_data"
+FIELDS = ("temperature", "pressure", "speed")
+
+SENSOR_SCHEMA = pa.schema(
+    [
+        ("machine_id", pa.int64()),
+        ("time", pa.timestamp("ns", tz="UTC")),
+        *((name, pa.float64()) for name in FIELDS),
+    ]
+)
+
+
+def records_to_table(machine_id: int, records: list[Record]) -> pa.Table:
+    """Lay a machine's records out as sensor data columns."""
+    return pa.table(
+        {
+            "machine_id": pa.repeat(pa.scalar(machine_id, pa.int64()), len(records)),
+            "time": pa.array([r.timestamp for r in records], SENSOR_SCHEMA.field("time").type),
+            **{name: pa.array([getattr(r, name) for r in records], pa.float64()) for name in FIELDS},
+        },
+        schema=SENSOR_SCHEMA,
+    )
+
+
+def normalize_table(table: pa.Table, machine_id: int | None = None) -> pa.Table:
+    """Cast a decoded table onto the sensor data schema.
+
+    ``time`` may be a timestamp of any unit, epoch nanoseconds or ISO 8601
+    strings. Missing field columns become nulls. A given ``machine_id`` is
+    authoritative: a ``machine_id`` column may only repeat it. Without one,
+    the table must carry its own ``machine_id`` column.
+    """
+    if "time" not in table.column_names:
+        raise ValueError("time column is required")
+    if table["time"].null_count:
+        raise ValueError("time column must not contain nulls")
+
+    if "machine_id" in table.column_names:
+        if table["machine_id"].null_count:
+            raise ValueError("machine_id column must not contain nulls")
+        machine_ids = pc.cast(table["machine_id"], pa.int64())
+        if machine_id is not None and not pc.all(pc.equal(machine_ids, machine_id)).as_py():
+            raise ValueError(f"machine_id column does not match machine {machine_id}")
+    elif machine_id is not None:
+        machine_ids = pa.repeat(pa.scalar(machine_id, pa.int64()), table.num_rows)
+    else:
+        raise ValueError("machine_id is required")
+
+    time = table["time"]
+    if pa.types.is_integer(time.type):
+        time = pc.cast(time, pa.int64())
+
+    columns = {"machine_id": machine_ids, "time": pc.cast(time, SENSOR_SCHEMA.field("time").type)}
+    for name in FIELDS:
+        if name in table.column_names:
+            columns[name] = pc.cast(table[name], pa.float64())
+        else:
+            columns[name] = pa.nulls(table.num_rows, pa.float64())
+    return pa.table(columns, schema=SENSOR_SCHEMA)
+
+
+def escape_tag(values: pa.Array) -> pa.Array:
+    """Escape commas, spaces, equals signs and backslashes in tag values."""
+    return pc.replace_substring_regex(values, pattern=r"([,= \\])", replacement=r"\\\1")
+
+
+def _field_column(name: str, values: pa.ChunkedArray) -> pa.ChunkedArray:
+    # ",name=value" for finite values, "" for nulls/NaN/inf so rows can be
+    # concatenated without null handling and the leading comma stripped once
+    valid = pc.and_kleene(pc.is_valid(values), pc.is_finite(values)).fill_null(False)
+    encoded = pc.binary_join_element_wise(f",{name}=", pc.cast(values, pa.string()), "")
+    return pc.if_else(valid, encoded, "")
+
+
+def encode_table(table: pa.Table, measurement: str = MEASUREMENT, fields: tuple[str, ...] = FIELDS) -> list[str]:
+    """Encode a sensor data table as line protocol.
+
+    Null and non-finite field values are left out of their line, and rows
+    without any remaining field are dropped since InfluxDB rejects them.
+    """
+    if table.num_rows == 0:
+        return []
+
+    encoded = pc.binary_join_element_wise(*(_field_column(name, table[name]) for name in fields), "")
+    has_fields = pc.not_equal(encoded, "")
+    if not pc.all(has_fields).as_py():
+        table = table.filter(has_fields)
+        encoded = encoded.filter(has_fields)
+
+    prefix = pc.binary_join_element_wise(
+        f"{measurement},machine_id=", escape_tag(pc.cast(table["machine_id"], pa.string())), ""
+    )
+    timestamps = pc.cast(pc.cast(table["time"], pa.int64()), pa.string())
+    lines = pc.binary_join_element_wise(prefix, pc.utf8_slice_codeunits(encoded, 1), timestamps, " ")
+    return lines.to_pylist()
+
+
+def to_line_protocol(machine_id: int, records: list[Record]) -> list[str]:
+    """Encode one machine's records as machine_sensor_data lines."""
+    return encode_table(records_to_table(machine_id, records))
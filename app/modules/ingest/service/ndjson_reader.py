@@ -0,0 +1,64 @@
+"""NDJSON stream reader."""
+
+import zlib
+from collections.abc import AsyncIterator
+
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class LineTooLongError(ValueError):
+    """A single NDJSON line exceeded ``MAX_LINE_BYTES``."""
+
+
+async def iter_lines(stream: AsyncIterator[bytes], compressed: bool | None = None) -> AsyncIterator[bytes]:
+    """Yield non-empty lines from a byte stream, gunzipping it on the fly.
+
+    When ``compressed`` is None the gzip magic bytes at the start of the
+    stream decide. Only one partial line is ever held in memory, and gzip
+    input is inflated at most ``MAX_LINE_BYTES`` at a time.
+    """
+    decompressor = None
+    pending = b""
+    first = True
+
+    async for chunk in stream:
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if compressed or (compressed is None and chunk.startswith(GZIP_MAGIC)):
+                decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+
+        while chunk:
+            if decompressor is None:
+                data, chunk = chunk, b""
+            else:
+                data = decompressor.decompress(chunk, MAX_LINE_BYTES)
+                chunk = decompressor.unconsumed_tail
+
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+            if len(pending) > MAX_LINE_BYTES:
+                raise LineTooLongError(f"NDJSON line exceeds {MAX_LINE_BYTES} bytes")
+
+    if decompressor is not None:
+        pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line.strip():
+            yield line
+
+
+async def iter_batches(lines: AsyncIterator[bytes], size: int) -> AsyncIterator[list[bytes]]:
+    """Group lines into lists of at most ``size`` items."""
+    batch = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
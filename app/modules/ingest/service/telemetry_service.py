@@ -0,0 +1,113 @@
+"""Telemetry Service."""
+
+import re
+
+from pydantic import ValidationError
+
+from app.db.influx_writer import InfluxWriter, influx_writer
+from app.db.session import SessionLocal
+from app.lib.metrics import count_ingest
+from app.modules.ingest.schema.ingest_schema import WriteStatus
+from app.modules.ingest.service.dedup import Deduplicator, deduplicator
+from app.modules.ingest.service.ingest_codec import PayloadError, decode_payload, media_format
+from app.modules.ingest.service.line_protocol import encode_table
+from app.modules.machine.service.live_state import LiveState, live_state
+from app.modules.machine.service.machine_registry import MachineRegistry, machine_registry
+from app.modules.machine.service.machine_service import MachineService, cache_invalidator
+from app.modules.machine.service.rollup_service import RollupJob, rollup_job
+from app.modules.machine.service.rule_engine import RuleEngine, rule_engine
+from app.modules.machine.service.series_cache import CacheInvalidator
+from app.utils.logging import DevLogger
+
+logger = DevLogger("telemetry_service", to_file=True).get()
+
+TELEMETRY_TOPIC = "/factory/A/machine/+/telemetry"
+# an optional suffix selects the payload format, e.g. .../telemetry/msgpack
+TELEMETRY_TOPICS = (TELEMETRY_TOPIC, f"{TELEMETRY_TOPIC}/+")
+TOPIC_PATTERN = re.compile(r"^/factory/A/machine/(?P<machine_id>\d+)/telemetry(?:/(?P<format>json|msgpack|arrow))?$")
+
+
+def parse_topic(topic: str) -> tuple[int, str | None] | None:
+    """Extract the machine id and optional format suffix from a telemetry topic."""
+    match = TOPIC_PATTERN.match(topic)
+    return (int(match.group("machine_id")), match.group("format")) if match else None
+
+
+class TelemetryService:
+    """Turn MQTT telemetry messages into buffered InfluxDB points."""
+
+    def __init__(
+        self,
+        writer: InfluxWriter = influx_writer,
+        registry: MachineRegistry = machine_registry,
+        live: LiveState = live_state,
+        rules: RuleEngine = rule_engine,
+        dedup: Deduplicator = deduplicator,
+        rollup: RollupJob = rollup_job,
+        cache: CacheInvalidator = cache_invalidator,
+    ) -> None:
+        """Initialize."""
+        self.writer = writer
+        self.registry = registry
+        self.live = live
+        self.rules = rules
+        self.dedup = dedup
+        self.rollup = rollup
+        self.cache = cache
+
+    async def machine_exists(self, machine_id: int) -> bool:
+        """Check the registry, only opening a session for ids it has not seen.
+
+        A stale registry is not trusted: ``MachineService.machine_exists``
+        reloads it first, as it does for the HTTP path.
+        """
+        exists = None if self.registry.stale else self.registry.lookup(machine_id)
+        if exists is not None:
+            return exists
+        async with SessionLocal() as db:
+            return await MachineService(db).machine_exists(machine_id)
+
+    async def handle_message(self, topic: str, payload: bytes, content_type: str | None = None) -> bool:
+        """Validate a telemetry message and enqueue its points.
+
+        The payload is a ``Record``, a list of them or columnar arrays, as
+        JSON, msgpack or an Arrow IPC stream, optionally gzip/zstd
+        compressed. The topic suffix picks the format, then the MQTT
+        content type, then JSON. Returns ``False`` when the message was dropped.
+        """
+        parsed = parse_topic(topic)
+        if parsed is None:
+            logger.warning("Ignoring message on unexpected topic %s", topic)
+            return False
+        machine_id, fmt = parsed
+
+        if not await self.machine_exists(machine_id):
+            logger.warning("Ignoring telemetry for unknown machine %s", machine_id)
+            return False
+
+        try:
+            decoded = decode_payload(payload, fmt or media_format(content_type), machine_id=machine_id)
+        except (PayloadError, ValidationError) as e:
+            logger.error("Invalid telemetry received on %s: %s", topic, e)
+            return False
+
+        table = self.dedup.filter(decoded)
+        skipped = decoded.num_rows - table.num_rows
+        if table.num_rows == 0:
+            # a redelivery of points already written
+            count_ingest("mqtt", 0, skipped)
+            return True
+        if self.writer.submit(encode_table(table)) == WriteStatus.rejected:
+            count_ingest("mqtt", table.num_rows, rejected=True)
+            logger.warning("Ingest queue full, dropping %s points for machine %s", table.num_rows, machine_id)
+            return False
+        count_ingest("mqtt", table.num_rows, skipped)
+        self.dedup.remember(table)
+        self.live.update(table)
+        self.rules.evaluate(table)
+        self.rollup.mark_late(table)
+        self.cache.mark(table)
+        return True
+
+
+telemetry_service = TelemetryService()
@@ -1,12 +1,33 @@
 """Machine Endpoint."""
 
+import asyncio
+import json
+from collections.abc import AsyncIterator
 from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+import pyarrow as pa
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.setting import settings
 from app.db.session import get_db
-from app.modules.machine.schema.machine_schema import MachineSchema
+from app.modules.machine.model.rule_model import MachineRule
+from app.modules.machine.schema.machine_schema import LiveSubscription, MachineSchema, MachineState, RuleSchema
+from app.modules.machine.service import series_format
+from app.modules.machine.service.live_push import Subscription, live_hub
+from app.modules.machine.service.live_state import Reading, live_state
 from app.modules.machine.service.machine_service import MachineService
 from app.utils.base_response import BaseResponse
 
@@ -15,11 +36,20 @@ router = APIRouter(
     tags=["machines"],
 )
 
-def get_machine_service(db: Annotated[Session, Depends(get_db)]):
+def get_machine_service(db: Annotated[AsyncSession, Depends(get_db)]):
     """Get machine service."""
     return MachineService(db)
 
 
+def series_response(table: pa.Table, media_type: str, message: str) -> Response:
+    """Serialize a table for one of the non-default media types."""
+    if media_type == series_format.ARROW:
+        return Response(series_format.to_arrow(table), media_type=media_type)
+    if media_type == series_format.PARQUET:
+        return Response(series_format.to_parquet(table), media_type=media_type)
+    return Response(series_format.to_columnar_json(table, message), media_type=media_type)
+
+
 @router.post("", response_model=BaseResponse)
 async def create_machine(schema: MachineSchema, service: Annotated[MachineService, Depends(get_machine_service)],):
     """Create machine."""
@@ -27,14 +57,246 @@ async def create_machine(schema: MachineSchema, service: Annotated[MachineServic
     return BaseResponse(status=True, message="successfully creating machine", data=response)
 
 
-@router.get("/{machine_id}", response_model=BaseResponse[list[dict[str, Any]]])
+@router.get("/live", response_model=BaseResponse[list[MachineState]])
+async def get_live_states(
+    machine_ids: Annotated[
+        list[int] | None, Query(alias="machine_id", description="Machine ids, repeated; all machines when omitted.")
+    ] = None,
+):
+    """Get the latest reading of several or all machines."""
+    readings = await live_state.snapshot(machine_ids)
+    data = [MachineState.from_reading(machine_id, reading) for machine_id, reading in readings.items()]
+    return BaseResponse(status=True, message="successfully fetching live state", data=data)
+
+
+def push_interval(interval: int | None) -> int:
+    """Clamp a client-requested push interval to the configured minimum."""
+    return max(settings.LIVE_PUSH_MIN_INTERVAL, interval or settings.LIVE_PUSH_INTERVAL)
+
+
+def live_payload(readings: dict[int, Reading]) -> list[dict[str, Any]]:
+    """Render readings as MachineState dicts ready for JSON."""
+    return [MachineState.from_reading(m, r).model_dump(mode="json") for m, r in readings.items()]
+
+
+# what sending on a socket the client already closed raises, depending on the
+# server: Starlette's state checks, uvicorn's ClientDisconnected (an OSError)
+SEND_DISCONNECTS = (WebSocketDisconnect, RuntimeError, OSError)
+
+
+async def open_subscription(machine_ids: list[int] | None, interval: int | None) -> Subscription:
+    """Register a live client and queue the current readings as its first batch."""
+    subscription = live_hub.add(set(machine_ids) if machine_ids else None, push_interval(interval))
+    for machine_id, reading in (await live_state.snapshot(machine_ids)).items():
+        subscription.offer(machine_id, reading)
+    return subscription
+
+
+@router.websocket("/live/ws")
+async def live_socket(
+    websocket: WebSocket,
+    machine_ids: Annotated[list[int] | None, Query(alias="machine_id")] = None,
+    interval: Annotated[int | None, Query(description="Milliseconds between pushes.")] = None,
+):
+    """Push live readings to a WebSocket client.
+
+    The client may send ``{"machine_ids": [...], "interval": ms}`` at any
+    time to change what it receives.
+    """
+    await websocket.accept()
+    try:
+        subscription = await open_subscription(machine_ids, interval)
+    except OverflowError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+
+    async def send_json(message: dict[str, Any]) -> None:
+        try:
+            await websocket.send_json(message)
+        except SEND_DISCONNECTS as e:
+            raise WebSocketDisconnect() from e
+
+    async def send() -> None:
+        while True:
+            await send_json({"data": live_payload(await subscription.next_batch())})
+
+    async def receive() -> None:
+        while True:
+            try:
+                change = LiveSubscription.model_validate_json(await websocket.receive_text())
+            except ValidationError as e:
+                await send_json({"error": e.errors(include_url=False)})
+                continue
+            subscription.change(set(change.machine_ids) if change.machine_ids else None, push_interval(change.interval))
+
+    tasks = [asyncio.create_task(send()), asyncio.create_task(receive())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # a client going away ends the socket; anything else is a server error
+            if not isinstance(task.exception(), WebSocketDisconnect | None):
+                raise task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+        live_hub.remove(subscription)
+
+
+@router.get(
+    "/live/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {"text/event-stream": {}}, "description": "MachineState arrays as server-sent events."},
+        503: {"description": "This worker already serves the maximum number of live clients."},
+    },
+)
+async def live_stream(
+    machine_ids: Annotated[list[int] | None, Query(alias="machine_id")] = None,
+    interval: Annotated[int | None, Query(description="Milliseconds between pushes.")] = None,
+):
+    """Push live readings as server-sent events."""
+    try:
+        subscription = await open_subscription(machine_ids, interval)
+    except OverflowError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)) from e
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscription.next_batch(), settings.LIVE_PUSH_KEEPALIVE)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(live_payload(batch), separators=(',', ':'))}\n\n"
+        finally:
+            live_hub.remove(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.get(
+    "/fleet",
+    response_model=BaseResponse[dict[int, list[dict[str, Any]]]],
+    responses={
+        200: {
+            "content": {
+                series_format.COLUMNAR_JSON: {},
+                series_format.ARROW: {"schema": {"type": "string", "format": "binary"}},
+                series_format.PARQUET: {"schema": {"type": "string", "format": "binary"}},
+            },
+            "description": "Rows per machine id as JSON, or one table with a machine_id column per Accept.",
+        },
+        406: {"description": "None of the accepted media types can be produced."},
+    },
+)
+async def get_fleet(
+    service: Annotated[MachineService, Depends(get_machine_service)],
+    start_time: str = Query(..., example="2025-01-10T00:00:00Z"),
+    end_time: str = Query(..., example="2025-01-10T23:59:59Z"),
+    interval: str = Query(None, example="5m"),
+    machine_ids: Annotated[
+        list[int] | None, Query(alias="machine_id", description="Machine ids, repeated.", example=[1, 2])
+    ] = None,
+    location: Annotated[str | None, Query(description="Only machines at this location.")] = None,
+    sensor_type: Annotated[str | None, Query(description="Only machines with this sensor type.")] = None,
+    fields: Annotated[list[str] | None, Query(description="Fields to return, comma-separated or repeated.")] = None,
+    aggregates: Annotated[list[str] | None, Query(description="Per-bin aggregates; requires interval.")] = None,
+    accept: Annotated[str | None, Header()] = None,
+):
+    """Get data for a fleet of machines in one request."""
+    try:
+        media_type = series_format.negotiate(accept)
+    except series_format.NotAcceptableError as e:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(e)) from e
+
+    ids = await service.find_machines(machine_ids, location, sensor_type)
+    tables = await service.get_machines(ids, start_time, end_time, interval, fields, aggregates)
+    message = "successfully fetching data"
+    if media_type == series_format.JSON:
+        data = {machine_id: series_format.to_rows(table) for machine_id, table in tables.items()}
+        return BaseResponse(status=True, message=message, data=data)
+    return series_response(series_format.stack(tables), media_type, message)
+
+
+@router.get("/{machine_id}/live", response_model=BaseResponse[MachineState])
+async def get_live_state(machine_id: int, service: Annotated[MachineService, Depends(get_machine_service)]):
+    """Get the latest reading of one machine."""
+    reading = await live_state.get(machine_id)
+    if reading is None:
+        await service.fetch_machine(machine_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No live data for machine")
+    return BaseResponse(
+        status=True, message="successfully fetching live state", data=MachineState.from_reading(machine_id, reading)
+    )
+
+
+@router.get(
+    "/{machine_id}",
+    response_model=BaseResponse[list[dict[str, Any]]],
+    responses={
+        200: {
+            "content": {
+                series_format.COLUMNAR_JSON: {},
+                series_format.ARROW: {"schema": {"type": "string", "format": "binary"}},
+                series_format.PARQUET: {"schema": {"type": "string", "format": "binary"}},
+            },
+            "description": "Rows as JSON, or the same table as columnar JSON, Arrow IPC or Parquet per Accept.",
+        },
+        406: {"description": "None of the accepted media types can be produced."},
+    },
+)
 async def get_machines(
     machine_id: int,
     service: Annotated[MachineService, Depends(get_machine_service)],
     start_time: str = Query(..., example="2025-01-10T00:00:00Z"),
     end_time: str = Query(..., example="2025-01-10T23:59:59Z"),
     interval: str = Query(None, example="5m"),
+    fields: Annotated[
+        list[str] | None, Query(description="Fields to return, comma-separated or repeated.", example="speed")
+    ] = None,
+    aggregates: Annotated[
+        list[str] | None,
+        Query(
+            description="Per-bin aggregates (avg, min, max, count, stddev, first, last, pNN); requires interval.",
+            example="min,max,p95",
+        ),
+    ] = None,
+    accept: Annotated[str | None, Header()] = None,
 ):
     """Get machines."""
-    response = await service.get_machine(machine_id, start_time, end_time, interval)
-    return BaseResponse(status=True, message="successfully fetching data", data=response)
+    try:
+        media_type = series_format.negotiate(accept)
+    except series_format.NotAcceptableError as e:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(e)) from e
+
+    table = await service.get_machine(machine_id, start_time, end_time, interval, fields, aggregates)
+    message = "successfully fetching data"
+    if media_type == series_format.JSON:
+        return BaseResponse(status=True, message=message, data=series_format.to_rows(table))
+    return series_response(table, media_type, message)
+
+
+@router.get("/{machine_id}/rules", response_model=BaseResponse[list[MachineRule]])
+async def get_rules(machine_id: int, service: Annotated[MachineService, Depends(get_machine_service)]):
+    """Get a machine's alert rules."""
+    rules = await service.get_rules(machine_id)
+    return BaseResponse(status=True, message="successfully fetching rules", data=rules)
+
+
+@router.post("/{machine_id}/rules", response_model=BaseResponse[MachineRule], status_code=status.HTTP_201_CREATED)
+async def create_rule(
+    machine_id: int, schema: RuleSchema, service: Annotated[MachineService, Depends(get_machine_service)]
+):
+    """Create an alert rule for a machine."""
+    rule = await service.create_rule(machine_id, schema)
+    return BaseResponse(status=True, message="successfully creating rule", data=rule)
+
+
+@router.delete("/{machine_id}/rules/{rule_id}", response_model=BaseResponse)
+async def delete_rule(
+    machine_id: int, rule_id: int, service: Annotated[MachineService, Depends(get_machine_service)]
+):
+    """Delete an alert rule."""
+    await service.delete_rule(machine_id, rule_id)
+    return BaseResponse(status=True, message="successfully deleting rule")
@@ -0,0 +1,35 @@
+"""Machine Rule Model."""
+
+from datetime import datetime
+from enum import StrEnum
+
+from sqlmodel import Field, SQLModel
+
+from app.utils.time import now_utc
+
+
+class RuleKind(StrEnum):
+    """Rule kind."""
+
+    threshold = "threshold"  # value outside [min_value, max_value]
+    rate = "rate"  # change faster than max_rate units per second
+    zscore = "zscore"  # more than z_limit deviations from the last `window` points
+
+
+class MachineRule(SQLModel, table=True):
+    """Alert rule on one sensor field of a machine."""
+
+    __tablename__ = "machine_rule"
+
+    id: int | None = Field(default=None, primary_key=True)
+    machine_id: int = Field(foreign_key="machine_metadata.id", nullable=False, index=True)
+    field: str = Field(nullable=False, max_length=50)
+    kind: RuleKind = Field(nullable=False)
+    min_value: float | None = Field(default=None)
+    max_value: float | None = Field(default=None)
+    max_rate: float | None = Field(default=None)
+    window: int | None = Field(default=None)
+    z_limit: float | None = Field(default=None)
+    enabled: bool = Field(default=True, nullable=False)
+    created_at: datetime = Field(default_factory=now_utc)
+    updated_at: datetime = Field(default_factory=now_utc)
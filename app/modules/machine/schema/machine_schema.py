@@ -1,8 +1,13 @@
 """Machine Schema."""
 
-from pydantic import BaseModel
+from datetime import UTC, datetime
+from typing import Self
 
+from pydantic import BaseModel, Field, model_validator
+
+from app.modules.ingest.service.line_protocol import FIELDS
 from app.modules.machine.model.machine_model import StatusEnum
+from app.modules.machine.model.rule_model import RuleKind
 
 
 class MachineSchema(BaseModel):
@@ -21,3 +26,55 @@ class SensorData(BaseModel):
     temperature: float
     pressure: float
     speed: float
+
+
+class MachineState(BaseModel):
+    """Latest reading of a machine."""
+
+    machine_id: int
+    time: datetime
+    temperature: float | None = None
+    pressure: float | None = None
+    speed: float | None = None
+
+    @classmethod
+    def from_reading(cls, machine_id: int, reading: dict) -> "MachineState":
+        """Build from a live-state reading with an epoch-nanosecond time."""
+        return cls(
+            machine_id=machine_id,
+            time=datetime.fromtimestamp(reading["time"] / 1e9, UTC),
+            **{key: value for key, value in reading.items() if key != "time"},
+        )
+
+
+class LiveSubscription(BaseModel):
+    """Change of a WebSocket client's live subscription."""
+
+    machine_ids: list[int] | None = None
+    interval: int | None = None
+
+
+class RuleSchema(BaseModel):
+    """Machine rule create schema."""
+
+    field: str
+    kind: RuleKind
+    min_value: float | None = None
+    max_value: float | None = None
+    max_rate: float | None = Field(default=None, gt=0)
+    window: int | None = Field(default=None, ge=2, le=10000)
+    z_limit: float | None = Field(default=None, gt=0)
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def check_parameters(self) -> Self:
+        """Require the parameters of the chosen kind."""
+        if self.field not in FIELDS:
+            raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+        if self.kind == RuleKind.threshold and self.min_value is None and self.max_value is None:
+            raise ValueError("threshold rules need min_value or max_value")
+        if self.kind == RuleKind.rate and self.max_rate is None:
+            raise ValueError("rate rules need max_rate")
+        if self.kind == RuleKind.zscore and (self.window is None or self.z_limit is None):
+            raise ValueError("zscore rules need window and z_limit")
+        return self
@@ -0,0 +1,136 @@
+"""Live telemetry push.
+
+Every worker runs one ``LiveHub`` listening on the live-state updates
+channel, so a reading ingested by any worker reaches the WebSocket and SSE
+clients of all of them. Each client gets a ``Subscription`` that keeps at
+most one pending reading per machine: updates arriving faster than the
+client's interval replace each other (latest-value downsampling), so a
+slow client costs a bounded amount of memory and never delays the others.
+"""
+
+import asyncio
+import contextlib
+
+from app.core.setting import settings
+from app.lib.redis import RedisClient, redis_client
+from app.modules.machine.service.live_state import UPDATES_CHANNEL, Reading
+from app.utils.logging import DevLogger
+
+logger = DevLogger("live_push", to_file=True).get()
+
+RESUBSCRIBE_DELAY = 1.0
+
+
+class Subscription:
+    """One client's machines, push interval and coalesced pending readings."""
+
+    def __init__(self, machine_ids: set[int] | None, interval: int):
+        """Initialize with ``interval`` in milliseconds; ``None`` ids means every machine."""
+        self.machine_ids = machine_ids
+        self.interval = interval / 1000
+        self._pending: dict[int, Reading] = {}
+        self._sent: dict[int, int] = {}
+        self._ready = asyncio.Event()
+        self._last = float("-inf")
+
+    def change(self, machine_ids: set[int] | None, interval: int) -> None:
+        """Switch machines or interval without reconnecting."""
+        self.machine_ids = machine_ids
+        self.interval = interval / 1000
+        if machine_ids is not None:
+            self._pending = {m: r for m, r in self._pending.items() if m in machine_ids}
+
+    def offer(self, machine_id: int, reading: Reading) -> None:
+        """Queue a reading, replacing any pending one of the same machine."""
+        if self.machine_ids is not None and machine_id not in self.machine_ids:
+            return
+        newest = max(self._sent.get(machine_id, -1), self._pending.get(machine_id, {}).get("time", -1))
+        if reading["time"] <= newest:
+            return
+        self._pending[machine_id] = reading
+        self._ready.set()
+
+    async def next_batch(self) -> dict[int, Reading]:
+        """Wait for pending readings, no sooner than one interval after the last batch.
+
+        Safe to cancel, e.g. by a keepalive timeout: nothing is taken from
+        the pending readings until the batch is returned.
+        """
+        loop = asyncio.get_running_loop()
+        delay = self._last + self.interval - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        while not self._pending:
+            self._ready.clear()
+            await self._ready.wait()
+
+        batch, self._pending = self._pending, {}
+        for machine_id, reading in batch.items():
+            self._sent[machine_id] = reading["time"]
+        self._last = loop.time()
+        return batch
+
+
+class LiveHub:
+    """Fan live-state updates out to the subscriptions of this worker."""
+
+    def __init__(self, redis: RedisClient = redis_client, max_subscribers: int = settings.LIVE_PUSH_MAX_SUBSCRIBERS):
+        """Initialize hub settings."""
+        self._redis = redis
+        self._max_subscribers = max_subscribers
+        self._subscriptions: set[Subscription] = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscribers(self) -> int:
+        """Number of connected clients."""
+        return len(self._subscriptions)
+
+    async def start(self) -> None:
+        """Start listening for live-state updates."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="live-hub")
+            logger.info("Live hub started.")
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Live hub stopped.")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async for readings in self._redis.subscribe(UPDATES_CHANNEL):
+                    if readings:
+                        self.dispatch({int(machine_id): reading for machine_id, reading in readings.items()})
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Live hub subscription failed, resubscribing: {e}")
+            await asyncio.sleep(RESUBSCRIBE_DELAY)
+
+    def dispatch(self, readings: dict[int, Reading]) -> None:
+        """Offer readings to every subscription."""
+        for subscription in self._subscriptions:
+            for machine_id, reading in readings.items():
+                subscription.offer(machine_id, reading)
+
+    def add(self, machine_ids: set[int] | None, interval: int) -> Subscription:
+        """Register a client, raising ``OverflowError`` when this worker is full."""
+        if len(self._subscriptions) >= self._max_subscribers:
+            raise OverflowError("Too many live subscribers")
+        subscription = Subscription(machine_ids, interval)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def remove(self, subscription: Subscription) -> None:
+        """Unregister a client."""
+        self._subscriptions.discard(subscription)
+
+
+live_hub = LiveHub()
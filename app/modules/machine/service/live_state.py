@@ -0,0 +1,202 @@
+"""Live machine state.
+
+The ingest paths hand every accepted table to ``LiveState.update``, which
+keeps the newest reading of each machine in memory. Changed machines are
+written to the ``machine:live`` Redis hash every ``flush_interval``
+milliseconds, so every worker can answer snapshot reads with a single
+HMGET/HGETALL and no time-series query. Each flush is also published on
+``machine:live:updates`` for the push hub of every worker.
+
+Every field of a reading is its own ``<machine id>:<field>`` hash field
+with its own time, so partial readings of one machine flushed by
+different workers merge instead of replacing each other.
+"""
+
+import asyncio
+import contextlib
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.core.setting import settings
+from app.lib.redis import RedisClient, redis_client
+from app.modules.ingest.service.line_protocol import FIELDS
+from app.utils.logging import DevLogger
+
+logger = DevLogger("live_state", to_file=True).get()
+
+STATE_KEY = "machine:live"
+TIME_KEY = "machine:live:time"
+UPDATES_CHANNEL = "machine:live:updates"
+
+# Each field is written only when its value is at least as new as the stored
+# one, so a worker flushing late never rolls another worker's newer value
+# back. ARGV holds (<machine id>:<field>, epoch ns, encoded value) triples.
+UPDATE_SCRIPT = """
+for i = 1, #ARGV, 3 do
+    local stored = tonumber(redis.call('HGET', KEYS[2], ARGV[i]) or '-1')
+    if tonumber(ARGV[i + 1]) >= stored then
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+        redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 2])
+    end
+end
+return 1
+"""
+
+Reading = dict[str, Any]
+KEYS = ("time", *FIELDS)
+
+
+def latest_rows(table: pa.Table) -> list[Reading]:
+    """Newest time and last non-null value of every field, per machine.
+
+    The time each field was last set is returned as ``<field>_time``.
+    """
+    if table.num_rows == 0:
+        return []
+    ordered = table.select(["machine_id", "time", *FIELDS]).sort_by("time")
+    time = pc.cast(ordered["time"], pa.int64())
+    ordered = ordered.set_column(1, "time", time)
+    for field in FIELDS:
+        ordered = ordered.append_column(f"{field}_time", pc.if_else(pc.is_valid(ordered[field]), time, None))
+    grouped = ordered.group_by("machine_id", use_threads=False).aggregate(
+        [("time", "max"), *((field, "last") for field in FIELDS), *((f"{field}_time", "max") for field in FIELDS)]
+    )
+    return grouped.rename_columns(
+        {
+            "time_max": "time",
+            **{f"{field}_last": field for field in FIELDS},
+            **{f"{field}_time_max": f"{field}_time" for field in FIELDS},
+        }
+    ).to_pylist()
+
+
+def members(machine_id: int) -> list[str]:
+    """Hash fields holding a machine's reading."""
+    return [f"{machine_id}:{key}" for key in KEYS]
+
+
+def merge(newer: Reading, older: Reading) -> Reading:
+    """Fill the null fields of a reading from an older one."""
+    return {key: older[key] if value is None else value for key, value in newer.items()}
+
+
+class LiveState:
+    """Latest reading per machine, kept in memory and mirrored to Redis."""
+
+    def __init__(
+        self,
+        redis: RedisClient = redis_client,
+        flush_interval: int = settings.LIVE_STATE_FLUSH_INTERVAL,
+    ):
+        """Initialize state settings."""
+        self._redis = redis
+        self._flush_interval = flush_interval / 1000
+        self._latest: dict[int, Reading] = {}
+        self._times: dict[int, dict[str, int]] = {}
+        self._dirty: set[int] = set()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the background flush task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="live-state")
+            logger.info(f"Live state started (flush every {self._flush_interval * 1000:.0f}ms)")
+
+    async def stop(self) -> None:
+        """Stop the flush task and write out pending readings."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        await self.flush()
+        logger.info("Live state stopped.")
+
+    def update(self, table: pa.Table) -> None:
+        """Record the newest reading of every machine in a sensor data table.
+
+        Each field takes the new value only when it is at least as new as
+        the one already held; fields that are null keep their value.
+        """
+        for row in latest_rows(table):
+            machine_id = row.pop("machine_id")
+            reading = self._latest.setdefault(machine_id, dict.fromkeys(KEYS))
+            times = self._times.setdefault(machine_id, {})
+            changed = False
+            for key in KEYS:
+                time = row["time"] if key == "time" else row.pop(f"{key}_time")
+                if time is not None and time >= times.get(key, -1):
+                    times[key] = time
+                    reading[key] = row[key]
+                    changed = True
+            if changed:
+                self._dirty.add(machine_id)
+
+    async def flush(self) -> None:
+        """Write changed readings to Redis."""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        args = []
+        for machine_id in dirty:
+            for key, time in self._times[machine_id].items():
+                args += [f"{machine_id}:{key}", time, self._redis.encode(self._latest[machine_id][key])]
+        if await self._redis.run_script(UPDATE_SCRIPT, [STATE_KEY, TIME_KEY], args) is None:
+            # keep them for the next flush
+            self._dirty |= dirty
+            return
+        # publish the merged readings, which may hold fields other workers wrote
+        readings = await self._stored(sorted(dirty))
+        # msgpack map keys must be strings to be read back
+        await self._redis.publish(
+            UPDATES_CHANNEL,
+            {str(machine_id): readings.get(machine_id) or self._latest[machine_id] for machine_id in dirty},
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Live state flush failed: {e}")
+
+    def _newest(self, machine_id: int, stored: Reading | None) -> Reading | None:
+        # this worker may hold a reading it has not flushed yet
+        local = self._latest.get(machine_id)
+        if stored is None or local is None:
+            return local or stored
+        return merge(local, stored) if local["time"] > stored["time"] else merge(stored, local)
+
+    async def _stored(self, machine_ids: list[int]) -> dict[int, Reading]:
+        fields = [member for machine_id in machine_ids for member in members(machine_id)]
+        values = iter(await self._redis.hmget(STATE_KEY, fields))
+        readings = {machine_id: dict(zip(KEYS, values, strict=False)) for machine_id in machine_ids}
+        return {machine_id: reading for machine_id, reading in readings.items() if reading["time"] is not None}
+
+    async def get(self, machine_id: int) -> Reading | None:
+        """Latest reading of one machine, None if it has not reported yet."""
+        stored = await self._stored([machine_id])
+        return self._newest(machine_id, stored.get(machine_id))
+
+    async def snapshot(self, machine_ids: list[int] | None = None) -> dict[int, Reading]:
+        """Latest readings of the given machines, or of every machine that reported."""
+        if machine_ids is None:
+            stored: dict[int, Reading] = {}
+            for member, value in (await self._redis.hgetall(STATE_KEY)).items():
+                machine_id, _, key = member.partition(":")
+                if key in KEYS:
+                    stored.setdefault(int(machine_id), dict.fromkeys(KEYS))[key] = value
+            stored = {machine_id: reading for machine_id, reading in stored.items() if reading["time"] is not None}
+            machine_ids = sorted(stored.keys() | self._latest.keys())
+        else:
+            stored = await self._stored(machine_ids)
+
+        readings = {machine_id: self._newest(machine_id, stored.get(machine_id)) for machine_id in machine_ids}
+        return {machine_id: reading for machine_id, reading in readings.items() if reading is not None}
+
+
+live_state = LiveState()
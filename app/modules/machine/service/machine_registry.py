@@ -0,0 +1,82 @@
+"""Machine Registry."""
+
+import time
+from collections.abc import Iterable
+
+from app.core.setting import settings
+from app.lib.metrics import count_cache
+
+
+class MachineRegistry:
+    """In-memory set of known machine ids with negative caching.
+
+    The full id set is loaded in one bulk query and considered fresh for
+    ``ttl`` seconds. Ids confirmed missing are remembered for
+    ``negative_ttl`` seconds so repeated lookups of unknown machines do
+    not reach Postgres either.
+    """
+
+    def __init__(
+        self,
+        ttl: int = settings.MACHINE_CACHE_TTL,
+        negative_ttl: int = settings.MACHINE_CACHE_NEGATIVE_TTL,
+        max_missing: int = 10000,
+    ):
+        """Initialize registry settings."""
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_missing = max_missing
+        self._known: set[int] = set()
+        self._missing: dict[int, float] = {}
+        self._loaded_at: float | None = None
+
+    @property
+    def stale(self) -> bool:
+        """Whether the id set needs a bulk reload."""
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._ttl
+
+    def warm(self, machine_ids: Iterable[int]) -> None:
+        """Replace the known id set with a fresh bulk load."""
+        self._known = set(machine_ids)
+        self._missing = {k: v for k, v in self._missing.items() if k not in self._known}
+        self._loaded_at = time.monotonic()
+
+    def lookup(self, machine_id: int) -> bool | None:
+        """Return True/False when the answer is cached, None when it is not."""
+        if machine_id in self._known:
+            count_cache("machine", 1, 0)
+            return True
+
+        expires_at = self._missing.get(machine_id)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                count_cache("machine", 1, 0)
+                return False
+            del self._missing[machine_id]
+        count_cache("machine", 0, 1)
+        return None
+
+    def add(self, machine_id: int) -> None:
+        """Mark a machine id as existing."""
+        self._missing.pop(machine_id, None)
+        self._known.add(machine_id)
+
+    def add_missing(self, machine_id: int) -> None:
+        """Mark a machine id as not existing."""
+        if len(self._missing) >= self._max_missing:
+            # dicts keep insertion order, so this evicts the oldest entry
+            self._missing.pop(next(iter(self._missing)))
+        self._missing[machine_id] = time.monotonic() + self._negative_ttl
+
+    def invalidate(self, machine_id: int | None = None) -> None:
+        """Forget one machine id, or everything when no id is given."""
+        if machine_id is None:
+            self._known.clear()
+            self._missing.clear()
+            self._loaded_at = None
+            return
+        self._known.discard(machine_id)
+        self._missing.pop(machine_id, None)
+
+
+machine_registry = MachineRegistry()
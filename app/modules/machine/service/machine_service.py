@@ -1,86 +1,308 @@
 """Machine Service."""
 
+from datetime import datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.influx_db import client
-from app.lib.redis import RedisClient
+from app.core.setting import settings
+from app.db.influx_query import QueryTimeoutError, influx_query
+from app.lib.redis import redis_client
 from app.modules.machine.model.machine_model import Machine
-from app.modules.machine.schema.machine_schema import MachineSchema
+from app.modules.machine.model.rule_model import MachineRule
+from app.modules.machine.schema.machine_schema import MachineSchema, RuleSchema
+from app.modules.machine.service.machine_registry import machine_registry
+from app.modules.machine.service.rollup_service import TIERS, Coverage, Tier, iso, rollup_job
+from app.modules.machine.service.rule_engine import rule_engine
+from app.modules.machine.service.series_cache import BatchQuery, CacheInvalidator, Query, SeriesCache
+from app.modules.machine.service.series_spec import SeriesSpec
 from app.utils.logging import DevLogger
+from app.utils.time import parse_interval, parse_time
 
 logger = DevLogger(name="machine_service", to_file=True).get()
 
-redis_client = RedisClient()  # shared instance
+
+def machine_series(machine_id: int) -> str:
+    """Cache key prefix shared by every series of a machine."""
+    return f"machine:{machine_id}:data"
+
+
+series_cache = SeriesCache(redis_client)
+cache_invalidator = CacheInvalidator(series_cache, machine_series)
+
+
+def parse_range(
+    start_time: str,
+    end_time: str,
+    interval: str | None,
+    fields: list[str] | None = None,
+    aggregates: list[str] | None = None,
+) -> tuple[datetime, datetime, SeriesSpec]:
+    """Parse query bounds, interval and columns, answering 400 when they are malformed."""
+    try:
+        step = parse_interval(interval) if interval else None
+        return parse_time(start_time), parse_time(end_time), SeriesSpec(step, fields, aggregates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def series_key(machine_id: int, spec: SeriesSpec) -> str:
+    """Cache key prefix of a machine's series at one interval and column set."""
+    return f"{machine_series(machine_id)}:{spec.key}"
+
+
+def plan_series(step: timedelta, lo: int, hi: int, coverage: dict[str, Coverage]) -> list[tuple[Tier | None, int, int]]:
+    """Split ``lo <= time < hi`` (epoch seconds) between rollups and raw data.
+
+    The coarsest tier whose resolution divides ``step`` and that covers part
+    of the range is used for the bins it fully covers; raw points fill in
+    before its origin and after its watermark (the live edge). Segments are
+    returned oldest first, ``None`` standing for raw data.
+    """
+    seconds = int(step.total_seconds())
+    for tier in reversed(TIERS):
+        covered = coverage.get(tier.name)
+        if covered is None or seconds % tier.seconds:
+            continue
+        start = max(lo, -(-covered.origin // seconds) * seconds)
+        end = min(hi, covered.watermark // seconds * seconds)
+        if start < end:
+            segments = [(None, lo, start), (tier, start, end), (None, end, hi)]
+            return [(source, a, b) for source, a, b in segments if a < b]
+    return [(None, lo, hi)]
+
+
+async def run_query(sql: str, parameters: dict[str, str]) -> pa.Table:
+    """Run a history query, answering 504 when InfluxDB times out."""
+    try:
+        return await influx_query.query(sql, parameters)
+    except QueryTimeoutError as e:
+        raise HTTPException(status_code=504, detail="Query timed out") from e
+
+
+async def read_segments(
+    spec: SeriesSpec, schema: pa.Schema, lo: datetime, hi: datetime, parameters: dict[str, str], **sql
+) -> pa.Table:
+    """Read ``lo <= time < hi`` newest first in ``schema``, from rollups where the spec allows it."""
+    lo_s, hi_s = int(lo.timestamp()), int(hi.timestamp())
+    segments = (
+        plan_series(spec.step, lo_s, hi_s, await rollup_job.coverage())
+        if spec.rollup_compatible
+        else [(None, lo_s, hi_s)]
+    )
+    tables = [
+        (await run_query(spec.sql(tier, **sql), parameters | {"start": iso(a), "end": iso(b)}))
+        .select(schema.names)
+        .cast(schema)
+        for tier, a, b in reversed(segments)
+    ]
+    return pa.concat_tables(tables)
+
+
+def series_query(machine_id: int, spec: SeriesSpec) -> Query:
+    """Build the InfluxDB loader for a machine's series."""
+    async def query(lo: datetime, hi: datetime) -> pa.Table:
+        return await read_segments(spec, spec.schema, lo, hi, {"machine_id": str(machine_id)})
+
+    return query
+
+
+def fleet_query(machines: dict[str, int], spec: SeriesSpec) -> BatchQuery:
+    """Build the InfluxDB loader reading many machines' series in one grouped query.
+
+    ``machines`` maps cache key prefixes to machine ids; the result is split
+    back per prefix on the ``machine_id`` column.
+    """
+    schema = pa.schema([("machine_id", pa.string()), *spec.schema])
+
+    async def query(prefixes: list[str], lo: datetime, hi: datetime) -> dict[str, pa.Table]:
+        ids = [str(machines[prefix]) for prefix in prefixes]
+        parameters = {f"machine_{i}": machine_id for i, machine_id in enumerate(ids)}
+        table = await read_segments(spec, schema, lo, hi, parameters, machines=len(ids))
+        column = table["machine_id"]
+        return {
+            prefix: table.filter(pc.equal(column, machine_id)).drop_columns("machine_id")
+            for prefix, machine_id in zip(prefixes, ids, strict=True)
+        }
+
+    return query
+
 
 class MachineService:
     """Machine Service."""
 
-    def __init__(self, db: Session) -> None:
+    def __init__(self, db: AsyncSession) -> None:
         """Initialize."""
         self.db = db
 
-    def fetch_machine(self, machine_id: int):
+    async def warm_registry(self) -> None:
+        """Load every machine id into the registry in one query."""
+        result = await self.db.execute(select(Machine.id))
+        machine_registry.warm(result.scalars())
+
+    async def machine_exists(self, machine_id: int) -> bool:
+        """Check a machine id against the registry, falling back to Postgres."""
+        if machine_registry.stale:
+            await self.warm_registry()
+
+        exists = machine_registry.lookup(machine_id)
+        if exists is None:
+            exists = await self.db.get(Machine, machine_id) is not None
+            if exists:
+                machine_registry.add(machine_id)
+            else:
+                machine_registry.add_missing(machine_id)
+        return exists
+
+    async def missing_machines(self, machine_ids: list[int]) -> list[int]:
+        """Return the ids that do not exist, asking Postgres once for those the registry cannot answer."""
+        if machine_registry.stale:
+            await self.warm_registry()
+
+        answers = {machine_id: machine_registry.lookup(machine_id) for machine_id in machine_ids}
+        unknown = [machine_id for machine_id, exists in answers.items() if exists is None]
+        if unknown:
+            found = set((await self.db.execute(select(Machine.id).where(Machine.id.in_(unknown)))).scalars())
+            for machine_id in unknown:
+                answers[machine_id] = machine_id in found
+                if machine_id in found:
+                    machine_registry.add(machine_id)
+                else:
+                    machine_registry.add_missing(machine_id)
+        return [machine_id for machine_id, exists in answers.items() if not exists]
+
+    async def fetch_machine(self, machine_id: int):
         """Fetch machine."""
-        machine = self.db.query(Machine).filter(Machine.id == machine_id).first()
-        if not machine:
+        if not await self.machine_exists(machine_id):
             raise HTTPException(status_code=404, detail="Machine not found")
 
 
-    async def get_machine(self, machine_id: int, start_time: str, end_time: str, interval: str = None):
-        """Get machines."""
+    async def get_machine(
+        self,
+        machine_id: int,
+        start_time: str,
+        end_time: str,
+        interval: str = None,
+        fields: list[str] | None = None,
+        aggregates: list[str] | None = None,
+    ) -> pa.Table:
+        """Get machine data as an Arrow table, newest first."""
         # check machine
-        self.fetch_machine(machine_id)
-
-        # check redis
-        redis_key = f"machine:{machine_id}:data:{start_time}:{end_time}:{interval}"
-        redis_data = await redis_client.get(redis_key)
-        if redis_data:
-            return redis_data
-
-        logger.debug({"payload": {"machine_id": machine_id, "start_time": start_time, "end_time": end_time, "interval": interval}})  # noqa: E501
-
-        if interval:
-            time_column = f"date_bin('{interval}', time)::varchar AS time"
-            select_fields = """
-                AVG(temperature) AS temperature,
-                AVG(pressure) AS pressure,
-                AVG(speed) AS speed
-            """
-            group_by = f"GROUP BY date_bin('{interval}', time)"
-            order_by = f"ORDER BY date_bin('{interval}', time) DESC"
-        else:
-            time_column = "time::varchar AS time"
-            select_fields = """
-                temperature,
-                pressure,
-                speed
-            """
-            group_by = ""
-            order_by = "ORDER BY time Desc"
-
-        sql = f"""
-            SELECT
-                {time_column},
-                {select_fields}
-            FROM machine_sensor_data
-            WHERE time >= '{start_time}'
-            AND time <= '{end_time}'
-            AND machine_id = {machine_id}
-            {group_by}
-            {order_by}
+        await self.fetch_machine(machine_id)
+
+        start, end, spec = parse_range(start_time, end_time, interval, fields, aggregates)
+        logger.debug(
+            "History query for machine %s: %s to %s every %s, %s of %s",
+            machine_id, start, end, spec.step, spec.aggregates, spec.fields,
+        )
+
+        return await series_cache.fetch(
+            series_key(machine_id, spec), start, end, spec.step, spec.schema, series_query(machine_id, spec)
+        )
+
+    async def get_machines(
+        self,
+        machine_ids: list[int],
+        start_time: str,
+        end_time: str,
+        interval: str = None,
+        fields: list[str] | None = None,
+        aggregates: list[str] | None = None,
+    ) -> dict[int, pa.Table]:
+        """Get data for several machines.
+
+        All cached windows are read in one Redis round trip and whatever is
+        missing for any machine is loaded with one grouped InfluxDB query.
+        """
+        start, end, spec = parse_range(start_time, end_time, interval, fields, aggregates)
+        machines = {series_key(machine_id, spec): machine_id for machine_id in machine_ids}
+        results = await series_cache.fetch_batch(
+            list(machines), start, end, spec.step, spec.schema, fleet_query(machines, spec)
+        )
+        return {machine_id: results[prefix] for prefix, machine_id in machines.items()}
+
+    async def find_machines(
+        self,
+        machine_ids: list[int] | None = None,
+        location: str | None = None,
+        sensor_type: str | None = None,
+    ) -> list[int]:
+        """Resolve a fleet filter to machine ids.
+
+        Explicit ids are capped at ``FLEET_MAX_MACHINES`` before anything is
+        looked up, then must all exist (404 otherwise), checked against the
+        registry with one query for the rest; ``location`` and
+        ``sensor_type`` use their indexed columns in Postgres.
         """
+        if not (machine_ids or location or sensor_type):
+            raise HTTPException(status_code=400, detail="Provide machine ids, location or sensor_type")
 
-        table = client.query(sql)
-        await redis_client.set(redis_key, table.to_pylist())
-        return table.to_pylist()
+        limit = settings.FLEET_MAX_MACHINES
+        if machine_ids:
+            machine_ids = list(dict.fromkeys(machine_ids))
+            if len(machine_ids) > limit:
+                raise HTTPException(
+                    status_code=400, detail=f"Fleet query names {len(machine_ids)} machines, at most {limit} allowed"
+                )
+            missing = await self.missing_machines(machine_ids)
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Machines not found: {', '.join(map(str, missing))}")
+
+        if location or sensor_type:
+            statement = select(Machine.id).order_by(Machine.id)
+            if machine_ids:
+                statement = statement.where(Machine.id.in_(machine_ids))
+            if location:
+                statement = statement.where(Machine.location == location)
+            if sensor_type:
+                statement = statement.where(Machine.sensor_type == sensor_type)
+            machine_ids = list((await self.db.execute(statement)).scalars())
+
+        machine_ids = list(dict.fromkeys(machine_ids))
+        if len(machine_ids) > limit:
+            raise HTTPException(
+                status_code=400, detail=f"Fleet query matches {len(machine_ids)} machines, at most {limit} allowed"
+            )
+        return machine_ids
 
 
     async def create_machine(self, schema: MachineSchema) -> Machine:
         """Create machine."""
-        logger.debug({"payload": schema.model_dump()})
+        logger.debug("Create machine: %s", schema)
         machine = Machine(**schema.model_dump())
         self.db.add(machine)
-        self.db.commit()
-        self.db.refresh(machine)
+        await self.db.commit()
+        await self.db.refresh(machine)
+        machine_registry.add(machine.id)
         return machine
+
+    async def get_rules(self, machine_id: int) -> list[MachineRule]:
+        """List a machine's rules."""
+        await self.fetch_machine(machine_id)
+        result = await self.db.execute(
+            select(MachineRule).where(MachineRule.machine_id == machine_id).order_by(MachineRule.id)
+        )
+        return list(result.scalars())
+
+    async def create_rule(self, machine_id: int, schema: RuleSchema) -> MachineRule:
+        """Create a rule and apply it to this worker's engine right away."""
+        await self.fetch_machine(machine_id)
+        logger.debug("Create rule for machine %s: %s", machine_id, schema)
+        rule = MachineRule(machine_id=machine_id, **schema.model_dump())
+        self.db.add(rule)
+        await self.db.commit()
+        await self.db.refresh(rule)
+        await rule_engine.reload()
+        return rule
+
+    async def delete_rule(self, machine_id: int, rule_id: int) -> None:
+        """Delete a rule."""
+        rule = await self.db.get(MachineRule, rule_id)
+        if rule is None or rule.machine_id != machine_id:
+            raise HTTPException(status_code=404, detail="Rule not found")
+        await self.db.delete(rule)
+        await self.db.commit()
+        await rule_engine.reload()
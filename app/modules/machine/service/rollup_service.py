@@ -0,0 +1,279 @@
+"""Rollup tiers for machine_sensor_data.
+
+A background job keeps 1m, 5m and 1h aggregate measurements up to date.
+Each tier is built from the next finer one (raw points for 1m) and stores
+``{field}_avg``, ``_min``, ``_max`` and ``_count`` per machine and bin.
+How far each tier reaches is kept in the ``rollup:coverage`` Redis hash
+as ``{tier}:origin`` and ``{tier}:watermark`` epoch seconds, and only
+moves once InfluxDB has accepted the rolled-up points.
+
+Points that arrive after their bin was rolled up (late MQTT messages,
+NDJSON backfills, historical batches) mark that 1m bin in the
+``rollup:late`` sorted set; the job rolls marked bins up again through
+every tier so covered ranges never serve stale aggregates.
+"""
+
+import asyncio
+import contextlib
+import time
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.core.setting import settings
+from app.db.influx_query import InfluxQueryExecutor, influx_query
+from app.db.influx_writer import InfluxWriter, influx_writer
+from app.lib.redis import RedisClient, redis_client
+from app.modules.ingest.service.line_protocol import FIELDS, MEASUREMENT, encode_table
+from app.utils.logging import DevLogger
+
+logger = DevLogger("rollup_service", to_file=True).get()
+
+STATS = ("avg", "min", "max", "count")
+ROLLUP_FIELDS = tuple(f"{field}_{stat}" for field in FIELDS for stat in STATS)
+COVERAGE_KEY = "rollup:coverage"
+LATE_KEY = "rollup:late"
+LOCK_KEY = "lock:rollup"
+
+
+class Tier(NamedTuple):
+    """One rollup resolution and the tier it is built from."""
+
+    name: str
+    seconds: int
+    source: str | None
+
+    @property
+    def measurement(self) -> str:
+        """Measurement holding this tier."""
+        return f"{MEASUREMENT}_{self.name}"
+
+
+class Coverage(NamedTuple):
+    """Epoch seconds ``origin <= time < watermark`` a tier has rolled up."""
+
+    origin: int
+    watermark: int
+
+
+TIERS = (Tier("1m", 60, None), Tier("5m", 300, "1m"), Tier("1h", 3600, "5m"))
+TIERS_BY_NAME = {tier.name: tier for tier in TIERS}
+
+
+def iso(seconds: int) -> str:
+    """Format epoch seconds as a UTC timestamp parameter."""
+    return f"{datetime.fromtimestamp(seconds, UTC):%Y-%m-%dT%H:%M:%SZ}"
+
+
+def runs(bins: list[int], width: int, limit: int) -> list[tuple[int, int]]:
+    """Merge sorted bin starts into ``(start, end)`` ranges of adjacent bins at most ``limit`` seconds long."""
+    ranges: list[tuple[int, int]] = []
+    for start in bins:
+        if ranges and ranges[-1][1] == start and start + width - ranges[-1][0] <= limit:
+            ranges[-1] = (ranges[-1][0], start + width)
+        else:
+            ranges.append((start, start + width))
+    return ranges
+
+
+def combined_avg(field: str) -> str:
+    """Average of a field across rollup rows, weighted by their counts."""
+    return f"SUM({field}_avg * {field}_count) / NULLIF(SUM({field}_count), 0)"
+
+
+def rollup_sql(tier: Tier) -> str:
+    """Build the query that aggregates one tier's bins from its source."""
+    bin_expr = f"date_bin(INTERVAL '{tier.seconds} seconds', time)"
+    if tier.source is None:
+        source = MEASUREMENT
+        aggregates = [
+            f"AVG({f}) AS {f}_avg, MIN({f}) AS {f}_min, MAX({f}) AS {f}_max, COUNT({f}) AS {f}_count"
+            for f in FIELDS
+        ]
+    else:
+        source = TIERS_BY_NAME[tier.source].measurement
+        aggregates = [
+            f"{combined_avg(f)} AS {f}_avg, MIN({f}_min) AS {f}_min, "
+            f"MAX({f}_max) AS {f}_max, SUM({f}_count) AS {f}_count"
+            for f in FIELDS
+        ]
+
+    return f"""
+        SELECT
+            machine_id,
+            {bin_expr} AS time,
+            {", ".join(aggregates)}
+        FROM {source}
+        WHERE time >= to_timestamp($start)
+        AND time < to_timestamp($end)
+        GROUP BY machine_id, {bin_expr}
+    """
+
+
+class RollupJob:
+    """Periodically roll closed bins of every tier up to the present.
+
+    Only bins closed for at least ``lag`` seconds are rolled up, and a tier
+    never passes the watermark its source had when the run started, so it
+    only reads source rows that have already been flushed. A Redis lock,
+    renewed while a run lasts, keeps concurrent workers from rolling up the
+    same bins twice.
+
+    Late bins are marked in memory by the ingest path (``mark_late``) and
+    pushed to Redis by every worker each interval; the lock holder rolls up
+    again the bins marked at least ``lag`` seconds ago, once their points
+    have been flushed.
+    """
+
+    def __init__(
+        self,
+        interval: int = settings.ROLLUP_INTERVAL,
+        lag: int = settings.ROLLUP_LAG,
+        backfill: int = settings.ROLLUP_BACKFILL,
+        max_span: int = settings.ROLLUP_MAX_SPAN,
+        redis: RedisClient = redis_client,
+        query: InfluxQueryExecutor = influx_query,
+        writer: InfluxWriter = influx_writer,
+    ):
+        """Initialize job settings."""
+        self._interval = interval
+        self._lag = lag
+        self._backfill = backfill
+        self._max_span = max_span
+        self._redis = redis
+        self._query = query
+        self._writer = writer
+        self._task: asyncio.Task | None = None
+        self._late: dict[int, float] = {}
+
+    async def start(self) -> None:
+        """Start the background rollup task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="rollup")
+            logger.info(f"Rollup job started (every {self._interval}s)")
+
+    async def stop(self) -> None:
+        """Stop the background rollup task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Rollup job stopped.")
+
+    async def coverage(self) -> dict[str, Coverage]:
+        """Read how far every tier has been rolled up."""
+        values = await self._redis.hgetall(COVERAGE_KEY)
+        return {
+            tier.name: Coverage(values[f"{tier.name}:origin"], values[f"{tier.name}:watermark"])
+            for tier in TIERS
+            if f"{tier.name}:origin" in values and f"{tier.name}:watermark" in values
+        }
+
+    def mark_late(self, table: pa.Table, now: float | None = None) -> None:
+        """Remember the 1m bins of accepted points whose bin may already be rolled up.
+
+        A bin is rolled up once it closed ``lag`` seconds ago, so only points
+        older than that are late; live telemetry costs one ``min`` per batch.
+        """
+        if self._task is None or table.num_rows == 0:
+            return
+        now = time.time() if now is None else now
+        cutoff = int(now - self._lag) // 60 * 60 * 1_000_000_000
+        times = pc.cast(table["time"], pa.int64())
+        if pc.min(times).as_py() >= cutoff:
+            return
+        late = pc.unique(pc.divide(times.filter(pc.less(times, cutoff)), 60 * 1_000_000_000))
+        for index in late.to_pylist():
+            self._late[index * 60] = now
+
+    async def _flush_late(self) -> None:
+        if not self._late:
+            return
+        late, self._late = self._late, {}
+        if not await self._redis.zadd(LATE_KEY, {str(start): marked for start, marked in late.items()}, gt=True):
+            # keep them for the next interval
+            self._late = late | self._late
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Rollup run failed: {e}")
+            await asyncio.sleep(self._interval)
+
+    async def _hold_lock(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval / 2)
+            await self._redis.expire(LOCK_KEY, self._interval)
+
+    async def run_once(self, now: float | None = None) -> None:
+        """Roll marked late bins up again, then advance every tier once."""
+        await self._flush_late()
+        if not await self._redis.lock(LOCK_KEY, self._interval):
+            return
+        holder = asyncio.create_task(self._hold_lock(), name="rollup-lock")
+        try:
+            now = time.time() if now is None else now
+            coverage = await self.coverage()
+            await self._roll_late(coverage, now)
+            for tier in TIERS:
+                await self._roll(tier, coverage, now)
+        finally:
+            holder.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await holder
+            await self._redis.delete(LOCK_KEY)
+
+    async def _roll_late(self, coverage: dict[str, Coverage], now: float) -> None:
+        # marks younger than lag may still have points waiting in a writer queue
+        members = await self._redis.ztake(LATE_KEY, now - self._lag)
+        bins = {int(member) for member in members}
+        try:
+            for tier in TIERS:
+                covered = coverage.get(tier.name)
+                if covered is None:
+                    return
+                bins = {start // tier.seconds * tier.seconds for start in bins}
+                touched = sorted(start for start in bins if covered.origin <= start < covered.watermark)
+                for start, end in runs(touched, tier.seconds, max(tier.seconds, self._max_span)):
+                    points = await self._write(tier, start, end)
+                    logger.debug(f"Rolled up late {tier.name} bins {iso(start)} to {iso(end)} ({points} points)")
+        except Exception:
+            await self._redis.zadd(LATE_KEY, dict.fromkeys(members, now), gt=True)
+            raise
+
+    async def _write(self, tier: Tier, start: int, end: int) -> int:
+        table = await self._query.query(rollup_sql(tier), {"start": iso(start), "end": iso(end)})
+        lines = encode_table(table, tier.measurement, ROLLUP_FIELDS)
+        await self._writer.write(lines)
+        return len(lines)
+
+    async def _roll(self, tier: Tier, coverage: dict[str, Coverage], now: float) -> None:
+        closed = int(now - self._lag) // tier.seconds * tier.seconds
+        if tier.source is None:
+            origin = (closed - self._backfill) // tier.seconds * tier.seconds
+        else:
+            source = coverage.get(tier.source)
+            if source is None:
+                return
+            closed = min(closed, source.watermark // tier.seconds * tier.seconds)
+            origin = -(-source.origin // tier.seconds) * tier.seconds
+
+        current = coverage.get(tier.name, Coverage(origin, origin))
+        span = max(tier.seconds, self._max_span // tier.seconds * tier.seconds)
+        end = min(closed, current.watermark + span)
+        if end <= current.watermark:
+            return
+
+        # raises when InfluxDB refuses the points, leaving the watermark for the next run
+        points = await self._write(tier, current.watermark, end)
+        await self._redis.hset(COVERAGE_KEY, {f"{tier.name}:origin": current.origin, f"{tier.name}:watermark": end})
+        logger.debug(f"Rolled up {tier.name} to {iso(end)} ({points} points)")
+
+
+rollup_job = RollupJob()
@@ -0,0 +1,203 @@
+"""Streaming rule engine.
+
+Every accepted ingest table is checked against the enabled rules of its
+machines as it arrives. Each rule keeps constant-size state (the previous
+point for rate rules, a running sum and sum of squares over a fixed window
+for z-score rules), so a point costs O(1) per rule. An alert is published
+on the machine's alert topic when a rule starts failing; the rule re-arms
+once a point passes again, so a sustained excursion alerts once.
+
+State lives in the worker that sees the points, so rate and z-score rules
+assume a machine's telemetry reaches one worker.
+"""
+
+import asyncio
+import contextlib
+import math
+from collections import deque
+from collections.abc import Callable
+from datetime import UTC, datetime
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import select
+
+from app.core.setting import settings
+from app.db.session import SessionLocal
+from app.modules.machine.model.rule_model import MachineRule, RuleKind
+from app.utils.logging import DevLogger
+
+logger = DevLogger("rule_engine", to_file=True).get()
+
+Publisher = Callable[[str, dict[str, Any]], Any]
+
+
+class RuleState:
+    """Incremental state of one rule."""
+
+    def __init__(self, rule: MachineRule):
+        """Initialize from a rule row."""
+        self.rule = rule
+        self.active = False
+        self.previous: tuple[int, float] | None = None
+        self.values: deque[float] = deque()
+        self.total = 0.0
+        self.squares = 0.0
+
+    def check(self, time: int, value: float) -> str | None:
+        """Feed one point, returning why it fails the rule or None."""
+        rule = self.rule
+        if rule.kind == RuleKind.threshold:
+            if rule.min_value is not None and value < rule.min_value:
+                return f"{rule.field} {value:g} below {rule.min_value:g}"
+            if rule.max_value is not None and value > rule.max_value:
+                return f"{rule.field} {value:g} above {rule.max_value:g}"
+            return None
+
+        if rule.kind == RuleKind.rate:
+            previous = self.previous
+            # a late or duplicate point must not become the baseline
+            if previous is not None and time <= previous[0]:
+                return None
+            self.previous = (time, value)
+            if previous is None:
+                return None
+            rate = (value - previous[1]) / ((time - previous[0]) / 1e9)
+            if abs(rate) > rule.max_rate:
+                return f"{rule.field} changing {rate:+g}/s, limit {rule.max_rate:g}/s"
+            return None
+
+        # z-score against the window before this point
+        reason = None
+        if len(self.values) == rule.window:
+            mean = self.total / rule.window
+            std = math.sqrt(max(0.0, self.squares / rule.window - mean * mean))
+            if std > 0 and abs(value - mean) / std > rule.z_limit:
+                reason = f"{rule.field} {value:g} is {(value - mean) / std:+.1f} sigma from {mean:g}"
+            oldest = self.values.popleft()
+            self.total -= oldest
+            self.squares -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.squares += value * value
+        return reason
+
+
+class RuleEngine:
+    """Evaluate machine rules on ingested points and publish alerts."""
+
+    def __init__(
+        self,
+        topic: str = settings.RULES_ALERT_TOPIC,
+        refresh_interval: int = settings.RULES_REFRESH_INTERVAL,
+    ):
+        """Initialize engine settings."""
+        self._topic = topic
+        self._refresh_interval = refresh_interval
+        self._publish: Publisher | None = None
+        self._rules: dict[int, list[RuleState]] = {}
+        self._machine_ids = pa.array([], pa.int64())
+        self._task: asyncio.Task | None = None
+
+    async def start(self, publish: Publisher) -> None:
+        """Load the rules and keep them refreshed, publishing alerts with ``publish``."""
+        self._publish = publish
+        if self._task is None:
+            await self.reload()
+            self._task = asyncio.create_task(self._run(), name="rule-engine")
+            logger.info(f"Rule engine started ({sum(map(len, self._rules.values()))} rules)")
+
+    async def stop(self) -> None:
+        """Stop refreshing rules."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Rule engine stopped.")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.reload()
+            except Exception as e:
+                logger.error(f"Rule reload failed: {e}")
+
+    async def reload(self) -> None:
+        """Load enabled rules from Postgres, keeping the state of unchanged ones."""
+        async with SessionLocal() as db:
+            result = await db.execute(select(MachineRule).where(MachineRule.enabled))
+            self.load(result.scalars())
+
+    def load(self, rules) -> None:
+        """Replace the rule set; rules whose definition is unchanged keep their state."""
+        current = {state.rule.id: state for states in self._rules.values() for state in states}
+        loaded: dict[int, list[RuleState]] = {}
+        for rule in rules:
+            state = current.get(rule.id)
+            if state is None or state.rule.model_dump() != rule.model_dump():
+                state = RuleState(rule)
+            loaded.setdefault(rule.machine_id, []).append(state)
+        self._rules = loaded
+        self._machine_ids = pa.array(list(loaded), pa.int64())
+
+    def evaluate(self, table: pa.Table) -> list[dict[str, Any]]:
+        """Check a sensor data table against the rules of its machines and publish alerts."""
+        if not self._rules or table.num_rows == 0:
+            return []
+        table = table.filter(pc.is_in(table["machine_id"], value_set=self._machine_ids))
+        if table.num_rows == 0:
+            return []
+
+        table = table.sort_by([("machine_id", "ascending"), ("time", "ascending")])
+        fields = {state.rule.field for states in self._rules.values() for state in states}
+        columns = {
+            "machine_id": table["machine_id"].to_pylist(),
+            "time": pc.cast(table["time"], pa.int64()).to_pylist(),
+            **{field: table[field].to_pylist() for field in fields},
+        }
+
+        alerts = []
+        for row, machine_id in enumerate(columns["machine_id"]):
+            time = columns["time"][row]
+            for state in self._rules[machine_id]:
+                value = columns[state.rule.field][row]
+                if value is None or not math.isfinite(value):
+                    continue
+                reason = state.check(time, value)
+                if reason is None:
+                    state.active = False
+                elif not state.active:
+                    state.active = True
+                    alerts.append(self._alert(state.rule, time, value, reason))
+
+        for alert in alerts:
+            self._send(alert)
+        return alerts
+
+    def _alert(self, rule: MachineRule, time: int, value: float, reason: str) -> dict[str, Any]:
+        return {
+            "machine_id": rule.machine_id,
+            "rule_id": rule.id,
+            "kind": rule.kind.value,
+            "field": rule.field,
+            "value": value,
+            "time": datetime.fromtimestamp(time / 1e9, UTC).isoformat(),
+            "message": reason,
+        }
+
+    def _send(self, alert: dict[str, Any]) -> None:
+        topic = self._topic.format(machine_id=alert["machine_id"])
+        logger.warning("Alert on %s: %s", topic, alert["message"])
+        if self._publish is None:
+            return
+        try:
+            self._publish(topic, alert)
+        except Exception as e:
+            logger.error(f"Failed to publish alert on {topic}: {e}")
+
+
+rule_engine = RuleEngine()
@@ -0,0 +1,375 @@
+"""Time-bucketed series cache.
+
+Query results are stored per machine, interval and epoch-aligned window
+instead of per exact request, so overlapping dashboard ranges share cached
+windows. Windows that closed more than ``settle`` seconds ago are kept for
+``ttl`` seconds; the window at the live edge expires after ``live_ttl``
+seconds so only it is re-queried. Points can still land in a closed window
+(late telemetry, NDJSON backfills, spill replays), so ``CacheInvalidator``
+drops the windows accepted points touch once they have been written.
+
+Windows are Arrow tables end to end, so a cache hit never builds per-row
+Python objects.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from app.core.setting import settings
+from app.db.influx_writer import InfluxWriter, influx_writer
+from app.lib.metrics import count_cache
+from app.lib.redis import RedisClient
+from app.utils.logging import DevLogger
+
+logger = DevLogger("series_cache", to_file=True).get()
+
+Query = Callable[[datetime, datetime], Awaitable[pa.Table]]
+BatchQuery = Callable[[list[str], datetime, datetime], Awaitable[dict[str, pa.Table]]]
+
+POLL_INTERVAL = 0.05
+INVALIDATE_INTERVAL = 5
+
+
+def time_bound(value: datetime, time_type: pa.TimestampType) -> pa.Scalar:
+    """Turn a datetime into a scalar comparable with a ``time`` column."""
+    value = value.astimezone(UTC)
+    return pa.scalar(value if time_type.tz else value.replace(tzinfo=None), time_type)
+
+
+def clip(table: pa.Table, start: datetime, end: datetime) -> pa.Table:
+    """Keep the rows with ``start <= time <= end``."""
+    column = table["time"]
+    mask = pc.and_(
+        pc.greater_equal(column, time_bound(start, column.type)),
+        pc.less_equal(column, time_bound(end, column.type)),
+    )
+    return table.filter(mask)
+
+
+def single(prefix: str, query: Query) -> BatchQuery:
+    """Adapt a one-series loader to the batch loader interface."""
+    async def run(prefixes: list[str], lo: datetime, hi: datetime) -> dict[str, pa.Table]:
+        return {prefix: await query(lo, hi)}
+
+    return run
+
+
+class SeriesCache:
+    """Serve time-range queries from aligned windows cached in Redis."""
+
+    def __init__(
+        self,
+        redis: RedisClient,
+        bucket: int = settings.QUERY_CACHE_BUCKET,
+        ttl: int = settings.QUERY_CACHE_TTL,
+        live_ttl: int = settings.QUERY_CACHE_LIVE_TTL,
+        settle: int = settings.QUERY_CACHE_SETTLE,
+        lock_timeout: int = settings.QUERY_CACHE_LOCK_TIMEOUT,
+    ):
+        """Initialize cache settings."""
+        self._redis = redis
+        self._bucket = bucket
+        self._ttl = ttl
+        self._live_ttl = live_ttl
+        self._settle = settle
+        self._lock_timeout = lock_timeout
+        self._flights: dict[str, asyncio.Task] = {}
+
+    def window(self, step: timedelta | None) -> int:
+        """Window width in seconds: at least ``bucket`` and a whole number of steps.
+
+        Since both windows and ``date_bin`` bins are aligned to the epoch, a
+        bin never straddles two windows.
+        """
+        if step is None:
+            return self._bucket
+        seconds = int(step.total_seconds())
+        return max(1, -(-self._bucket // seconds)) * seconds
+
+    def _key(self, prefix: str, width: int, index: int) -> str:
+        return f"{prefix}:{width}:{index}"
+
+    async def invalidate(self, series: str, lo: int, hi: int) -> int:
+        """Drop the cached windows under ``series`` overlapping ``lo <= time <= hi`` (epoch seconds).
+
+        Prefixes of one series share the ``<series>:`` start, so the windows
+        of every interval and column set are found with one SCAN.
+        """
+        stale = []
+        for key in await self._redis.scan(f"{series}:*"):
+            try:
+                width, index = (int(part) for part in key.rsplit(":", 2)[1:])
+            except ValueError:
+                continue
+            if index * width <= hi and (index + 1) * width > lo:
+                stale.append(key)
+        await self._redis.delete(*stale)
+        return len(stale)
+
+    @staticmethod
+    def _cached(value, schema: pa.Schema) -> pa.Table | None:
+        # anything that is not a table in the expected schema, such as rows
+        # cached by an older release, counts as a miss
+        return value if isinstance(value, pa.Table) and value.schema.equals(schema) else None
+
+    async def fetch(
+        self, prefix: str, start: datetime, end: datetime, step: timedelta | None, schema: pa.Schema, query: Query
+    ) -> pa.Table:
+        """Return rows between ``start`` and ``end``, newest first.
+
+        ``query(lo, hi)`` must return the rows with ``lo <= time < hi`` in
+        ``schema`` newest first, binned by ``step`` when one is given. With
+        a step, every bin starting in the requested range is returned whole.
+        """
+        return (await self.fetch_many({prefix: query}, start, end, step, schema))[prefix]
+
+    async def fetch_many(
+        self, queries: dict[str, Query], start: datetime, end: datetime, step: timedelta | None, schema: pa.Schema
+    ) -> dict[str, pa.Table]:
+        """Like ``fetch`` for several series, reading every cached window in one round trip."""
+        start, width, indices = self._span(start, end, step)
+        if not indices:
+            return {prefix: schema.empty_table() for prefix in queries}
+
+        windows = await self._read(list(queries), width, indices, schema)
+        self._count(windows, indices)
+        loads = [
+            self._single_flight((prefix,), width, lo, hi, schema, single(prefix, query))
+            for prefix, query in queries.items()
+            for lo, hi in self._missing_runs(indices, windows[prefix])
+        ]
+        for loaded in await asyncio.gather(*loads):
+            for prefix, tables in loaded.items():
+                windows[prefix].update(tables)
+
+        return {prefix: self._assemble(windows[prefix], indices, start, end) for prefix in queries}
+
+    async def fetch_batch(
+        self,
+        prefixes: list[str],
+        start: datetime,
+        end: datetime,
+        step: timedelta | None,
+        schema: pa.Schema,
+        query: BatchQuery,
+    ) -> dict[str, pa.Table]:
+        """Like ``fetch_many``, loading every series with a missing window in one query.
+
+        ``query(prefixes, lo, hi)`` returns a table per prefix. It covers the
+        span from the first to the last missing window of any series, so a
+        series may be re-read for windows it already had; they are stored
+        again unchanged.
+        """
+        start, width, indices = self._span(start, end, step)
+        if not indices:
+            return {prefix: schema.empty_table() for prefix in prefixes}
+
+        windows = await self._read(prefixes, width, indices, schema)
+        self._count(windows, indices)
+        missing = {prefix: runs for prefix in prefixes if (runs := self._missing_runs(indices, windows[prefix]))}
+        if missing:
+            lo = min(runs[0][0] for runs in missing.values())
+            hi = max(runs[-1][1] for runs in missing.values())
+            loaded = await self._single_flight(tuple(missing), width, lo, hi, schema, query)
+            for prefix, tables in loaded.items():
+                windows[prefix].update(tables)
+
+        return {prefix: self._assemble(windows[prefix], indices, start, end) for prefix in prefixes}
+
+    def _span(self, start: datetime, end: datetime, step: timedelta | None) -> tuple[datetime, int, range]:
+        # with a step, the bin containing ``start`` is returned whole
+        if step is not None:
+            seconds = int(step.total_seconds())
+            start = datetime.fromtimestamp(int(start.timestamp()) // seconds * seconds, UTC)
+        width = self.window(step)
+        first = int(start.timestamp()) // width
+        last = min(int(end.timestamp()), int(time.time())) // width
+        return start, width, range(first, last + 1)
+
+    async def _read(
+        self, prefixes: list[str], width: int, indices: range, schema: pa.Schema
+    ) -> dict[str, dict[int, pa.Table]]:
+        keys = [self._key(prefix, width, i) for prefix in prefixes for i in indices]
+        cached = iter(await self._redis.mget(keys))
+        return {
+            prefix: {i: table for i in indices if (table := self._cached(next(cached), schema)) is not None}
+            for prefix in prefixes
+        }
+
+    @staticmethod
+    def _count(windows: dict[str, dict[int, pa.Table]], indices: range) -> None:
+        hits = sum(len(tables) for tables in windows.values())
+        count_cache("series", hits, len(windows) * len(indices) - hits)
+
+    @staticmethod
+    def _assemble(windows: dict[int, pa.Table], indices: range, start: datetime, end: datetime) -> pa.Table:
+        tables = []
+        for i in reversed(indices):
+            table = windows[i]
+            tables.append(clip(table, start, end) if i in (indices[0], indices[-1]) else table)
+        return pa.concat_tables(tables)
+
+    @staticmethod
+    def _missing_runs(indices: range, windows: dict[int, pa.Table]) -> list[tuple[int, int]]:
+        # contiguous missing windows are loaded with a single query
+        runs: list[tuple[int, int]] = []
+        for i in indices:
+            if i in windows:
+                continue
+            if runs and runs[-1][1] == i - 1:
+                runs[-1] = (runs[-1][0], i)
+            else:
+                runs.append((i, i))
+        return runs
+
+    async def _single_flight(
+        self, prefixes: tuple[str, ...], width: int, lo: int, hi: int, schema: pa.Schema, query: BatchQuery
+    ) -> dict[str, dict[int, pa.Table]]:
+        # concurrent requests for the same windows in this process share one task
+        series = prefixes[0] if len(prefixes) == 1 else hashlib.sha1(
+            "+".join(sorted(prefixes)).encode(), usedforsecurity=False
+        ).hexdigest()
+        flight = f"{series}:{width}:{lo}-{hi}"
+        task = self._flights.get(flight)
+        if task is None:
+            task = asyncio.create_task(self._load_locked(flight, prefixes, width, lo, hi, schema, query))
+            self._flights[flight] = task
+            task.add_done_callback(lambda _: self._flights.pop(flight, None))
+        # shielded so a disconnecting client does not cancel the query for everyone else
+        return await asyncio.shield(task)
+
+    async def _load_locked(
+        self, flight: str, prefixes: tuple[str, ...], width: int, lo: int, hi: int, schema: pa.Schema, query: BatchQuery
+    ) -> dict[str, dict[int, pa.Table]]:
+        # other workers wait for the lock holder to fill the cache instead of querying too
+        lock = f"lock:{flight}"
+        if await self._redis.lock(lock, self._lock_timeout):
+            try:
+                return await self._load(prefixes, width, lo, hi, schema, query)
+            finally:
+                await self._redis.delete(lock)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._lock_timeout
+        indices = range(lo, hi + 1)
+        while loop.time() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            windows = await self._read(list(prefixes), width, indices, schema)
+            if all(len(tables) == len(indices) for tables in windows.values()):
+                return windows
+
+        logger.warning(f"Timed out waiting for {flight}, querying directly")
+        return await self._load(prefixes, width, lo, hi, schema, query)
+
+    async def _load(
+        self, prefixes: tuple[str, ...], width: int, lo: int, hi: int, schema: pa.Schema, query: BatchQuery
+    ) -> dict[str, dict[int, pa.Table]]:
+        tables = await query(
+            list(prefixes), datetime.fromtimestamp(lo * width, UTC), datetime.fromtimestamp((hi + 1) * width, UTC)
+        )
+
+        loaded: dict[str, dict[int, pa.Table]] = {}
+        for prefix in prefixes:
+            table = tables.get(prefix, schema.empty_table()).select(schema.names).cast(schema)
+            index = pc.divide(pc.cast(table["time"], pa.int64()), width * 1_000_000_000)
+            loaded[prefix] = {i: table.filter(pc.equal(index, i)) for i in range(lo, hi + 1)}
+
+        settled = time.time() - self._settle
+        windows = [(prefix, i, t) for prefix, tables in loaded.items() for i, t in tables.items()]
+        closed = {self._key(prefix, width, i): t for prefix, i, t in windows if (i + 1) * width <= settled}
+        live = {self._key(prefix, width, i): t for prefix, i, t in windows if (i + 1) * width > settled}
+        await self._redis.mset(closed, expire=self._ttl)
+        await self._redis.mset(live, expire=self._live_ttl)
+        return loaded
+
+
+class CacheInvalidator:
+    """Drop cached windows that accepted points land in.
+
+    The ingest paths hand every accepted table to ``mark``, which records
+    the time span per machine. Every ``INVALIDATE_INTERVAL`` seconds the
+    spans marked at least ``delay`` seconds ago, long enough for the writer
+    to flush them and for late rollup bins to be rolled up again, are
+    dropped from the cache; while the writer's spill log holds anything
+    they wait for the replay. Spans starting after the settle point only
+    touch live windows, which expire on their own, and are skipped.
+    """
+
+    def __init__(
+        self,
+        cache: SeriesCache,
+        series: Callable[[int], str],
+        writer: InfluxWriter = influx_writer,
+        delay: int = settings.QUERY_CACHE_INVALIDATE_DELAY,
+        settle: int = settings.QUERY_CACHE_SETTLE,
+    ):
+        """Initialize invalidator settings; ``series`` names a machine's cached series."""
+        self._cache = cache
+        self._series = series
+        self._writer = writer
+        self._delay = delay
+        self._settle = settle
+        self._marks: deque[tuple[float, dict[int, tuple[int, int]]]] = deque()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Start the background invalidation task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cache-invalidator")
+            logger.info(f"Cache invalidator started (delay {self._delay}s)")
+
+    async def stop(self) -> None:
+        """Stop the background invalidation task."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        logger.info("Cache invalidator stopped.")
+
+    def mark(self, table: pa.Table, now: float | None = None) -> None:
+        """Remember the time span of accepted points for every machine in a table."""
+        if self._task is None or table.num_rows == 0:
+            return
+        now = time.time() if now is None else now
+        span = pc.min_max(pc.cast(table["time"], pa.int64()))
+        lo, hi = span["min"].as_py() // 1_000_000_000, span["max"].as_py() // 1_000_000_000
+        # marks of one interval share a slot, so a steady stream costs one span per machine
+        if not self._marks or self._marks[-1][0] <= now - INVALIDATE_INTERVAL:
+            self._marks.append((now, {}))
+        spans = self._marks[-1][1]
+        for machine_id in pc.unique(table["machine_id"]).to_pylist():
+            first, last = spans.get(machine_id, (lo, hi))
+            spans[machine_id] = (min(first, lo), max(last, hi))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(INVALIDATE_INTERVAL)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Cache invalidation failed: {e}")
+
+    async def run_once(self, now: float | None = None) -> None:
+        """Drop the cached windows of spans marked at least ``delay`` seconds ago."""
+        now = time.time() if now is None else now
+        stats = self._writer.spill_stats
+        if stats is not None and stats.pending_bytes:
+            return
+        settled = now - self._settle
+        while self._marks and self._marks[0][0] <= now - self._delay:
+            _, spans = self._marks[0]
+            for machine_id, (lo, hi) in list(spans.items()):
+                if lo < settled:
+                    await self._cache.invalidate(self._series(machine_id), lo, hi)
+                del spans[machine_id]
+            self._marks.popleft()
@@ -0,0 +1,112 @@
+"""Series response formats.
+
+Query results stay Arrow tables until the response is written. Arrow IPC
+and Parquet are serialized straight from the table; columnar JSON builds
+one list per column instead of one dict per row.
+"""
+
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.gonsters.columnar+json"
+ARROW = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+MEDIA_TYPES = {
+    JSON: JSON,
+    "application/*": JSON,
+    "*/*": JSON,
+    COLUMNAR_JSON: COLUMNAR_JSON,
+    ARROW: ARROW,
+    "application/x-parquet": PARQUET,
+    PARQUET: PARQUET,
+}
+
+
+class NotAcceptableError(ValueError):
+    """None of the media types in the Accept header can be produced."""
+
+
+def negotiate(accept: str | None) -> str:
+    """Pick the response media type for an Accept header, highest quality first."""
+    if not accept:
+        return JSON
+
+    candidates = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and media_type.lower() in MEDIA_TYPES:
+            candidates.append((-quality, position, MEDIA_TYPES[media_type.lower()]))
+
+    if not candidates:
+        raise NotAcceptableError(f"Cannot produce any of {accept}")
+    return min(candidates)[2]
+
+
+def format_time(table: pa.Table) -> pa.Table:
+    """Render ``time`` as ISO 8601 text with only as many fraction digits as needed.
+
+    Matches the ``time::varchar`` strings the JSON response used to carry.
+    """
+    if "time" not in table.column_names or not pa.types.is_timestamp(table["time"].type):
+        return table
+    text = pc.strftime(table["time"], format="%Y-%m-%dT%H:%M:%S")
+    text = pc.replace_substring_regex(text, pattern=r"\.000000000$", replacement="")
+    text = pc.replace_substring_regex(text, pattern=r"(\.\d{3})000000$", replacement=r"\1")
+    text = pc.replace_substring_regex(text, pattern=r"(\.\d{6})000$", replacement=r"\1")
+    return table.set_column(table.schema.get_field_index("time"), "time", text)
+
+
+def stack(tables: dict[int, pa.Table], key: str = "machine_id") -> pa.Table:
+    """Concatenate per-machine tables into one, with the machine id as the first column."""
+    if not tables:
+        return pa.table({key: pa.array([], pa.int64())})
+    return pa.concat_tables(
+        table.add_column(0, key, pa.array([machine_id] * table.num_rows, pa.int64()))
+        for machine_id, table in tables.items()
+    )
+
+
+def to_rows(table: pa.Table) -> list[dict]:
+    """Rows for the default JSON envelope."""
+    return format_time(table).to_pylist()
+
+
+def to_columns(table: pa.Table) -> dict[str, list]:
+    """Columns for columnar JSON."""
+    return format_time(table).to_pydict()
+
+
+def to_arrow(table: pa.Table) -> bytes:
+    """Serialize a table as an Arrow IPC stream."""
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(table: pa.Table) -> bytes:
+    """Serialize a table as Parquet."""
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression="zstd")
+    return sink.getvalue()
+
+
+def to_columnar_json(table: pa.Table, message: str) -> bytes:
+    """Serialize a table inside the usual response envelope with one array per column."""
+    body = {"status": True, "message": message, "data": to_columns(table)}
+    return json.dumps(body, separators=(",", ":")).encode()
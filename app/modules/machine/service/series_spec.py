@@ -0,0 +1,155 @@
+"""Series query specs.
+
+A ``SeriesSpec`` describes which fields and per-bin aggregates a history
+query returns. It builds the SQL for raw data and for rollup tiers, the
+result schema and the cache key, so every aggregate of a request is
+computed in one scan and cached together.
+"""
+
+import hashlib
+import re
+from datetime import timedelta
+
+import pyarrow as pa
+
+from app.modules.ingest.service.line_protocol import FIELDS, MEASUREMENT
+from app.modules.machine.service.rollup_service import Tier, combined_avg
+
+AGGREGATES = {
+    "avg": "AVG({f})",
+    "min": "MIN({f})",
+    "max": "MAX({f})",
+    "count": "COUNT({f})",
+    "stddev": "STDDEV({f})",
+    "first": "FIRST_VALUE({f} ORDER BY time)",
+    "last": "LAST_VALUE({f} ORDER BY time)",
+}
+# the subset that can be answered from rollup tiers
+ROLLUP_AGGREGATES = {
+    "avg": combined_avg("{f}"),
+    "min": "MIN({f}_min)",
+    "max": "MAX({f}_max)",
+    "count": "CAST(SUM({f}_count) AS BIGINT)",
+}
+PERCENTILE = re.compile(r"^p(?P<rank>\d{1,2}(?:\.\d+)?)$")
+DEFAULT_AGGREGATES = ("avg",)
+
+
+def split_list(values: list[str] | None) -> list[str]:
+    """Flatten repeated and comma-separated query values."""
+    return [item.strip().lower() for value in values or [] for item in value.split(",") if item.strip()]
+
+
+class SeriesSpec:
+    """Fields and aggregates of one history query."""
+
+    def __init__(
+        self,
+        step: timedelta | None,
+        fields: list[str] | None = None,
+        aggregates: list[str] | None = None,
+    ):
+        """Validate the requested fields and aggregates."""
+        self.step = step
+        self.fields = tuple(dict.fromkeys(split_list(fields))) or FIELDS
+        unknown = [name for name in self.fields if name not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields {', '.join(unknown)}")
+
+        requested = tuple(dict.fromkeys(split_list(aggregates)))
+        if requested and step is None:
+            raise ValueError("aggregates require an interval")
+        for name in requested:
+            if name not in AGGREGATES and not self._percentile(name):
+                raise ValueError(f"Unknown aggregate {name}")
+        # without explicit aggregates, columns keep their plain field names
+        self.named = bool(requested)
+        self.aggregates = requested or DEFAULT_AGGREGATES
+
+    @staticmethod
+    def _percentile(name: str) -> float | None:
+        match = PERCENTILE.match(name)
+        rank = float(match.group("rank")) if match else 0
+        return rank / 100 if 0 < rank < 100 else None
+
+    @property
+    def columns(self) -> list[tuple[str, str, str | None]]:
+        """``(column, field, aggregate)`` for every output column."""
+        if self.step is None:
+            return [(field, field, None) for field in self.fields]
+        return [
+            (f"{field}_{aggregate}" if self.named else field, field, aggregate)
+            for field in self.fields
+            for aggregate in self.aggregates
+        ]
+
+    @property
+    def schema(self) -> pa.Schema:
+        """Arrow schema of the result."""
+        return pa.schema(
+            [
+                ("time", pa.timestamp("ns")),
+                *((name, pa.int64() if aggregate == "count" else pa.float64()) for name, _, aggregate in self.columns),
+            ]
+        )
+
+    @property
+    def key(self) -> str:
+        """Cache key part identifying the interval and the column set."""
+        step = int(self.step.total_seconds()) if self.step else "raw"
+        if self.fields == FIELDS and not self.named:
+            return str(step)
+        digest = hashlib.sha1(",".join(self.schema.names).encode(), usedforsecurity=False).hexdigest()[:12]
+        return f"{step}:{digest}"
+
+    @property
+    def rollup_compatible(self) -> bool:
+        """Whether every aggregate can be read from rollup tiers."""
+        return self.step is not None and all(aggregate in ROLLUP_AGGREGATES for aggregate in self.aggregates)
+
+    def _expression(self, field: str, aggregate: str, tier: Tier | None) -> str:
+        if tier is not None:
+            return ROLLUP_AGGREGATES[aggregate].format(f=field)
+        if aggregate in AGGREGATES:
+            return AGGREGATES[aggregate].format(f=field)
+        return f"APPROX_PERCENTILE_CONT({field}, {self._percentile(aggregate)})"
+
+    def sql(self, tier: Tier | None = None, machines: int | None = None) -> str:
+        """Build the query for ``$start <= time < $end``, from raw data or a rollup tier.
+
+        Bounds and machine id are bound as parameters, so the SQL text only
+        varies with the (already validated) interval and columns. With
+        ``machines`` the query reads ``$machine_0`` to ``$machine_{n-1}`` at
+        once and returns a ``machine_id`` column, grouped per machine.
+        """
+        measurement = tier.measurement if tier else MEASUREMENT
+        if machines is None:
+            key, where = "", "machine_id = $machine_id"
+        else:
+            key = "machine_id, "
+            where = f"machine_id IN ({', '.join(f'$machine_{i}' for i in range(machines))})"
+
+        if self.step is None:
+            select = ", ".join(self.fields)
+            return f"""
+                SELECT {key}time, {select}
+                FROM {measurement}
+                WHERE time >= to_timestamp($start)
+                AND time < to_timestamp($end)
+                AND {where}
+                ORDER BY {key}time DESC
+            """
+
+        bin_expr = f"date_bin(INTERVAL '{int(self.step.total_seconds())} seconds', time)"
+        select = ", ".join(
+            f'{self._expression(field, aggregate, tier)} AS "{name}"' for name, field, aggregate in self.columns
+        )
+        return f"""
+            SELECT {key}{bin_expr} AS time, {select}
+            FROM {measurement}
+            WHERE time >= to_timestamp($start)
+            AND time < to_timestamp($end)
+            AND {where}
+            GROUP BY {key}{bin_expr}
+            ORDER BY {key}{bin_expr} DESC
+        """
@@ -0,0 +1,65 @@
+"""Production server: ``python -m app.server``.
+
+Runs uvicorn's process manager with ``SERVER_WORKERS`` workers, or one per
+core available to the container. Workers are started as fresh processes
+that import the app themselves, and each builds its own connections,
+pools and background tasks in the lifespan; the manager restarts workers
+that die. Workers share metrics through files in ``METRICS_MULTIPROC_DIR``,
+which is emptied on every start so counters begin at zero.
+"""
+
+import math
+import os
+import shutil
+from pathlib import Path
+
+import uvicorn
+
+from app.core.setting import settings
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+
+
+def available_cores() -> int:
+    """Cores this process may run on, capped by a cgroup v2 CPU quota."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()
+    except (OSError, ValueError):
+        return cores
+    if quota == "max":
+        return cores
+    return max(1, min(cores, math.ceil(int(quota) / int(period))))
+
+
+def worker_count(configured: int = settings.SERVER_WORKERS) -> int:
+    """Return the configured worker count, or one worker per available core."""
+    return configured if configured > 0 else available_cores()
+
+
+def prepare_metrics_dir(directory: str = settings.METRICS_MULTIPROC_DIR) -> None:
+    """Empty the shared metrics directory and point the workers at it."""
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    # inherited by the workers, which must see it before importing prometheus_client
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = directory
+
+
+def main() -> None:
+    """Serve the app."""
+    if settings.METRICS_ENABLED:
+        prepare_metrics_dir()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        # the reloader supervises a single worker
+        workers=1 if settings.SERVER_RELOAD else worker_count(),
+        reload=settings.SERVER_RELOAD,
+        proxy_headers=True,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+    )
+
+
+if __name__ == "__main__":
+    main()
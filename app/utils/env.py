@@ -46,6 +46,108 @@ class EnvConfig:
                 return default
         return value
 
+    #-----------------------------------------------------
+    # Logging Configuration
+    #-----------------------------------------------------
+    @property
+    def environment(self) -> str:
+        """Get deployment environment (development, test or production)."""
+        return self.get_env_var("ENVIRONMENT", "development").lower()
+
+    @property
+    def log_level(self) -> str:
+        """Get log level; DEBUG in development, INFO elsewhere."""
+        return self.get_env_var("LOG_LEVEL", "DEBUG" if self.environment == "development" else "INFO").upper()
+
+    @property
+    def log_format(self) -> str:
+        """Get console log format (color, text or json); color in development, json elsewhere."""
+        return self.get_env_var("LOG_FORMAT", "color" if self.environment == "development" else "json").lower()
+
+    @property
+    def log_file(self) -> str:
+        """Get path of the JSON log file."""
+        return self.get_env_var("LOG_FILE", "logs/dev.log")
+
+    @property
+    def log_queue_size(self) -> int:
+        """Get maximum records waiting for the log writer thread before new ones are dropped."""
+        return int(self.get_env_var("LOG_QUEUE_SIZE", "10000"))
+
+    @property
+    def log_rate_limit(self) -> int:
+        """Get records per second allowed per message template (0 disables the limit)."""
+        return int(self.get_env_var("LOG_RATE_LIMIT", "20"))
+
+    #-----------------------------------------------------
+    # Server Configuration
+    #-----------------------------------------------------
+    @property
+    def server_host(self) -> str:
+        """Get address the server binds to."""
+        return self.get_env_var("SERVER_HOST", "0.0.0.0")
+
+    @property
+    def server_port(self) -> int:
+        """Get port the server listens on."""
+        return int(self.get_env_var("SERVER_PORT", "8000"))
+
+    @property
+    def server_workers(self) -> int:
+        """Get number of worker processes (0 for one per available core)."""
+        return int(self.get_env_var("SERVER_WORKERS", "0"))
+
+    @property
+    def server_reload(self) -> bool:
+        """Get whether to run a single reloading worker for development."""
+        return self.get_env_var("SERVER_RELOAD", "false").lower() == "true"
+
+    @property
+    def server_graceful_timeout(self) -> int:
+        """Get seconds a worker may take to drain on shutdown."""
+        return int(self.get_env_var("SERVER_GRACEFUL_TIMEOUT", "30"))
+
+    #-----------------------------------------------------
+    # Metrics Configuration
+    #-----------------------------------------------------
+    @property
+    def metrics_enabled(self) -> bool:
+        """Get whether to time requests, sample the runtime and serve /metrics."""
+        return self.get_env_var("METRICS_ENABLED", "true").lower() == "true"
+
+    @property
+    def metrics_multiproc_dir(self) -> str:
+        """Get directory where server workers share their metrics."""
+        return self.get_env_var("METRICS_MULTIPROC_DIR", "data/metrics")
+
+    @property
+    def metrics_sample_interval(self) -> int:
+        """Get event loop lag and pool sampling interval in milliseconds."""
+        return int(self.get_env_var("METRICS_SAMPLE_INTERVAL", "1000"))
+
+    #-----------------------------------------------------
+    # Profiling Configuration
+    #-----------------------------------------------------
+    @property
+    def profiling_enabled(self) -> bool:
+        """Get whether management users may profile requests."""
+        return self.get_env_var("PROFILING_ENABLED", "false").lower() == "true"
+
+    @property
+    def profiling_interval(self) -> int:
+        """Get profiler sampling interval in microseconds."""
+        return int(self.get_env_var("PROFILING_INTERVAL", "1000"))
+
+    @property
+    def slow_query_threshold(self) -> int:
+        """Get duration in milliseconds above which a query is logged as slow (0 disables the log)."""
+        return int(self.get_env_var("SLOW_QUERY_THRESHOLD", "500"))
+
+    @property
+    def slow_query_log_file(self) -> str:
+        """Get slow query log file path."""
+        return self.get_env_var("SLOW_QUERY_LOG_FILE", "logs/slow.log")
+
     #-----------------------------------------------------
     # Database Configuration
     #-----------------------------------------------------
@@ -54,6 +156,36 @@ class EnvConfig:
         """Get database url."""
         return self.get_env_var("DATABASE_URL")
 
+    @property
+    def db_pool_size(self) -> int:
+        """Get database pool size."""
+        return int(self.get_env_var("DB_POOL_SIZE", "10"))
+
+    @property
+    def db_max_overflow(self) -> int:
+        """Get database pool max overflow."""
+        return int(self.get_env_var("DB_MAX_OVERFLOW", "20"))
+
+    @property
+    def db_pool_timeout(self) -> int:
+        """Get seconds to wait for a pooled connection."""
+        return int(self.get_env_var("DB_POOL_TIMEOUT", "30"))
+
+    @property
+    def db_pool_recycle(self) -> int:
+        """Get seconds after which pooled connections are recycled."""
+        return int(self.get_env_var("DB_POOL_RECYCLE", "1800"))
+
+    @property
+    def db_pool_pre_ping(self) -> bool:
+        """Get whether pooled connections are pinged before use."""
+        return self.get_env_var("DB_POOL_PRE_PING", "true").lower() == "true"
+
+    @property
+    def db_echo(self) -> bool:
+        """Get whether SQL statements are echoed."""
+        return self.get_env_var("DB_ECHO", "false").lower() == "true"
+
     #-----------------------------------------------------
     # InfluxDB Configuration
     #-----------------------------------------------------
@@ -80,22 +212,273 @@ class EnvConfig:
     @property
     def influxdb_batch_size(self) -> int:
         """Get influxdb batch size."""
-        return int(self.get_env_var("INFLUXDB_BATCH_SIZE", "1"))
+        return int(self.get_env_var("INFLUXDB_BATCH_SIZE", "5000"))
 
     @property
     def influxdb_flush_interval(self) -> int:
         """Get influxdb flush interval."""
-        return int(self.get_env_var("INFLUXDB_FLUSH_INTERVAL", "1"))
+        return int(self.get_env_var("INFLUXDB_FLUSH_INTERVAL", "1000"))
 
     @property
     def influxdb_jitter_interval(self) -> int:
         """Get influxdb jitter interval."""
-        return int(self.get_env_var("INFLUXDB_JITTER_INTERVAL", "1"))
+        return int(self.get_env_var("INFLUXDB_JITTER_INTERVAL", "0"))
 
     @property
     def influxdb_retry_interval(self) -> int:
         """Get influxdb retry interval."""
-        return int(self.get_env_var("INFLUXDB_RETRY_INTERVAL", "1"))
+        return int(self.get_env_var("INFLUXDB_RETRY_INTERVAL", "2000"))
+
+    @property
+    def influxdb_query_pool_size(self) -> int:
+        """Get number of Flight connections used for concurrent queries."""
+        return int(self.get_env_var("INFLUXDB_QUERY_POOL_SIZE", "4"))
+
+    @property
+    def influxdb_query_timeout(self) -> int:
+        """Get influxdb query timeout in milliseconds."""
+        return int(self.get_env_var("INFLUXDB_QUERY_TIMEOUT", "30000"))
+
+    #-----------------------------------------------------
+    # Ingest Pipeline Configuration
+    #-----------------------------------------------------
+    @property
+    def ingest_queue_size(self) -> int:
+        """Get ingest queue size (max buffered points)."""
+        return int(self.get_env_var("INGEST_QUEUE_SIZE", "100000"))
+
+    @property
+    def ingest_batch_size(self) -> int:
+        """Get ingest batch size (max points per write)."""
+        return int(self.get_env_var("INGEST_BATCH_SIZE", "5000"))
+
+    @property
+    def ingest_flush_interval(self) -> int:
+        """Get ingest flush interval in milliseconds."""
+        return int(self.get_env_var("INGEST_FLUSH_INTERVAL", "1000"))
+
+    @property
+    def ingest_high_watermark(self) -> int:
+        """Get queue fill percentage above which writes are reported as queued."""
+        return int(self.get_env_var("INGEST_HIGH_WATERMARK", "80"))
+
+    @property
+    def ingest_enqueue_timeout(self) -> int:
+        """Get milliseconds an HTTP ingest waits for queue space before rejecting."""
+        return int(self.get_env_var("INGEST_ENQUEUE_TIMEOUT", "500"))
+
+    @property
+    def ingest_stream_chunk_size(self) -> int:
+        """Get number of NDJSON lines validated and written per chunk."""
+        return int(self.get_env_var("INGEST_STREAM_CHUNK_SIZE", "5000"))
+
+    @property
+    def ingest_max_payload_size(self) -> int:
+        """Get maximum size in bytes of a decompressed ingest payload."""
+        return int(self.get_env_var("INGEST_MAX_PAYLOAD_SIZE", "16777216"))
+
+    @property
+    def ingest_spill_enabled(self) -> bool:
+        """Get whether unwritable batches are spilled to disk."""
+        return self.get_env_var("INGEST_SPILL_ENABLED", "true").lower() == "true"
+
+    @property
+    def ingest_spill_dir(self) -> str:
+        """Get directory of the ingest spill log."""
+        return self.get_env_var("INGEST_SPILL_DIR", "data/spill")
+
+    @property
+    def ingest_spill_segment_size(self) -> int:
+        """Get spill log segment size in bytes."""
+        return int(self.get_env_var("INGEST_SPILL_SEGMENT_SIZE", "67108864"))
+
+    @property
+    def ingest_spill_max_bytes(self) -> int:
+        """Get maximum spill log size per worker in bytes."""
+        return int(self.get_env_var("INGEST_SPILL_MAX_BYTES", "1073741824"))
+
+    @property
+    def ingest_spill_sync_interval(self) -> int:
+        """Get milliseconds between spill log fsyncs."""
+        return int(self.get_env_var("INGEST_SPILL_SYNC_INTERVAL", "200"))
+
+    @property
+    def ingest_dedup_window(self) -> int:
+        """Get number of recent timestamps per machine checked for duplicates (0 disables)."""
+        return int(self.get_env_var("INGEST_DEDUP_WINDOW", "1024"))
+
+    @property
+    def ingest_late_policy(self) -> str:
+        """Get handling of late points: accept or drop."""
+        return self.get_env_var("INGEST_LATE_POLICY", "accept").lower()
+
+    @property
+    def ingest_late_tolerance(self) -> int:
+        """Get seconds behind a machine's newest point before a point counts as late."""
+        return int(self.get_env_var("INGEST_LATE_TOLERANCE", "300"))
+
+    #-----------------------------------------------------
+    # Machine Registry Configuration
+    #-----------------------------------------------------
+    @property
+    def machine_cache_ttl(self) -> int:
+        """Get machine registry refresh interval in seconds."""
+        return int(self.get_env_var("MACHINE_CACHE_TTL", "300"))
+
+    @property
+    def machine_cache_negative_ttl(self) -> int:
+        """Get how long unknown machine ids are remembered in seconds."""
+        return int(self.get_env_var("MACHINE_CACHE_NEGATIVE_TTL", "30"))
+
+    #-----------------------------------------------------
+    # Query Cache Configuration
+    #-----------------------------------------------------
+    @property
+    def query_cache_bucket(self) -> int:
+        """Get width in seconds of a cached raw-data window."""
+        return int(self.get_env_var("QUERY_CACHE_BUCKET", "3600"))
+
+    @property
+    def query_cache_ttl(self) -> int:
+        """Get TTL in seconds of cached windows that can no longer change."""
+        return int(self.get_env_var("QUERY_CACHE_TTL", "86400"))
+
+    @property
+    def query_cache_live_ttl(self) -> int:
+        """Get TTL in seconds of the cached window at the live edge."""
+        return int(self.get_env_var("QUERY_CACHE_LIVE_TTL", "5"))
+
+    @property
+    def query_cache_settle(self) -> int:
+        """Get seconds after a window closes before it is treated as immutable."""
+        return int(self.get_env_var("QUERY_CACHE_SETTLE", "60"))
+
+    @property
+    def query_cache_invalidate_delay(self) -> int:
+        """Get seconds after accepting points before the cached windows they touch are dropped."""
+        return int(self.get_env_var("QUERY_CACHE_INVALIDATE_DELAY", "150"))
+
+    @property
+    def query_cache_lock_timeout(self) -> int:
+        """Get seconds a cache fill lock is held before other workers query themselves."""
+        return int(self.get_env_var("QUERY_CACHE_LOCK_TIMEOUT", "10"))
+
+    @property
+    def fleet_max_machines(self) -> int:
+        """Get the most machines a single fleet query may read."""
+        return int(self.get_env_var("FLEET_MAX_MACHINES", "100"))
+
+    #-----------------------------------------------------
+    # Live State Configuration
+    #-----------------------------------------------------
+    @property
+    def live_state_flush_interval(self) -> int:
+        """Get milliseconds between writes of changed live readings to Redis."""
+        return int(self.get_env_var("LIVE_STATE_FLUSH_INTERVAL", "200"))
+
+    @property
+    def live_push_interval(self) -> int:
+        """Get default milliseconds between pushes to a live client."""
+        return int(self.get_env_var("LIVE_PUSH_INTERVAL", "1000"))
+
+    @property
+    def live_push_min_interval(self) -> int:
+        """Get the shortest push interval in milliseconds a client may request."""
+        return int(self.get_env_var("LIVE_PUSH_MIN_INTERVAL", "100"))
+
+    @property
+    def live_push_max_subscribers(self) -> int:
+        """Get the most live clients one worker serves."""
+        return int(self.get_env_var("LIVE_PUSH_MAX_SUBSCRIBERS", "1000"))
+
+    @property
+    def live_push_keepalive(self) -> int:
+        """Get seconds between SSE keepalive comments on idle streams."""
+        return int(self.get_env_var("LIVE_PUSH_KEEPALIVE", "15"))
+
+    #-----------------------------------------------------
+    # Rule Engine Configuration
+    #-----------------------------------------------------
+    @property
+    def rules_alert_topic(self) -> str:
+        """Get the MQTT topic alerts are published on, with a {machine_id} placeholder."""
+        return self.get_env_var("RULES_ALERT_TOPIC", "/factory/A/machine/{machine_id}/alert")
+
+    @property
+    def rules_refresh_interval(self) -> int:
+        """Get seconds between reloads of the machine rules."""
+        return int(self.get_env_var("RULES_REFRESH_INTERVAL", "30"))
+
+    #-----------------------------------------------------
+    # Rollup Configuration
+    #-----------------------------------------------------
+    @property
+    def rollup_enabled(self) -> bool:
+        """Get whether this worker runs the rollup job."""
+        return self.get_env_var("ROLLUP_ENABLED", "true").lower() == "true"
+
+    @property
+    def rollup_interval(self) -> int:
+        """Get seconds between rollup runs."""
+        return int(self.get_env_var("ROLLUP_INTERVAL", "60"))
+
+    @property
+    def rollup_lag(self) -> int:
+        """Get seconds a bin must be closed before it is rolled up."""
+        return int(self.get_env_var("ROLLUP_LAG", "60"))
+
+    @property
+    def rollup_backfill(self) -> int:
+        """Get seconds of history rolled up when a tier starts empty."""
+        return int(self.get_env_var("ROLLUP_BACKFILL", "86400"))
+
+    @property
+    def rollup_max_span(self) -> int:
+        """Get the most seconds of data one tier rolls up per run."""
+        return int(self.get_env_var("ROLLUP_MAX_SPAN", "21600"))
+
+    #-----------------------------------------------------
+    # MQTT Configuration
+    #-----------------------------------------------------
+    @property
+    def mqtt_host(self) -> str:
+        """Get MQTT broker host."""
+        return self.get_env_var("MQTT_HOST", "emqx")
+
+    @property
+    def mqtt_port(self) -> int:
+        """Get MQTT broker port."""
+        return int(self.get_env_var("MQTT_PORT", "1883"))
+
+    @property
+    def mqtt_username(self) -> str:
+        """Get MQTT username (empty for anonymous)."""
+        return self.get_env_var("MQTT_USERNAME", "")
+
+    @property
+    def mqtt_password(self) -> str:
+        """Get MQTT password."""
+        return self.get_env_var("MQTT_PASSWORD", "")
+
+    @property
+    def mqtt_client_id(self) -> str:
+        """Get MQTT client id template; {hostname}, {pid} and {uuid} are filled in."""
+        return self.get_env_var("MQTT_CLIENT_ID", "gonsters-{hostname}-{pid}")
+
+    @property
+    def mqtt_qos(self) -> int:
+        """Get QoS of the telemetry subscriptions."""
+        return int(self.get_env_var("MQTT_QOS", "1"))
+
+    @property
+    def mqtt_shared_group(self) -> str:
+        """Get shared subscription group workers split telemetry in, by topic hash (empty to receive everything)."""
+        return self.get_env_var("MQTT_SHARED_GROUP", "ingest")
+
+    @property
+    def mqtt_max_inflight(self) -> int:
+        """Get maximum unacknowledged telemetry messages per connection."""
+        return int(self.get_env_var("MQTT_MAX_INFLIGHT", "100"))
 
     #-----------------------------------------------------
     # Redis Configuration
@@ -120,5 +503,30 @@ class EnvConfig:
         """Get redis expire."""
         return int(self.get_env_var("REDIS_EXPIRE", "60"))
 
+    @property
+    def redis_max_connections(self) -> int:
+        """Get size of the shared Redis connection pool."""
+        return int(self.get_env_var("REDIS_MAX_CONNECTIONS", "50"))
+
+    @property
+    def redis_codec(self) -> str:
+        """Get codec for cached values (msgpack or json)."""
+        return self.get_env_var("REDIS_CODEC", "msgpack")
+
+    @property
+    def redis_compression(self) -> str:
+        """Get compression for large cached values (zstd or none)."""
+        return self.get_env_var("REDIS_COMPRESSION", "zstd")
+
+    @property
+    def redis_compress_threshold(self) -> int:
+        """Get encoded size in bytes from which cached values are compressed."""
+        return int(self.get_env_var("REDIS_COMPRESS_THRESHOLD", "1024"))
+
+    @property
+    def redis_compression_level(self) -> int:
+        """Get zstd compression level for cached values."""
+        return int(self.get_env_var("REDIS_COMPRESSION_LEVEL", "3"))
+
 
 env = EnvConfig()
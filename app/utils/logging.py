@@ -1,11 +1,33 @@
-"""Logging configuration."""
-
+"""Logging configuration.
+
+Loggers never write from the calling thread: ``DevLogger`` attaches a
+shared ``QueueHandler`` and a single listener thread formats and writes
+every record, so a slow terminal or disk does not stall the event loop.
+Records are queued unformatted, so ``%``-style arguments (for example a
+whole payload) are only rendered for records that pass the level check,
+and then on the listener thread. The queue is bounded; when it is full
+records are dropped and counted rather than blocking the caller.
+
+Each message template is limited to ``LOG_RATE_LIMIT`` records per second
+per logger and level; the first record after a throttled second reports
+how many were suppressed. Hot paths should therefore log with ``%``-style
+arguments instead of f-strings, so repeats share one template.
+"""
+
+import atexit
 import json
 import logging
-from datetime import datetime
+import queue
+import threading
+from datetime import UTC, datetime
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from typing import Any
 
+from app.core.setting import settings
+
+MAX_RATE_KEYS = 4096
+
 
 class ColoredFormatter(logging.Formatter):
     """Console formatter with color output (dev only)."""
@@ -21,23 +43,14 @@ class ColoredFormatter(logging.Formatter):
 
     def format(self, record: logging.LogRecord) -> str:
         """Format."""
-        colored_level = f"{self.COLORS.get(record.levelname, self.RESET)}{record.levelname}{self.RESET}"
-        colored_msg = f"{self.COLORS.get(record.levelname, self.RESET)}{record.getMessage()}{self.RESET}"
-
-        # use a copy of the record to avoid modifying shared state
-        record_copy = logging.LogRecord(
-            name=record.name,
-            level=record.levelno,
-            pathname=record.pathname,
-            lineno=record.lineno,
-            msg=colored_msg,
-            args=record.args,
-            exc_info=record.exc_info,
+        color = self.COLORS.get(record.levelname, self.RESET)
+        line = (
+            f"🛠️ [DEV] {self.formatTime(record, self.datefmt)} — "
+            f"{color}{record.levelname}{self.RESET} — {color}{record.getMessage()}{self.RESET}"
         )
-        record_copy.levelname = colored_level
-        record_copy.created = record.created
-
-        return super().format(record_copy)
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
 
 
 class JSONFormatter(logging.Formatter):
@@ -46,7 +59,7 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """Format."""
         log: dict[str, Any] = {
-            "timestamp": datetime.fromtimestamp(record.created).isoformat() + "Z",
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat().replace("+00:00", "Z"),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -58,7 +71,144 @@ class JSONFormatter(logging.Formatter):
         if record.exc_info:
             log["exception"] = self.formatException(record.exc_info)
 
-        return json.dumps(log, ensure_ascii=False)
+        return json.dumps(log, ensure_ascii=False, default=str)
+
+
+FORMATTERS = {
+    "color": lambda: ColoredFormatter(datefmt="%H:%M:%S"),
+    "text": lambda: logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"),
+    "json": JSONFormatter,
+}
+
+
+class RateLimitFilter(logging.Filter):
+    """Let at most ``rate`` records per second through for each logger, level and message template."""
+
+    def __init__(self, rate: int):
+        """Initialize the limit."""
+        super().__init__()
+        self._rate = rate
+        self._lock = threading.Lock()
+        # key -> [second, records passed, records suppressed]
+        self._windows: dict[tuple, list[int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Return whether the record is within its template's rate."""
+        template = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+        key = (record.name, record.levelno, template)
+        second = int(record.created)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None and window[0] == second:
+                if window[1] < self._rate:
+                    window[1] += 1
+                    return True
+                window[2] += 1
+                return False
+
+            suppressed = window[2] if window is not None else 0
+            if len(self._windows) >= MAX_RATE_KEYS:
+                self._windows.clear()
+            self._windows[key] = [second, 1, 0]
+
+        if suppressed and isinstance(record.msg, str):
+            record.msg = f"{record.msg} (+{suppressed} similar suppressed)"
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue records as they are, dropping them when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        """Initialize."""
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Leave formatting to the listener thread."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue a record without blocking."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RouteHandler(logging.Handler):
+    """Hand each record to the handlers registered for its logger (listener side)."""
+
+    def __init__(self, routes: dict[str, list[logging.Handler]]):
+        """Initialize."""
+        super().__init__()
+        self._routes = routes
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Emit."""
+        for handler in self._routes.get(record.name, ()):
+            handler.handle(record)
+
+
+class LogPipeline:
+    """The process-wide log queue, its listener thread and the output handlers."""
+
+    def __init__(
+        self,
+        size: int = settings.LOG_QUEUE_SIZE,
+        console_format: str = settings.LOG_FORMAT,
+        rate: int = settings.LOG_RATE_LIMIT,
+    ):
+        """Initialize; the listener starts with the first registered logger."""
+        self._queue: queue.Queue = queue.Queue(size)
+        self._console_format = console_format
+        self._routes: dict[str, list[logging.Handler]] = {}
+        self._handlers: dict[str, logging.Handler] = {}
+        self._lock = threading.Lock()
+        self._listener: QueueListener | None = None
+        self.handler = DroppingQueueHandler(self._queue)
+        self.rate_limit = RateLimitFilter(rate) if rate > 0 else None
+
+    def _output(self, key: str) -> logging.Handler:
+        handler = self._handlers.get(key)
+        if handler is None:
+            if key == "console":
+                handler = logging.StreamHandler()
+                handler.setFormatter(FORMATTERS.get(self._console_format, JSONFormatter)())
+            else:
+                path = Path(key)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                handler = logging.FileHandler(path)
+                handler.setFormatter(JSONFormatter())
+            self._handlers[key] = handler
+        return handler
+
+    def register(self, logger: logging.Logger, log_path: str | None) -> None:
+        """Route a logger's records to the console and, with a path, to a JSON log file."""
+        with self._lock:
+            outputs = [self._output("console")]
+            if log_path:
+                outputs.append(self._output(log_path))
+            self._routes[logger.name] = outputs
+            logger.addHandler(self.handler)
+            if self.rate_limit is not None:
+                logger.addFilter(self.rate_limit)
+
+            if self._listener is None:
+                self._listener = QueueListener(self._queue, RouteHandler(self._routes))
+                self._listener.start()
+                atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Write out queued records and stop the listener thread."""
+        with self._lock:
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            # logging's own exit hook then flushes and closes the handlers
+            listener.stop()
+
+
+pipeline = LogPipeline()
 
 
 class DevLogger:
@@ -67,35 +217,16 @@ class DevLogger:
     def __init__(
         self,
         name: str = "dev-env",
-        level: int | None = logging.DEBUG,
+        level: int | str | None = None,
         to_file: bool = False,
-        log_path: str = "logs/dev.log",
+        log_path: str = settings.LOG_FILE,
     ):
-        """Initialize."""
+        """Initialize; the level defaults to ``LOG_LEVEL``."""
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(level or logging.DEBUG)
+        self.logger.setLevel(level or settings.LOG_LEVEL)
 
         if not self.logger.handlers:
-            # ───────────────────────────────────────────────
-            # Console logging (colored)
-            # ───────────────────────────────────────────────
-            color_fmt = "🛠️ [DEV] %(asctime)s — %(levelname)s — %(message)s"
-            stream_handler = logging.StreamHandler()
-            stream_handler.setFormatter(
-                ColoredFormatter(color_fmt, datefmt="%H:%M:%S")
-            )
-            self.logger.addHandler(stream_handler)
-
-            # ───────────────────────────────────────────────
-            # Optional file logging (JSON)
-            # ───────────────────────────────────────────────
-            if to_file:
-                log_path = Path(log_path)
-                log_path.parent.mkdir(parents=True, exist_ok=True)
-
-                file_handler = logging.FileHandler(log_path)
-                file_handler.setFormatter(JSONFormatter())
-                self.logger.addHandler(file_handler)
+            pipeline.register(self.logger, log_path if to_file else None)
 
     def get(self) -> logging.Logger:
         """Get logger."""
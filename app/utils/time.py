@@ -1,8 +1,33 @@
 """Datetime utils."""
 
-from datetime import UTC, datetime
+import re
+from datetime import UTC, datetime, timedelta
+
+INTERVAL_PATTERN = re.compile(r"^\s*(?P<value>\d+)\s*(?P<unit>[a-z]+)\s*$", re.IGNORECASE)
+INTERVAL_UNITS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "d": 86400, "day": 86400, "days": 86400,
+    "w": 604800, "week": 604800, "weeks": 604800,
+}
 
 
 def now_utc() -> datetime:
     """Get current UTC time."""
     return datetime.now(UTC)
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, treating naive values as UTC."""
+    parsed = datetime.fromisoformat(value.strip())
+    return parsed.replace(tzinfo=UTC) if parsed.tzinfo is None else parsed.astimezone(UTC)
+
+
+def parse_interval(value: str) -> timedelta:
+    """Parse a fixed-width interval such as ``30s``, ``5m`` or ``1 hour``."""
+    match = INTERVAL_PATTERN.match(value)
+    unit = INTERVAL_UNITS.get(match.group("unit").lower()) if match else None
+    if unit is None or int(match.group("value")) == 0:
+        raise ValueError(f"Invalid interval {value!r}")
+    return timedelta(seconds=int(match.group("value")) * unit)
@@ -1,11 +1,15 @@
 """Pytest configuration and fixtures."""
 import os
 import sys
+import tempfile
 from unittest.mock import MagicMock
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Log files go to a scratch directory, not the working tree
+log_dir = tempfile.mkdtemp(prefix="gonsters-test-logs-")
+
 # Set up test environment variables with default values
 test_env_vars = {
     # Database
@@ -40,6 +44,8 @@ test_env_vars = {
     "ENVIRONMENT": "test",
     "DEBUG": "True",
     "LOG_LEVEL": "INFO",
+    "LOG_FILE": os.path.join(log_dir, "dev.log"),
+    "SLOW_QUERY_LOG_FILE": os.path.join(log_dir, "slow.log"),
 
     # CORS
     "CORS_ORIGINS": "http://localhost:3000,http://localhost:8000",
@@ -59,4 +65,4 @@ mock_influx_client = MagicMock()
 # Apply the mock before any tests run
 import app.db.influx_db  # noqa: E402
 
-app.db.influx_db.client = mock_influx_client
+app.db.influx_db.create_write_client = lambda: mock_influx_client
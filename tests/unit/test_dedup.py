@@ -0,0 +1,88 @@
+"""Unit tests for the ingest Deduplicator."""
+from datetime import UTC, datetime, timedelta
+
+import pyarrow as pa
+
+from app.modules.ingest.service.dedup import Deduplicator
+from app.modules.ingest.service.line_protocol import SENSOR_SCHEMA
+
+START = datetime(2025, 1, 10, tzinfo=UTC)
+
+
+def readings(machine_id, *seconds):
+    """One reading per offset in seconds from START."""
+    return pa.table(
+        {
+            "machine_id": [machine_id] * len(seconds),
+            "time": [START + timedelta(seconds=s) for s in seconds],
+            "temperature": [float(s) for s in seconds],
+            "pressure": [None] * len(seconds),
+            "speed": [None] * len(seconds),
+        },
+        schema=SENSOR_SCHEMA,
+    )
+
+
+def offsets(table):
+    """Seconds from START of every row."""
+    return [int((t - START).total_seconds()) for t in table["time"].to_pylist()]
+
+
+def test_redelivered_and_repeated_points_are_dropped():
+    """Test points already written or repeated within a batch are filtered out."""
+    # Arrange
+    dedup = Deduplicator(window=8, late_policy="accept", tolerance=60)
+    dedup.remember(dedup.filter(readings(1, 0, 1, 2)))
+
+    # Act
+    fresh = dedup.filter(readings(1, 2, 3, 3, 1, 4))
+    other_machine = dedup.filter(readings(2, 1, 2))
+
+    # Assert
+    assert offsets(fresh) == [3, 4]
+    assert offsets(other_machine) == [1, 2]
+    assert dedup.stats.duplicates == 3
+
+
+def test_window_is_bounded():
+    """Test only the last ``window`` timestamps of a machine are remembered."""
+    # Arrange
+    dedup = Deduplicator(window=2, late_policy="accept", tolerance=3600)
+    dedup.remember(readings(1, 0, 1, 2))
+
+    # Act
+    fresh = dedup.filter(readings(1, 0, 1, 2))
+
+    # Assert
+    assert offsets(fresh) == [0]
+
+
+def test_late_points_follow_policy():
+    """Test points behind the tolerance are counted, and dropped only with the drop policy."""
+    # Arrange
+    accept = Deduplicator(window=8, late_policy="accept", tolerance=60)
+    drop = Deduplicator(window=8, late_policy="drop", tolerance=60)
+    for dedup in (accept, drop):
+        dedup.remember(readings(1, 600))
+
+    # Act
+    accepted = accept.filter(readings(1, 100, 590))
+    dropped = drop.filter(readings(1, 100, 590))
+
+    # Assert
+    assert offsets(accepted) == [100, 590]
+    assert offsets(dropped) == [590]
+    assert accept.stats.late == drop.stats.late == 1
+
+
+def test_unaccepted_points_are_not_remembered():
+    """Test filtering alone does not mark points as seen, so rejected writes can be retried."""
+    # Arrange
+    dedup = Deduplicator(window=8, late_policy="accept", tolerance=60)
+    dedup.filter(readings(1, 0, 1))
+
+    # Act
+    retried = dedup.filter(readings(1, 0, 1))
+
+    # Assert
+    assert offsets(retried) == [0, 1]
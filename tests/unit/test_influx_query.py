@@ -0,0 +1,84 @@
+"""Unit tests for InfluxQueryExecutor."""
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pyarrow as pa
+import pytest
+from pyarrow.flight import FlightTimedOutError
+
+from app.db.influx_query import InfluxQueryExecutor, QueryTimeoutError
+
+
+def test_query_binds_parameters_and_timeout():
+    """Test parameters and the timeout are passed to the Flight client."""
+    # Arrange
+    client = MagicMock()
+    client.query.return_value = pa.table({"speed": [1.0]})
+    executor = InfluxQueryExecutor(pool_size=2, timeout=1500, client_factory=lambda: client)
+
+    async def run():
+        await executor.start()
+        try:
+            return await executor.query("SELECT speed WHERE machine_id = $machine_id", {"machine_id": "1"})
+        finally:
+            await executor.stop()
+
+    # Act
+    table = asyncio.run(run())
+
+    # Assert
+    assert table.num_rows == 1
+    client.query.assert_called_once_with(
+        "SELECT speed WHERE machine_id = $machine_id", query_parameters={"machine_id": "1"}, timeout=1.5
+    )
+    client.close.assert_called_once()
+
+
+def test_concurrent_queries_are_bounded_by_pool_size():
+    """Test no more than pool_size queries and connections are used at once."""
+    # Arrange
+    running, peak, lock = 0, 0, threading.Lock()
+
+    def slow_query(sql, query_parameters, timeout):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return pa.table({})
+
+    factory = MagicMock(side_effect=lambda: MagicMock(query=MagicMock(side_effect=slow_query)))
+    executor = InfluxQueryExecutor(pool_size=3, client_factory=factory)
+
+    async def run():
+        await asyncio.gather(*(executor.query("SELECT 1") for _ in range(12)))
+        await executor.stop()
+
+    # Act
+    asyncio.run(run())
+
+    # Assert
+    assert peak == 3
+    assert factory.call_count == 3
+
+
+def test_flight_timeout_is_reported_as_query_timeout():
+    """Test a Flight timeout surfaces as QueryTimeoutError."""
+    # Arrange
+    client = MagicMock()
+    client.query.side_effect = FlightTimedOutError("deadline exceeded")
+    executor = InfluxQueryExecutor(pool_size=1, client_factory=lambda: client)
+
+    async def run():
+        try:
+            await executor.query("SELECT 1")
+        finally:
+            await executor.stop()
+
+    # Act & Assert
+    with pytest.raises(QueryTimeoutError):
+        asyncio.run(run())
@@ -0,0 +1,131 @@
+"""Unit tests for InfluxWriter."""
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+from app.db.influx_writer import InfluxWriter
+from app.db.spill_log import SpillLog
+from app.modules.ingest.schema.ingest_schema import WriteStatus
+
+
+def test_submit_rejects_when_queue_full():
+    """Test a batch that does not fit is rejected as a whole."""
+    async def run():
+        writer = InfluxWriter(
+            max_size=3, batch_size=10, flush_interval=1000, high_watermark=100, client_factory=MagicMock
+        )
+        await writer.start()
+        accepted = writer.submit(["a", "b"])
+        rejected = writer.submit(["c", "d"])
+        pending = writer.pending
+        await writer.stop()
+        return accepted, rejected, pending
+
+    accepted, rejected, pending = asyncio.run(run())
+
+    assert accepted == WriteStatus.accepted
+    assert rejected == WriteStatus.rejected
+    assert pending == 2
+
+
+def test_flushes_in_size_bounded_batches():
+    """Test buffered points are written in batches of at most batch_size."""
+    mock_client = MagicMock()
+
+    async def run():
+        writer = InfluxWriter(max_size=100, batch_size=4, flush_interval=50, client_factory=lambda: mock_client)
+        await writer.start()
+        writer.submit([f"line{i}" for i in range(10)])
+        await asyncio.sleep(0.2)
+        await writer.stop()
+
+    asyncio.run(run())
+
+    sizes = [len(call.kwargs["record"]) for call in mock_client.write.call_args_list]
+    assert sizes == [4, 4, 2]
+
+
+def test_enqueue_reports_backpressure():
+    """Test enqueue waits for space, then reports queued or rejected."""
+    async def run():
+        writer = InfluxWriter(max_size=4, batch_size=4, flush_interval=10, high_watermark=50, client_factory=MagicMock)
+        await writer.start()
+        first = await writer.enqueue(["a", "b", "c"], timeout=0)
+        waited = await writer.enqueue(["d", "e", "f"], timeout=500)
+        too_big = await writer.enqueue(["x"] * 5, timeout=500)
+        await writer.stop()
+        return first, waited, too_big
+
+    first, waited, too_big = asyncio.run(run())
+
+    assert first == WriteStatus.queued
+    assert waited == WriteStatus.queued
+    assert too_big == WriteStatus.rejected
+
+
+def test_failed_writes_spill_and_replay_in_order(tmp_path):
+    """Test batches written during an outage land on disk and are replayed in order."""
+    # Arrange
+    written = []
+    down = True
+
+    def write(database, record):
+        if down:
+            raise ConnectionError("influx down")
+        written.append(list(record))
+
+    async def run():
+        nonlocal down
+        spill = SpillLog(str(tmp_path), segment_size=64, max_bytes=1 << 20)
+        writer = InfluxWriter(max_size=100, batch_size=2, flush_interval=10, spill=spill,
+                              sync_interval=10, retry_interval=10, client_factory=lambda: MagicMock(write=write))
+        await writer.start()
+
+        # Act
+        writer.submit(["a", "b", "c", "d"])
+        await asyncio.sleep(0.1)
+        spilled = writer.spill_stats.spilled_batches
+        down = False
+        await asyncio.sleep(0.2)
+        writer.submit(["e"])
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        return spilled, writer.spill_stats
+
+    spilled, stats = asyncio.run(run())
+
+    # Assert
+    assert spilled == 2
+    assert written == [["a", "b"], ["c", "d"], ["e"]]
+    assert stats.replayed_batches == 2 and stats.pending_bytes == 0 and stats.segments == 0
+
+
+def test_stop_spills_batch_cut_off_mid_write(tmp_path):
+    """Test a batch whose write is still running at shutdown is kept in the spill log."""
+    # Arrange
+    started, release = threading.Event(), threading.Event()
+
+    def write(database, record):
+        started.set()
+        release.wait(5)
+
+    async def run():
+        spill = SpillLog(str(tmp_path), max_bytes=1 << 20)
+        writer = InfluxWriter(max_size=100, batch_size=2, flush_interval=10, spill=spill,
+                              client_factory=lambda: MagicMock(write=write))
+        await writer.start()
+        writer.submit(["a", "b"])
+        await asyncio.to_thread(started.wait, 5)
+
+        # Act
+        await writer.stop()
+        release.set()
+        return writer.spill_stats
+
+    stats = asyncio.run(run())
+    reopened = SpillLog(str(tmp_path))
+    reopened.open()
+
+    # Assert
+    assert stats.spilled_batches == 1
+    assert reopened.peek()[0] == ["a", "b"]
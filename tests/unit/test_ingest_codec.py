@@ -0,0 +1,114 @@
+"""Unit tests for ingest payload decoding."""
+import gzip
+import json
+
+import msgpack
+import pyarrow as pa
+import pytest
+import zstandard
+
+from app.modules.ingest.service.ingest_codec import (
+    ARROW,
+    JSON,
+    MSGPACK,
+    PayloadError,
+    PayloadTooLargeError,
+    UnsupportedFormatError,
+    decode_payload,
+    decompress,
+    media_format,
+)
+from app.modules.ingest.service.line_protocol import encode_table
+
+EXPECTED = [
+    "machine_sensor_data,machine_id=5 temperature=20.5 1736467200000000000",
+    "machine_sensor_data,machine_id=5 temperature=21,speed=3 1736467201000000000",
+]
+
+
+def test_media_format():
+    """Test content types map onto payload formats."""
+    assert media_format(None) == JSON
+    assert media_format("application/json; charset=utf-8") == JSON
+    assert media_format("application/x-msgpack") == MSGPACK
+    assert media_format("application/vnd.apache.arrow.stream") == ARROW
+    with pytest.raises(UnsupportedFormatError):
+        media_format("text/csv")
+
+
+def test_decode_msgpack_columnar():
+    """Test columnar msgpack goes straight into Arrow columns."""
+    body = msgpack.packb(
+        {
+            "machine_id": 5,
+            "time": [1736467200000000000, 1736467201000000000],
+            "temperature": [20.5, 21.0],
+            "speed": [None, 3.0],
+        }
+    )
+
+    assert encode_table(decode_payload(body, MSGPACK)) == EXPECTED
+
+
+def test_decode_arrow_stream():
+    """Test Arrow IPC streams are decoded with the machine id from the caller."""
+    table = pa.table({"time": pa.array([1736467200, 1736467201], pa.timestamp("s")), "temperature": [20.5, 21.0],
+                      "speed": [None, 3]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    assert encode_table(decode_payload(sink.getvalue().to_pybytes(), ARROW, machine_id=5)) == EXPECTED
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, zstandard.ZstdCompressor().compress])
+def test_decode_compressed_json_rows(compress):
+    """Test gzip/zstd JSON is sniffed and decoded from records."""
+    body = json.dumps(
+        {
+            "machine_id": 5,
+            "sensor_data": [
+                {"timestamp": "2025-01-10T00:00:00Z", "temperature": 20.5},
+                {"timestamp": "2025-01-10T00:00:01Z", "temperature": 21, "speed": 3},
+            ],
+        }
+    ).encode()
+
+    assert encode_table(decode_payload(compress(body), JSON)) == EXPECTED
+
+
+def test_decode_rejects_bad_payload():
+    """Test unreadable payloads raise PayloadError."""
+    with pytest.raises(PayloadError):
+        decode_payload(b"\x1f\x8bnot-gzip", JSON)
+    with pytest.raises(PayloadError):
+        decode_payload(msgpack.packb([{"temperature": 1}]), MSGPACK)
+
+
+def test_decode_rejects_payload_for_another_machine():
+    """Test a payload may repeat the caller's machine id but never name another machine."""
+    columnar = {"machine_id": 999, "time": [1736467200000000000], "temperature": [20.5]}
+    rows = {"machine_id": 999, "sensor_data": [{"timestamp": "2025-01-10T00:00:00Z", "temperature": 20.5}]}
+    table = pa.table({"machine_id": [7, 999], "time": pa.array([1, 2], pa.timestamp("s")), "temperature": [1.0, 2.0]})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    with pytest.raises(PayloadError):
+        decode_payload(msgpack.packb(columnar), MSGPACK, machine_id=7)
+    with pytest.raises(PayloadError):
+        decode_payload(json.dumps(rows).encode(), JSON, machine_id=7)
+    with pytest.raises(PayloadError):
+        decode_payload(sink.getvalue().to_pybytes(), ARROW, machine_id=7)
+    same = decode_payload(msgpack.packb(columnar | {"machine_id": 7}), MSGPACK, machine_id=7)
+    assert same["machine_id"].to_pylist() == [7]
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, zstandard.ZstdCompressor().compress])
+def test_decompress_stops_at_limit(compress):
+    """Test a payload inflating past the limit is refused without being inflated in full."""
+    bomb = compress(b"0" * 10_000_000)
+
+    assert decompress(compress(b"0" * 1000), limit=1000) == b"0" * 1000
+    with pytest.raises(PayloadTooLargeError):
+        decompress(bomb, limit=1000)
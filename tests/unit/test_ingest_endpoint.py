@@ -0,0 +1,35 @@
+"""Unit tests for the ingest endpoints."""
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.modules.ingest.endpoint import ingest_endpoint
+from app.modules.ingest.schema.ingest_schema import IngestStreamResult
+
+
+def make_client(service):
+    """Build a client for the ingest routes backed by ``service``."""
+    app = FastAPI()
+    app.include_router(ingest_endpoint.router)
+    app.dependency_overrides[ingest_endpoint.get_ingest_service] = lambda: service
+    return TestClient(app)
+
+
+def test_stream_rejects_unsupported_content_encoding():
+    """Test an NDJSON stream in an encoding the reader cannot inflate gets 415 instead of invalid lines."""
+    # Arrange
+    service = MagicMock(ingest_stream=AsyncMock(return_value=IngestStreamResult()))
+    client = make_client(service)
+    body = b'{"machine_id": 1}\n'
+
+    # Act
+    zstd = client.post("/ingest/stream", content=body, headers={"Content-Encoding": "zstd"})
+    identity = client.post("/ingest/stream", content=body, headers={"Content-Encoding": "identity"})
+    gzip = client.post("/ingest/stream", content=body, headers={"Content-Encoding": "GZIP"})
+
+    # Assert
+    assert zstd.status_code == 415
+    assert "zstd" in zstd.json()["detail"]
+    assert identity.status_code == gzip.status_code == 200
+    assert [call.args[1] for call in service.ingest_stream.await_args_list] == [False, True]
@@ -0,0 +1,34 @@
+"""Unit tests for the line-protocol encoder."""
+from datetime import UTC, datetime
+
+import pyarrow as pa
+
+from app.modules.ingest.schema.ingest_schema import Record
+from app.modules.ingest.service.line_protocol import escape_tag, to_line_protocol
+
+
+def test_to_line_protocol_skips_missing_fields():
+    """Test null fields are omitted and empty records dropped."""
+    # Arrange
+    ts = datetime(2025, 1, 10, tzinfo=UTC)
+    records = [
+        Record(timestamp=ts, temperature=25.5, pressure=1013.25, speed=0),
+        Record(timestamp=ts, pressure=2.5),
+        Record(timestamp=ts),
+        Record(timestamp=ts, temperature=float("nan"), speed=1.5),
+    ]
+
+    # Act
+    lines = to_line_protocol(3, records)
+
+    # Assert
+    assert lines == [
+        "machine_sensor_data,machine_id=3 temperature=25.5,pressure=1013.25,speed=0 1736467200000000000",
+        "machine_sensor_data,machine_id=3 pressure=2.5 1736467200000000000",
+        "machine_sensor_data,machine_id=3 speed=1.5 1736467200000000000",
+    ]
+
+
+def test_escape_tag():
+    """Test special characters in tag values are escaped."""
+    assert escape_tag(pa.array(["line A,east=1 x"])).to_pylist() == [r"line\ A\,east\=1\ x"]
@@ -0,0 +1,78 @@
+"""Unit tests for the live push hub."""
+import asyncio
+
+import pytest
+
+from app.modules.machine.service.live_push import LiveHub, Subscription
+
+
+def reading(time, speed=1.0):
+    """Build a live reading."""
+    return {"time": time, "temperature": None, "pressure": None, "speed": speed}
+
+
+def test_fast_updates_are_coalesced_per_interval():
+    """Test updates between pushes collapse to the newest reading per machine."""
+    # Arrange
+    subscription = Subscription({1, 2}, interval=50)
+
+    async def run():
+        subscription.offer(1, reading(1))
+        first = await subscription.next_batch()
+        for time in range(2, 10):
+            subscription.offer(1, reading(time, float(time)))
+        subscription.offer(2, reading(5))
+        subscription.offer(3, reading(5))
+        subscription.offer(1, reading(3))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        second = await subscription.next_batch()
+        return first, second, loop.time() - started
+
+    # Act
+    first, second, waited = asyncio.run(run())
+
+    # Assert
+    assert first == {1: reading(1)}
+    assert second == {1: reading(9, 9.0), 2: reading(5)}
+    assert waited >= 0.04
+
+
+def test_cancelled_wait_keeps_pending_readings():
+    """Test a keepalive timeout does not lose readings that arrive later."""
+    # Arrange
+    subscription = Subscription(None, interval=0)
+
+    async def run():
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(subscription.next_batch(), 0.01)
+        subscription.offer(7, reading(1))
+        return await asyncio.wait_for(subscription.next_batch(), 1)
+
+    # Act
+    batch = asyncio.run(run())
+
+    # Assert
+    assert batch == {7: reading(1)}
+
+
+def test_hub_fans_out_and_limits_subscribers():
+    """Test dispatch reaches every matching client and the subscriber cap holds."""
+    # Arrange
+    hub = LiveHub(redis=None, max_subscribers=2)
+    everything = hub.add(None, 0)
+    only_two = hub.add({2}, 0)
+
+    async def run():
+        hub.dispatch({1: reading(1), 2: reading(1)})
+        return await everything.next_batch(), await only_two.next_batch()
+
+    # Act
+    batches = asyncio.run(run())
+
+    # Assert
+    assert batches == ({1: reading(1), 2: reading(1)}, {2: reading(1)})
+    with pytest.raises(OverflowError):
+        hub.add(None, 0)
+    hub.remove(only_two)
+    assert hub.subscribers == 1
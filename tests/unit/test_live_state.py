@@ -0,0 +1,135 @@
+"""Unit tests for LiveState."""
+import asyncio
+from datetime import UTC, datetime
+
+import pyarrow as pa
+
+from app.lib.redis_codec import ValueSerializer
+from app.modules.ingest.service.line_protocol import SENSOR_SCHEMA
+from app.modules.machine.service.live_state import STATE_KEY, TIME_KEY, UPDATES_CHANNEL, LiveState
+
+SERIALIZER = ValueSerializer()
+
+
+class FakeRedis:
+    """In-memory stand-in for the RedisClient hash and script commands."""
+
+    def __init__(self):
+        """Initialize."""
+        self.hashes = {}
+        self.published = []
+        self.fail = False
+
+    def encode(self, value):
+        """Encode a value."""
+        return SERIALIZER.dumps(value)
+
+    async def run_script(self, script, keys, args):
+        """Apply the time-guarded update the Lua script performs."""
+        if self.fail:
+            return None
+        state, times = (self.hashes.setdefault(key, {}) for key in keys)
+        for member, time, value in zip(args[::3], args[1::3], args[2::3], strict=True):
+            if time >= times.get(member, -1):
+                times[member] = time
+                state[member] = SERIALIZER.loads(value)
+        return 1
+
+    async def publish(self, channel, value):
+        """Record a published value."""
+        self.published.append((channel, value))
+        return 1
+
+    async def hmget(self, key, fields):
+        """Get hash fields."""
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hgetall(self, key):
+        """Get a hash."""
+        return dict(self.hashes.get(key, {}))
+
+
+def sensor_table(rows):
+    """Build a sensor data table from (machine_id, second, temperature, speed) tuples."""
+    return pa.table(
+        {
+            "machine_id": [r[0] for r in rows],
+            "time": [datetime.fromtimestamp(r[1], UTC) for r in rows],
+            "temperature": [r[2] for r in rows],
+            "pressure": [None] * len(rows),
+            "speed": [r[3] for r in rows],
+        },
+        schema=SENSOR_SCHEMA,
+    )
+
+
+def test_update_keeps_newest_reading_per_machine():
+    """Test the newest row wins, nulls keep earlier values and late rows are ignored."""
+    # Arrange
+    state = LiveState(redis=FakeRedis())
+
+    # Act
+    state.update(sensor_table([(1, 10, 20.0, 5.0), (1, 30, None, 7.0), (2, 20, 40.0, None), (1, 20, 25.0, 6.0)]))
+    state.update(sensor_table([(1, 5, 99.0, 99.0)]))
+    state.update(sensor_table([(2, 40, None, 3.0)]))
+
+    # Assert
+    readings = asyncio.run(state.snapshot())
+    assert readings[1] == {"time": 30_000_000_000, "temperature": 25.0, "pressure": None, "speed": 7.0}
+    assert readings[2] == {"time": 40_000_000_000, "temperature": 40.0, "pressure": None, "speed": 3.0}
+
+
+def test_flush_writes_changed_machines_and_retries_on_error():
+    """Test flushed readings are served to other workers and failed flushes are retried."""
+    # Arrange
+    redis = FakeRedis()
+    writer, reader = LiveState(redis=redis), LiveState(redis=redis)
+    writer.update(sensor_table([(1, 10, 20.0, 5.0)]))
+    redis.fail = True
+
+    # Act
+    asyncio.run(writer.flush())
+    missed = asyncio.run(reader.get(1))
+    redis.fail = False
+    asyncio.run(writer.flush())
+
+    # Assert
+    assert missed is None
+    assert asyncio.run(reader.get(1))["temperature"] == 20.0
+    assert redis.hashes[TIME_KEY] == dict.fromkeys(["1:time", "1:temperature", "1:speed"], 10_000_000_000)
+    assert [(channel, list(value)) for channel, value in redis.published] == [(UPDATES_CHANNEL, ["1"])]
+    assert asyncio.run(reader.snapshot([1, 2])).keys() == {1}
+
+
+def test_unflushed_local_reading_beats_older_stored_one():
+    """Test a worker answers with its own newer reading before it is flushed."""
+    # Arrange
+    redis = FakeRedis()
+    redis.hashes[STATE_KEY] = {"1:time": 10, "1:temperature": 1.0, "1:speed": 2.0}
+    state = LiveState(redis=redis)
+    state.update(sensor_table([(1, 30, 3.0, None)]))
+
+    # Act
+    reading = asyncio.run(state.get(1))
+
+    # Assert
+    assert reading == {"time": 30_000_000_000, "temperature": 3.0, "pressure": None, "speed": 2.0}
+
+
+def test_partial_readings_from_two_workers_merge():
+    """Test a newer partial reading flushed by one worker keeps the fields another worker stored."""
+    # Arrange
+    redis = FakeRedis()
+    first, second, reader = LiveState(redis=redis), LiveState(redis=redis), LiveState(redis=redis)
+    first.update(sensor_table([(1, 10, 20.0, 5.0)]))
+    second.update(sensor_table([(1, 20, None, 7.0)]))
+
+    # Act
+    asyncio.run(second.flush())
+    asyncio.run(first.flush())
+
+    # Assert
+    expected = {"time": 20_000_000_000, "temperature": 20.0, "pressure": None, "speed": 7.0}
+    assert asyncio.run(reader.get(1)) == expected
+    assert asyncio.run(reader.snapshot()) == {1: expected}
+    assert redis.published[-1] == (UPDATES_CHANNEL, {"1": expected})
@@ -0,0 +1,45 @@
+"""Unit tests for the logging pipeline."""
+import logging
+import queue
+
+from app.utils.logging import DroppingQueueHandler, RateLimitFilter
+
+
+def make_record(msg, *args, created=1000.0, level=logging.INFO):
+    """Build a log record created at a fixed time."""
+    record = logging.LogRecord("test", level, __file__, 1, msg, args, None)
+    record.created = created
+    return record
+
+
+def test_rate_limit_suppresses_repeats_and_reports_them():
+    """Test a template is capped per second and the next second reports what was dropped."""
+    # Arrange
+    limit = RateLimitFilter(rate=2)
+
+    # Act
+    passed = [limit.filter(make_record("Processed message on %s", f"topic/{i}")) for i in range(5)]
+    other = limit.filter(make_record("Another message"))
+    later = make_record("Processed message on %s", "topic/9", created=1001.0)
+
+    # Assert
+    assert passed == [True, True, False, False, False]
+    assert other is True
+    assert limit.filter(later) is True
+    assert later.getMessage() == "Processed message on topic/9 (+3 similar suppressed)"
+
+
+def test_full_queue_drops_without_blocking():
+    """Test records beyond the queue size are counted and dropped, and queued records stay unformatted."""
+    # Arrange
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    payload = [25.5, 1013.0]
+
+    # Act
+    for _ in range(3):
+        handler.handle(make_record("payload %s", payload))
+
+    # Assert
+    queued = handler.queue.get_nowait()
+    assert handler.dropped == 2
+    assert queued.msg == "payload %s" and queued.args == (payload,)
@@ -0,0 +1,29 @@
+"""Unit tests for the machine endpoints."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.modules.machine.endpoint import machine_endpoint
+from app.modules.machine.service.live_push import Subscription
+
+
+def test_live_socket_treats_send_on_closed_socket_as_disconnect():
+    """Test a client that drops mid-send ends the socket quietly and frees its subscription."""
+    # Arrange
+    subscription = Subscription(None, interval=0)
+    subscription.offer(1, {"time": 1, "temperature": 20.0, "pressure": None, "speed": None})
+    websocket = MagicMock(
+        accept=AsyncMock(),
+        send_json=AsyncMock(side_effect=RuntimeError('Cannot call "send" once a close message has been sent.')),
+        receive_text=AsyncMock(side_effect=asyncio.Event().wait),
+    )
+
+    # Act
+    with (
+        patch.object(machine_endpoint, "open_subscription", AsyncMock(return_value=subscription)),
+        patch.object(machine_endpoint.live_hub, "remove") as remove,
+    ):
+        asyncio.run(machine_endpoint.live_socket(websocket))
+
+    # Assert
+    websocket.send_json.assert_awaited_once()
+    remove.assert_called_once_with(subscription)
@@ -1,48 +1,157 @@
 """Unit tests for MachineService."""
-from unittest.mock import Mock, patch
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.modules.machine.model.machine_model import Machine
+from app.modules.machine.service.machine_registry import machine_registry
 from app.modules.machine.service.machine_service import MachineService
 
 
+@pytest.fixture(autouse=True)
+def empty_registry():
+    """Start every test with a fresh, already-warmed machine registry."""
+    machine_registry.warm([])
+    yield
+    machine_registry.invalidate()
+
+
 @patch('app.modules.machine.service.machine_service.redis_client')
 def test_fetch_machine_found(mock_redis):
     """Test fetch_machine when machine is found."""
     # Arrange
-    mock_db = Mock(spec=Session)
+    mock_db = AsyncMock(spec=AsyncSession)
     mock_machine = Machine(id=1, name="Test Machine")
-    mock_db.query.return_value.filter.return_value.first.return_value = mock_machine
+    mock_db.get.return_value = mock_machine
 
     # Act
     with patch('app.modules.machine.service.machine_service.redis_client', mock_redis):
         service = MachineService(db=mock_db)
-        result = service.fetch_machine(machine_id=1)
+        result = asyncio.run(service.fetch_machine(machine_id=1))
 
     # Assert
     assert result is None  # Since the method doesn't return anything on success
-    mock_db.query.assert_called_once_with(Machine)
-    mock_db.query.return_value.filter.return_value.first.assert_called_once()
+    mock_db.get.assert_awaited_once_with(Machine, 1)
 
 
 @patch('app.modules.machine.service.machine_service.redis_client')
 def test_fetch_machine_not_found(mock_redis):
     """Test fetch_machine when machine is not found."""
     # Arrange
-    mock_db = Mock(spec=Session)
-    mock_db.query.return_value.filter.return_value.first.return_value = None
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.get.return_value = None
 
     # Act & Assert
     with patch('app.modules.machine.service.machine_service.redis_client', mock_redis):
         service = MachineService(db=mock_db)
         with pytest.raises(HTTPException) as exc_info:
-            service.fetch_machine(machine_id=999)
+            asyncio.run(service.fetch_machine(machine_id=999))
 
     # Assert
     assert exc_info.value.status_code == 404
     assert exc_info.value.detail == "Machine not found"
-    mock_db.query.assert_called_once_with(Machine)
-    mock_db.query.return_value.filter.return_value.first.assert_called_once()
+    mock_db.get.assert_awaited_once_with(Machine, 999)
+
+
+@patch('app.modules.machine.service.machine_service.redis_client')
+def test_fetch_machine_uses_registry(mock_redis):
+    """Test repeated lookups are served from the registry."""
+    # Arrange
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.get.side_effect = [Machine(id=1, name="Test Machine"), None]
+
+    async def run():
+        service = MachineService(db=mock_db)
+        await service.fetch_machine(machine_id=1)
+        await service.fetch_machine(machine_id=1)
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await service.fetch_machine(machine_id=999)
+
+    # Act
+    asyncio.run(run())
+
+    # Assert
+    assert mock_db.get.await_count == 2
+
+
+@patch('app.modules.machine.service.machine_service.redis_client')
+def test_fetch_machine_warms_stale_registry(mock_redis):
+    """Test a stale registry is reloaded with one bulk query."""
+    # Arrange
+    machine_registry.invalidate()
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.execute.return_value = Mock(scalars=Mock(return_value=[1, 2]))
+
+    # Act
+    service = MachineService(db=mock_db)
+    asyncio.run(service.fetch_machine(machine_id=2))
+
+    # Assert
+    mock_db.execute.assert_awaited_once()
+    mock_db.get.assert_not_awaited()
+    assert machine_registry.lookup(1) is True
+
+
+@pytest.mark.parametrize(
+    "kwargs, status_code",
+    [({}, 400), ({"machine_ids": [1, 999]}, 404), ({"machine_ids": [1, 2, 3]}, 400), ({"location": "plant-a"}, 400)],
+)
+def test_find_machines_rejects_bad_filters(kwargs, status_code):
+    """Test missing filters, unknown ids and oversized fleets are refused."""
+    # Arrange
+    machine_registry.warm([1, 2])
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.get.return_value = None
+    mock_db.execute.return_value = Mock(scalars=Mock(return_value=[1, 2, 3]))
+    service = MachineService(db=mock_db)
+
+    # Act & Assert
+    with (
+        patch("app.modules.machine.service.machine_service.settings.FLEET_MAX_MACHINES", 2),
+        pytest.raises(HTTPException) as exc_info,
+    ):
+        asyncio.run(service.find_machines(**kwargs))
+    assert exc_info.value.status_code == status_code
+
+
+def test_find_machines_filters_on_indexed_columns():
+    """Test location and sensor_type narrow explicit ids in one Postgres query."""
+    # Arrange
+    machine_registry.warm([1, 2, 3])
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.execute.return_value = Mock(scalars=Mock(return_value=[2, 3]))
+    service = MachineService(db=mock_db)
+
+    # Act
+    ids = asyncio.run(service.find_machines([1, 2, 3], location="plant-a", sensor_type="vibration"))
+
+    # Assert
+    assert ids == [2, 3]
+    statement = str(mock_db.execute.await_args.args[0])
+    assert "machine_metadata.location = " in statement and "machine_metadata.sensor_type = " in statement
+    mock_db.get.assert_not_awaited()
+
+
+def test_find_machines_checks_fleet_size_before_lookups():
+    """Test oversized id lists are refused before any lookup and unknown ids are resolved in one query."""
+    # Arrange
+    machine_registry.warm([1])
+    mock_db = AsyncMock(spec=AsyncSession)
+    mock_db.execute.return_value = Mock(scalars=Mock(return_value=[5]))
+    service = MachineService(db=mock_db)
+
+    # Act
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(service.find_machines(list(range(10_000))))
+    missing = asyncio.run(service.missing_machines([1, 5, 6, 7]))
+
+    # Assert
+    assert exc_info.value.status_code == 400
+    assert missing == [6, 7]
+    mock_db.execute.assert_awaited_once()
+    assert "machine_metadata.id IN" in str(mock_db.execute.await_args.args[0])
+    mock_db.get.assert_not_awaited()
@@ -0,0 +1,60 @@
+"""Unit tests for Prometheus metrics."""
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.lib.metrics import RequestMetricsMiddleware, metrics_endpoint
+from app.modules.machine.service.machine_registry import MachineRegistry
+
+
+def sample(name, **labels):
+    """Read a metric sample from the default registry, 0 when it was never recorded."""
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_timed_per_route_template():
+    """Test request latency is labelled with the route template, not the raw path, and served on /metrics."""
+    # Arrange
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+    app.add_route("/metrics", metrics_endpoint)
+    app.include_router(router, prefix="/api")
+    labels = {"method": "GET", "route": "/api/items/{item_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", **labels)
+
+    # Act
+    with TestClient(app) as client:
+        client.get("/api/items/1")
+        client.get("/api/items/2")
+        client.get("/missing")
+        response = client.get("/metrics")
+
+    # Assert
+    assert sample("http_request_duration_seconds_count", **labels) - before == 2
+    assert sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404") >= 1
+    assert response.status_code == 200
+    assert 'route="/api/items/{item_id}"' in response.text
+
+
+def test_registry_lookups_count_hits_and_misses():
+    """Test cached answers count as hits, known and missing alike, and unknown ids as misses."""
+    # Arrange
+    registry = MachineRegistry()
+    registry.warm([1])
+    registry.add_missing(2)
+    hits = sample("cache_lookups_total", cache="machine", result="hit")
+    misses = sample("cache_lookups_total", cache="machine", result="miss")
+
+    # Act
+    answers = [registry.lookup(machine_id) for machine_id in (1, 2, 3)]
+
+    # Assert
+    assert answers == [True, False, None]
+    assert sample("cache_lookups_total", cache="machine", result="hit") - hits == 2
+    assert sample("cache_lookups_total", cache="machine", result="miss") - misses == 1
@@ -0,0 +1,33 @@
+"""Unit tests for the MQTT consumer setup."""
+import asyncio
+import os
+from unittest.mock import AsyncMock
+
+from app.lib import mqtt
+
+
+def test_shared_topic_uses_group_prefix():
+    """Test a configured group turns a subscription into a shared one."""
+    topic = "/factory/A/machine/+/telemetry"
+    assert mqtt.shared_topic(topic, "ingest") == f"$share/ingest/{topic}"
+    assert mqtt.shared_topic(topic, "") == topic
+
+
+def test_client_id_is_unique_per_process():
+    """Test the client id template is filled with host and process details."""
+    assert mqtt.client_id("svc-{pid}") == f"svc-{os.getpid()}"
+    assert mqtt.client_id("svc-{uuid}") != mqtt.client_id("svc-{uuid}")
+
+
+def test_messages_are_acknowledged_after_handling():
+    """Test the PUBACK reason code is success once handled, even if handling fails."""
+    # Arrange
+    failing = AsyncMock(side_effect=RuntimeError("boom"))
+    handle = mqtt.acknowledged(failing)
+
+    # Act
+    code = asyncio.run(handle(None, "/factory/A/machine/1/telemetry", b"{}", 1, {}))
+
+    # Assert
+    failing.assert_awaited_once()
+    assert code == 0
@@ -0,0 +1,56 @@
+"""Unit tests for the NDJSON stream reader."""
+import asyncio
+import gzip
+
+import pytest
+
+from app.modules.ingest.service.ndjson_reader import MAX_LINE_BYTES, LineTooLongError, iter_batches, iter_lines
+
+
+async def chunked(data: bytes, size: int):
+    """Yield ``data`` in fixed-size pieces like a request body stream."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(stream) -> list:
+    """Drain an async iterator into a list."""
+    return [item async for item in stream]
+
+
+def test_iter_lines_reassembles_split_lines():
+    """Test lines split across body chunks are rejoined and blanks skipped."""
+    data = b'{"a": 1}\n\n{"b": 2}\r\n{"c": 3}'
+
+    lines = asyncio.run(collect(iter_lines(chunked(data, 3))))
+
+    assert [line.strip() for line in lines] == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+
+def test_iter_lines_detects_gzip():
+    """Test gzip bodies are decompressed incrementally."""
+    data = gzip.compress(b"\n".join(b'{"n": %d}' % i for i in range(1000)))
+
+    lines = asyncio.run(collect(iter_lines(chunked(data, 64))))
+
+    assert len(lines) == 1000
+    assert lines[-1] == b'{"n": 999}'
+
+
+def test_iter_lines_inflates_gzip_in_bounded_steps():
+    """Test one small gzip chunk expanding far past the line limit is read step by step."""
+    many = gzip.compress(b"\n".join(b'{"n": 0}' for _ in range(MAX_LINE_BYTES // 2)))
+    bomb = gzip.compress(b"0" * (MAX_LINE_BYTES * 50))
+
+    lines = asyncio.run(collect(iter_lines(chunked(many, len(many)))))
+
+    assert len(lines) == MAX_LINE_BYTES // 2
+    with pytest.raises(LineTooLongError):
+        asyncio.run(collect(iter_lines(chunked(bomb, len(bomb)))))
+
+
+def test_iter_batches():
+    """Test lines are grouped into bounded chunks."""
+    batches = asyncio.run(collect(iter_batches(iter_lines(chunked(b"1\n2\n3\n4\n5", 2)), 2)))
+
+    assert batches == [[b"1", b"2"], [b"3", b"4"], [b"5"]]
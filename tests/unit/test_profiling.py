@@ -0,0 +1,79 @@
+"""Unit tests for on-demand request profiling."""
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.lib.profiling import ProfilingMiddleware
+from app.utils.utlis import create_access_token
+
+
+def make_client():
+    """Build a client for an app with one profiled route."""
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, interval=100)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(3):
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def bearer(username, role):
+    """Build the authorization header for a user."""
+    return {"Authorization": f"Bearer {create_access_token({'username': username, 'role': role})}"}
+
+
+def test_management_user_gets_profile_instead_of_response():
+    """Test a profiled request answers with the call tree and keeps the original status in a header."""
+    # Arrange
+    client = make_client()
+
+    # Act
+    plain = client.get("/items/1")
+    profiled = client.get("/items/1", headers={"X-Profile": "1", **bearer("wildan", "management")})
+    speedscope = client.get("/items/1?profile=speedscope", headers=bearer("wildan", "management"))
+
+    # Assert
+    assert plain.json() == {"id": 1}
+    assert profiled.status_code == 200
+    assert profiled.headers["X-Profiled-Status"] == "200"
+    assert profiled.headers["content-type"].startswith("text/plain")
+    assert "Duration" in profiled.text
+    assert speedscope.json()["$schema"].startswith("https://www.speedscope.app")
+
+
+def test_profiling_is_refused_without_management_token():
+    """Test other roles and anonymous requests asking for a profile get 403."""
+    # Arrange
+    client = make_client()
+
+    # Act
+    anonymous = client.get("/items/1", headers={"X-Profile": "text"})
+    operator = client.get("/items/1?profile", headers=bearer("johndoe", "operator"))
+
+    # Assert
+    assert anonymous.status_code == 403
+    assert operator.status_code == 403
+
+
+def test_event_streams_pass_through_unprofiled():
+    """Test a server-sent event stream asked to be profiled is sent as it goes instead of buffered."""
+    # Arrange
+    client = make_client()
+
+    # Act
+    response = client.get("/events?profile", headers=bearer("wildan", "management"))
+
+    # Assert
+    assert response.status_code == 200
+    assert "X-Profiled-Status" not in response.headers
+    assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
@@ -0,0 +1,68 @@
+"""Unit tests for Redis value codecs."""
+import json
+
+import pyarrow as pa
+import pytest
+
+from app.lib.redis_codec import HEADER_FLAG, ValueSerializer
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        [{"time": "2025-01-10T00:00:00", "temperature": 21.5, "pressure": None}],
+        [],
+        {"nested": {"a": [1, 2, 3]}},
+        b"\x00\xffraw",
+    ],
+)
+def test_round_trip(value):
+    """Test values decode back to what was stored."""
+    # Arrange
+    serializer = ValueSerializer()
+
+    # Act
+    data = serializer.dumps(value)
+
+    # Assert
+    assert data[0] & HEADER_FLAG
+    assert serializer.loads(data) == value
+
+
+def test_arrow_table_round_trip():
+    """Test Arrow tables are stored as IPC streams."""
+    # Arrange
+    serializer = ValueSerializer()
+    table = pa.table({"time": ["2025-01-10T00:00:00"], "speed": [1.0]})
+
+    # Act
+    decoded = serializer.loads(serializer.dumps(table))
+
+    # Assert
+    assert decoded.equals(table)
+
+
+def test_large_values_are_compressed():
+    """Test payloads above the threshold are zstd compressed."""
+    # Arrange
+    rows = [{"time": f"2025-01-10T00:00:{i % 60:02d}", "speed": 1.0} for i in range(1000)]
+    compressed = ValueSerializer(threshold=1024)
+    plain = ValueSerializer(compression="none")
+
+    # Act
+    small, large = compressed.dumps(rows), plain.dumps(rows)
+
+    # Assert
+    assert len(small) < len(large) / 4
+    assert compressed.loads(small) == rows
+    assert plain.loads(small) == rows
+
+
+def test_legacy_json_values_still_decode():
+    """Test values written as JSON text before the header existed are read."""
+    # Arrange
+    serializer = ValueSerializer()
+
+    # Act & Assert
+    assert serializer.loads(json.dumps([{"speed": 1}]).encode()) == [{"speed": 1}]
+    assert serializer.loads(b"not json") == "not json"
@@ -0,0 +1,187 @@
+"""Unit tests for the rollup job and series planner."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pyarrow as pa
+import pytest
+
+from app.modules.machine.service.machine_service import plan_series
+from app.modules.machine.service.rollup_service import (
+    COVERAGE_KEY,
+    LATE_KEY,
+    TIERS_BY_NAME,
+    Coverage,
+    RollupJob,
+    iso,
+)
+
+NOW = 1_736_500_000  # 2025-01-10T09:06:40Z
+
+
+class FakeRedis:
+    """In-memory stand-in for the RedisClient hash, sorted set and lock commands."""
+
+    def __init__(self):
+        """Initialize."""
+        self.hashes = {}
+        self.zsets = {}
+
+    async def zadd(self, key, mapping, gt=False):
+        """Add scored members."""
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            zset[member] = max(score, zset.get(member, score)) if gt else score
+        return True
+
+    async def ztake(self, key, max_score):
+        """Pop members scored at most max_score."""
+        zset = self.zsets.get(key, {})
+        taken = [member for member, score in zset.items() if score <= max_score]
+        for member in taken:
+            del zset[member]
+        return taken
+
+    async def expire(self, key, expire):
+        """Renew a key."""
+        return True
+
+    async def hgetall(self, key):
+        """Get a hash."""
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key, mapping):
+        """Set hash fields."""
+        self.hashes.setdefault(key, {}).update(mapping)
+        return True
+
+    async def lock(self, key, expire):
+        """Take a lock."""
+        return True
+
+    async def delete(self, key):
+        """Delete a key."""
+        return True
+
+
+def rollup_table(*times):
+    """One 1m rollup row for machine 1 per epoch second."""
+    return pa.table(
+        {
+            "machine_id": ["1"] * len(times),
+            "time": pa.array([t * 1_000_000_000 for t in times], pa.timestamp("ns")),
+            **{f"{f}_{s}": [1.0] * len(times) for f in ("temperature", "pressure", "speed")
+               for s in ("avg", "min", "max", "count")},
+        }
+    )
+
+
+def make_job(redis, query):
+    """Build a job with mocked collaborators."""
+    writer = MagicMock(write=AsyncMock())
+    return RollupJob(lag=60, backfill=3600, max_span=1800, redis=redis, query=query, writer=writer), writer
+
+
+def test_first_run_backfills_finest_tier_only():
+    """Test an empty store starts 1m from the backfill origin, bounded by max_span."""
+    # Arrange
+    redis = FakeRedis()
+    query = MagicMock(query=AsyncMock(return_value=rollup_table(NOW - 3600)))
+    job, writer = make_job(redis, query)
+
+    # Act
+    asyncio.run(job.run_once(now=NOW))
+
+    # Assert
+    closed = (NOW - 60) // 60 * 60
+    origin = closed - 3600
+    assert redis.hashes[COVERAGE_KEY] == {"1m:origin": origin, "1m:watermark": origin + 1800}
+    sql, params = query.query.await_args.args
+    assert "FROM machine_sensor_data\n" in sql and "COUNT(speed) AS speed_count" in sql
+    line = writer.write.await_args.args[0][0]
+    assert line.startswith("machine_sensor_data_1m,machine_id=1 temperature_avg=1,temperature_min=1,")
+
+
+def test_coarser_tier_stops_at_source_watermark():
+    """Test 5m never rolls past what 1m had covered when the run started."""
+    # Arrange
+    redis = FakeRedis()
+    redis.hashes[COVERAGE_KEY] = {"1m:origin": NOW - 7260, "1m:watermark": NOW - 6600}
+    query = MagicMock(query=AsyncMock(return_value=rollup_table()))
+    job, _ = make_job(redis, query)
+
+    # Act
+    asyncio.run(job.run_once(now=NOW))
+
+    # Assert
+    coverage = asyncio.run(job.coverage())
+    assert coverage["5m"] == Coverage(-(-(NOW - 7260) // 300) * 300, (NOW - 6600) // 300 * 300)
+    assert coverage["1m"].watermark > NOW - 6600
+    assert "1h" not in coverage
+
+
+def test_watermark_waits_for_confirmed_write():
+    """Test a tier's coverage does not move when InfluxDB refuses the rolled-up points."""
+    # Arrange
+    redis = FakeRedis()
+    query = MagicMock(query=AsyncMock(return_value=rollup_table(NOW - 3600)))
+    job, writer = make_job(redis, query)
+    writer.write.side_effect = OSError("influx down")
+
+    # Act
+    with pytest.raises(OSError):
+        asyncio.run(job.run_once(now=NOW))
+
+    # Assert
+    assert asyncio.run(job.coverage()) == {}
+
+
+def test_late_points_roll_covered_bins_up_again():
+    """Test a point behind the watermark marks its bin and every tier re-rolls the bins containing it."""
+    # Arrange
+    redis = FakeRedis()
+    redis.hashes[COVERAGE_KEY] = {
+        "1m:origin": 0, "1m:watermark": NOW - 120, "5m:origin": 0, "5m:watermark": NOW - 600,
+        "1h:origin": 0, "1h:watermark": NOW - 7200,
+    }
+    query = MagicMock(query=AsyncMock(return_value=rollup_table()))
+    job, _ = make_job(redis, query)
+    late = NOW - 9000
+    table = pa.table({"time": pa.array([late * 1_000_000_000, NOW * 1_000_000_000], pa.timestamp("ns", "UTC"))})
+
+    async def run():
+        job._task = asyncio.get_running_loop().create_future()  # started
+        job.mark_late(table, now=NOW)
+        await job.run_once(now=NOW)  # marked just now, its points may not be flushed yet
+        first = [call.args[1]["start"] for call in query.query.await_args_list]
+        query.query.reset_mock()
+        await job.run_once(now=NOW + 60)
+        return first
+
+    # Act
+    first = asyncio.run(run())
+
+    # Assert
+    rerolled = [(call.args[1]["start"], call.args[1]["end"]) for call in query.query.await_args_list[:3]]
+    minute, five, hour = late // 60 * 60, late // 300 * 300, late // 3600 * 3600
+    assert iso(minute) not in first
+    assert rerolled == [
+        (iso(minute), iso(minute + 60)), (iso(five), iso(five + 300)), (iso(hour), iso(hour + 3600)),
+    ]
+    assert redis.zsets[LATE_KEY] == {}
+
+
+def test_plan_uses_coarsest_tier_and_raw_edges():
+    """Test the planner reads covered bins from rollups and the rest raw."""
+    # Arrange
+    coverage = {"1m": Coverage(0, NOW), "5m": Coverage(3600, 7200)}
+
+    # Act
+    hourly = plan_series(timedelta(minutes=10), 0, 10800, coverage)
+    per_minute = plan_series(timedelta(minutes=1), 0, NOW + 600, coverage)
+    seconds = plan_series(timedelta(seconds=30), 0, 600, coverage)
+
+    # Assert
+    assert hourly == [(None, 0, 3600), (TIERS_BY_NAME["5m"], 3600, 7200), (None, 7200, 10800)]
+    assert per_minute == [(TIERS_BY_NAME["1m"], 0, NOW // 60 * 60), (None, NOW // 60 * 60, NOW + 600)]
+    assert seconds == [(None, 0, 600)]
@@ -0,0 +1,99 @@
+"""Unit tests for the rule engine."""
+from datetime import UTC, datetime
+
+import pyarrow as pa
+import pytest
+from pydantic import ValidationError
+
+from app.modules.ingest.service.line_protocol import SENSOR_SCHEMA
+from app.modules.machine.model.rule_model import MachineRule, RuleKind
+from app.modules.machine.schema.machine_schema import RuleSchema
+from app.modules.machine.service.rule_engine import RuleEngine
+
+
+def sensor_table(machine_id, temperatures, start=0):
+    """One point per second for a machine."""
+    count = len(temperatures)
+    return pa.table(
+        {
+            "machine_id": [machine_id] * count,
+            "time": [datetime.fromtimestamp(start + i, UTC) for i in range(count)],
+            "temperature": temperatures,
+            "pressure": [None] * count,
+            "speed": [None] * count,
+        },
+        schema=SENSOR_SCHEMA,
+    )
+
+
+def make_engine(*rules):
+    """Build an engine with the given rules that records published alerts."""
+    published = []
+    engine = RuleEngine(topic="/alerts/{machine_id}")
+    engine._publish = lambda topic, alert: published.append((topic, alert))
+    engine.load(MachineRule(id=i, machine_id=1, field="temperature", **rule) for i, rule in enumerate(rules, 1))
+    return engine, published
+
+
+def test_threshold_alerts_once_per_excursion():
+    """Test a sustained excursion alerts once and the rule re-arms afterwards."""
+    # Arrange
+    engine, published = make_engine({"kind": RuleKind.threshold, "max_value": 80.0})
+
+    # Act
+    engine.evaluate(sensor_table(1, [70.0, 85.0, 90.0, 75.0, 95.0]))
+    engine.evaluate(sensor_table(2, [500.0]))
+
+    # Assert
+    assert [alert["value"] for _, alert in published] == [85.0, 95.0]
+    assert published[0][0] == "/alerts/1"
+    assert published[0][1]["time"] == "1970-01-01T00:00:01+00:00"
+
+
+def test_rate_of_change_uses_point_spacing():
+    """Test rate rules compare change per second, across batches."""
+    # Arrange
+    engine, published = make_engine({"kind": RuleKind.rate, "max_rate": 5.0})
+
+    # Act
+    engine.evaluate(sensor_table(1, [10.0, 14.0]))
+    engine.evaluate(sensor_table(1, [30.0], start=2))
+
+    # Assert
+    assert len(published) == 1
+    assert "+16/s" in published[0][1]["message"]
+
+
+def test_rate_ignores_late_points_as_baseline():
+    """Test a late point neither alerts nor replaces the newest point as the rate baseline."""
+    # Arrange
+    engine, published = make_engine({"kind": RuleKind.rate, "max_rate": 5.0})
+    engine.evaluate(sensor_table(1, [10.0], start=10))
+
+    # Act
+    engine.evaluate(sensor_table(1, [100.0], start=5))
+    engine.evaluate(sensor_table(1, [12.0], start=11))
+
+    # Assert
+    assert published == []
+
+
+def test_zscore_flags_outlier_against_rolling_window():
+    """Test a point far from the last window is flagged once the window is full."""
+    # Arrange
+    engine, published = make_engine({"kind": RuleKind.zscore, "window": 4, "z_limit": 3.0})
+
+    # Act
+    engine.evaluate(sensor_table(1, [100.0, 50.0, 10.0, 11.0, 9.0, 10.0, 10.5, 30.0]))
+
+    # Assert
+    assert [alert["value"] for _, alert in published] == [30.0]
+
+
+def test_rule_schema_requires_kind_parameters():
+    """Test a rule without its kind's parameters is rejected."""
+    # Act & Assert
+    with pytest.raises(ValidationError):
+        RuleSchema(field="temperature", kind=RuleKind.zscore, window=10)
+    with pytest.raises(ValidationError):
+        RuleSchema(field="humidity", kind=RuleKind.threshold, max_value=1.0)
@@ -0,0 +1,212 @@
+"""Unit tests for SeriesCache."""
+import asyncio
+import fnmatch
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import pyarrow as pa
+import pytest
+
+from app.modules.machine.service.series_cache import CacheInvalidator, SeriesCache
+
+
+class FakeRedis:
+    """In-memory stand-in for RedisClient."""
+
+    def __init__(self):
+        """Initialize."""
+        self.store = {}
+        self.expires = {}
+
+    async def mget(self, keys):
+        """Get many values."""
+        return [self.store.get(key) for key in keys]
+
+    async def mset(self, mapping, expire=None):
+        """Set many values."""
+        for key, value in mapping.items():
+            self.store[key] = value
+            self.expires[key] = expire
+        return True
+
+    async def lock(self, key, expire):
+        """Take a lock."""
+        if key in self.store:
+            return False
+        self.store[key] = "1"
+        return True
+
+    async def scan(self, pattern):
+        """Find keys matching a glob pattern."""
+        return [key for key in self.store if fnmatch.fnmatchcase(key, pattern)]
+
+    async def delete(self, *keys):
+        """Delete keys."""
+        deleted = [key for key in keys if self.store.pop(key, None) is not None]
+        return bool(deleted)
+
+
+SCHEMA = pa.schema([("time", pa.timestamp("ns")), ("speed", pa.float64())])
+
+
+def hourly_rows(lo, hi):
+    """One row per hour in ``lo <= time < hi``, newest first."""
+    hours = int((hi - lo).total_seconds() // 3600)
+    times = [(lo + timedelta(hours=h)).replace(tzinfo=None) for h in reversed(range(hours))]
+    return pa.table({"time": times, "speed": [float(h) for h in reversed(range(hours))]}, schema=SCHEMA)
+
+
+def hours(table):
+    """Hours of day in a result table's time column."""
+    return [t.hour for t in table["time"].to_pylist()]
+
+
+@pytest.fixture
+def redis():
+    """Provide an empty fake Redis."""
+    return FakeRedis()
+
+
+def test_overlapping_ranges_reuse_windows(redis):
+    """Test a shifted range only queries the windows not cached yet."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600, ttl=86400, live_ttl=5, settle=60)
+    query = AsyncMock(side_effect=lambda lo, hi: hourly_rows(lo, hi))
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+
+    # Act
+    first = asyncio.run(cache.fetch("m:1", day, day + timedelta(hours=3), None, SCHEMA, query))
+    second = asyncio.run(cache.fetch("m:1", day + timedelta(hours=2), day + timedelta(hours=5), None, SCHEMA, query))
+
+    # Assert
+    assert hours(first) == [3, 2, 1, 0]
+    assert hours(second) == [5, 4, 3, 2]
+    assert query.await_count == 2
+    assert query.await_args.args == (day + timedelta(hours=4), day + timedelta(hours=6))
+    assert set(redis.expires.values()) == {86400}
+
+
+def test_empty_result_is_served_from_cache(redis):
+    """Test a window without data is cached rather than re-queried."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600)
+    query = AsyncMock(return_value=SCHEMA.empty_table())
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+
+    # Act
+    for _ in range(2):
+        result = asyncio.run(cache.fetch("m:1", day, day + timedelta(minutes=30), None, SCHEMA, query))
+
+    # Assert
+    assert result.num_rows == 0
+    assert result.schema == SCHEMA
+    query.assert_awaited_once()
+
+
+def test_live_edge_gets_short_ttl(redis):
+    """Test the window containing now expires quickly, aligned to the interval."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600, ttl=86400, live_ttl=5, settle=60)
+    query = AsyncMock(return_value=SCHEMA.empty_table())
+    now = datetime.now(UTC)
+
+    # Act
+    asyncio.run(cache.fetch("m:1", now - timedelta(hours=2), now, timedelta(minutes=7), SCHEMA, query))
+
+    # Assert
+    width = cache.window(timedelta(minutes=7))
+    assert width == 3780
+    live_key = f"m:1:{width}:{int(now.timestamp()) // width}"
+    assert redis.expires[live_key] == 5
+
+
+def test_concurrent_requests_share_one_query(redis):
+    """Test 50 simultaneous refreshes trigger a single query."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600)
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+
+    async def slow_query(lo, hi):
+        await asyncio.sleep(0.01)
+        return hourly_rows(lo, hi)
+
+    query = AsyncMock(side_effect=slow_query)
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.fetch("m:1", day, day + timedelta(minutes=59), None, SCHEMA, query) for _ in range(50))
+        )
+
+    # Act
+    results = asyncio.run(run())
+
+    # Assert
+    query.assert_awaited_once()
+    assert all(result.num_rows == 1 for result in results)
+    assert not any(key.startswith("lock:") for key in redis.store)
+
+
+def test_fetch_many_reads_all_series_in_one_round_trip(redis):
+    """Test several machines' cached windows are read with a single MGET."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600)
+    query = AsyncMock(side_effect=lambda lo, hi: hourly_rows(lo, hi))
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+    queries = {f"m:{i}": query for i in range(200)}
+    asyncio.run(cache.fetch_many(queries, day, day + timedelta(hours=2), None, SCHEMA))
+    redis.mget = AsyncMock(side_effect=redis.mget)
+
+    # Act
+    results = asyncio.run(cache.fetch_many(queries, day, day + timedelta(hours=2), None, SCHEMA))
+
+    # Assert
+    redis.mget.assert_awaited_once()
+    assert query.await_count == 200
+    assert all(table.num_rows == 3 for table in results.values())
+
+
+def test_fetch_batch_loads_missing_series_with_one_query(redis):
+    """Test only series with missing windows are loaded, together in one query."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600)
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+    asyncio.run(cache.fetch("m:1", day, day + timedelta(hours=2), None, SCHEMA, AsyncMock(side_effect=hourly_rows)))
+    query = AsyncMock(side_effect=lambda prefixes, lo, hi: {p: hourly_rows(lo, hi) for p in prefixes})
+
+    # Act
+    results = asyncio.run(cache.fetch_batch(["m:1", "m:2", "m:3"], day, day + timedelta(hours=2), None, SCHEMA, query))
+
+    # Assert
+    query.assert_awaited_once()
+    assert query.await_args.args == (["m:2", "m:3"], day, day + timedelta(hours=3))
+    assert {prefix: hours(table) for prefix, table in results.items()} == {p: [2, 1, 0] for p in ("m:1", "m:2", "m:3")}
+
+
+def test_late_point_drops_cached_closed_window(redis):
+    """Test a late point in a closed, cached window drops it once written, so the next read returns the point."""
+    # Arrange
+    cache = SeriesCache(redis, bucket=3600, ttl=86400, live_ttl=5, settle=60)
+    invalidator = CacheInvalidator(cache, lambda machine_id: f"m:{machine_id}", MagicMock(spill_stats=None), delay=150)
+    invalidator._task = MagicMock()
+    day = datetime(2025, 1, 10, tzinfo=UTC)
+    late = day + timedelta(minutes=30)
+    influx = {"rows": hourly_rows(day, day + timedelta(hours=1))}
+    query = AsyncMock(side_effect=lambda lo, hi: influx["rows"])
+    for prefix in ("m:1:raw", "m:2:raw"):
+        asyncio.run(cache.fetch(prefix, day, day + timedelta(minutes=59), None, SCHEMA, query))
+    now = (day + timedelta(days=1)).timestamp()
+
+    # Act
+    invalidator.mark(pa.table({"machine_id": [1], "time": pa.array([late], pa.timestamp("ns", "UTC"))}), now=now)
+    times = [late.replace(tzinfo=None), day.replace(tzinfo=None)]
+    influx["rows"] = pa.table({"time": times, "speed": [9.0, 0.0]}, schema=SCHEMA)
+    asyncio.run(invalidator.run_once(now=now + 10))
+    before = asyncio.run(cache.fetch("m:1:raw", day, day + timedelta(minutes=59), None, SCHEMA, query))
+    asyncio.run(invalidator.run_once(now=now + 150))
+    after = asyncio.run(cache.fetch("m:1:raw", day, day + timedelta(minutes=59), None, SCHEMA, query))
+
+    # Assert
+    assert before["speed"].to_pylist() == [0.0]
+    assert after["speed"].to_pylist() == [9.0, 0.0]
+    assert query.await_count == 3
+    assert f"m:2:raw:3600:{int(day.timestamp()) // 3600}" in redis.store
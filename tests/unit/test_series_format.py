@@ -0,0 +1,67 @@
+"""Unit tests for series response formats."""
+import io
+import json
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+from app.modules.machine.service import series_format
+
+
+@pytest.fixture
+def table():
+    """Two rows, one with a sub-second timestamp."""
+    return pa.table(
+        {
+            "time": pa.array([datetime(2025, 1, 10, 0, 0, 1, 500000), datetime(2025, 1, 10)], pa.timestamp("ns")),
+            "speed": [2.0, None],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("accept", "expected"),
+    [
+        (None, series_format.JSON),
+        ("*/*", series_format.JSON),
+        ("application/vnd.apache.arrow.stream", series_format.ARROW),
+        ("text/html, application/x-parquet;q=0.9, application/json;q=0.5", series_format.PARQUET),
+        ("application/json;q=0.2, application/vnd.gonsters.columnar+json", series_format.COLUMNAR_JSON),
+    ],
+)
+def test_negotiate(accept, expected):
+    """Test the best supported media type wins."""
+    # Act & Assert
+    assert series_format.negotiate(accept) == expected
+
+
+def test_negotiate_rejects_unsupported():
+    """Test an Accept header with nothing we can produce is refused."""
+    # Act & Assert
+    with pytest.raises(series_format.NotAcceptableError):
+        series_format.negotiate("text/csv, application/json;q=0")
+
+
+def test_json_formats_match_varchar_time(table):
+    """Test JSON output keeps the time strings the endpoint used to return."""
+    # Act
+    rows = series_format.to_rows(table)
+    body = json.loads(series_format.to_columnar_json(table, "ok"))
+
+    # Assert
+    assert rows == [{"time": "2025-01-10T00:00:01.500", "speed": 2.0}, {"time": "2025-01-10T00:00:00", "speed": None}]
+    assert body["data"] == {"time": ["2025-01-10T00:00:01.500", "2025-01-10T00:00:00"], "speed": [2.0, None]}
+
+
+def test_binary_formats_round_trip(table):
+    """Test Arrow IPC and Parquet bodies decode to the same table."""
+    # Act
+    from_arrow = ipc.open_stream(series_format.to_arrow(table)).read_all()
+    from_parquet = pq.read_table(io.BytesIO(series_format.to_parquet(table)))
+
+    # Assert
+    assert from_arrow.equals(table)
+    assert from_parquet.equals(table)
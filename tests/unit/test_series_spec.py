@@ -0,0 +1,68 @@
+"""Unit tests for SeriesSpec."""
+from datetime import timedelta
+
+import pyarrow as pa
+import pytest
+
+from app.modules.machine.service.rollup_service import TIERS_BY_NAME
+from app.modules.machine.service.series_spec import SeriesSpec
+
+
+def test_all_aggregates_come_from_one_scan():
+    """Test every requested aggregate is selected by a single grouped query."""
+    # Arrange
+    spec = SeriesSpec(timedelta(minutes=5), ["speed,temperature"], ["min", "max", "p95", "last", "count"])
+
+    # Act
+    sql = spec.sql()
+
+    # Assert
+    assert sql.count("FROM machine_sensor_data") == 1
+    assert 'APPROX_PERCENTILE_CONT(speed, 0.95) AS "speed_p95"' in sql
+    assert 'LAST_VALUE(temperature ORDER BY time) AS "temperature_last"' in sql
+    assert spec.schema.field("speed_count").type == pa.int64()
+    assert spec.schema.field("speed_min").type == pa.float64()
+    assert not spec.rollup_compatible
+
+
+def test_rollup_aggregates_read_from_tiers():
+    """Test avg/min/max/count are rebuilt from rollup columns."""
+    # Arrange
+    spec = SeriesSpec(timedelta(hours=1), ["pressure"], ["avg", "max", "count"])
+
+    # Act
+    sql = spec.sql(TIERS_BY_NAME["5m"])
+
+    # Assert
+    assert spec.rollup_compatible
+    assert "FROM machine_sensor_data_5m" in sql
+    assert "MAX(pressure_max)" in sql and "CAST(SUM(pressure_count) AS BIGINT)" in sql
+
+
+def test_default_spec_keeps_plain_columns_and_key():
+    """Test requests without fields or aggregates keep the original shape and cache key."""
+    # Arrange & Act
+    spec = SeriesSpec(timedelta(minutes=5))
+    raw = SeriesSpec(None)
+
+    # Assert
+    assert spec.schema.names == ["time", "temperature", "pressure", "speed"]
+    assert spec.key == "300"
+    assert raw.key == "raw"
+    assert SeriesSpec(timedelta(minutes=5), aggregates=["avg"]).key != spec.key
+
+
+@pytest.mark.parametrize(
+    "step, fields, aggregates",
+    [
+        (timedelta(minutes=5), None, ["median"]),
+        (timedelta(minutes=5), None, ["p100"]),
+        (timedelta(minutes=5), ["humidity"], None),
+        (None, None, ["max"]),
+    ],
+)
+def test_invalid_specs_are_rejected(step, fields, aggregates):
+    """Test unknown fields/aggregates and aggregates without an interval raise."""
+    # Act & Assert
+    with pytest.raises(ValueError):
+        SeriesSpec(step, fields, aggregates)
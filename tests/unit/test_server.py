@@ -0,0 +1,23 @@
+"""Unit tests for the server worker count."""
+from unittest.mock import patch
+
+from app import server
+
+
+def test_worker_count_follows_cgroup_quota(tmp_path):
+    """Test workers default to the CPU quota and an explicit count wins."""
+    # Arrange
+    cpu_max = tmp_path / "cpu.max"
+    cpu_max.write_text("150000 100000\n")
+
+    # Act
+    with (
+        patch.object(server, "CGROUP_CPU_MAX", cpu_max),
+        patch.object(server.os, "sched_getaffinity", lambda _: {0, 1, 2, 3}),
+    ):
+        automatic = server.worker_count(0)
+        configured = server.worker_count(6)
+
+    # Assert
+    assert automatic == 2
+    assert configured == 6
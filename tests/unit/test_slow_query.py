@@ -0,0 +1,54 @@
+"""Unit tests for the slow query log."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import slow_query
+
+
+def test_only_queries_over_threshold_are_logged():
+    """Test queries are logged with their SQL on one line, duration and rows once they reach the threshold."""
+    # Arrange
+    sql = "SELECT speed\nFROM machine_sensor_data\nWHERE machine_id = $machine_id"
+
+    # Act
+    with patch.object(slow_query.logger, "warning") as warning:
+        fast = slow_query.log_slow_query("influx", sql, {"machine_id": "1"}, 0.2, 10, threshold=500)
+        slow = slow_query.log_slow_query("influx", sql, {"machine_id": "1"}, 0.75, 10, threshold=500)
+        disabled = slow_query.log_slow_query("influx", sql, {"machine_id": "1"}, 9.0, 10, threshold=0)
+
+    # Assert
+    assert (fast, slow, disabled) == (False, True, False)
+    warning.assert_called_once()
+    _, source, ms, rows, statement, parameters = warning.call_args.args
+    assert (source, round(ms), rows) == ("influx", 750, 10)
+    assert statement == "SELECT speed FROM machine_sensor_data WHERE machine_id = $machine_id"
+    assert parameters == {"machine_id": "1"}
+
+
+def test_failed_statements_leave_no_timing_behind():
+    """Test a statement that fails keeps nothing on the connection and later ones are still timed."""
+    # Arrange
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    slow_query.watch_engine(engine)
+
+    async def run():
+        async with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                await conn.execute(text("SELECT * FROM missing"))
+            await conn.execute(text("SELECT 1"))
+            info = dict(conn.sync_connection.info)
+        await engine.dispose()
+        return info
+
+    # Act
+    with patch.object(slow_query, "log_slow_query") as logged:
+        info = asyncio.run(run())
+
+    # Assert
+    assert "query_start" not in info
+    assert logged.call_args.args[1] == "SELECT 1"
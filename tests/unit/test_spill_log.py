@@ -0,0 +1,105 @@
+"""Unit tests for SpillLog."""
+from app.db.spill_log import SpillLog
+
+
+def replay(log):
+    """Consume every batch in the log."""
+    batches = []
+    while (record := log.peek()) is not None:
+        lines, cursor = record
+        batches.append(lines)
+        log.commit(cursor)
+    return batches
+
+
+def test_batches_replay_in_order_across_segments(tmp_path):
+    """Test batches come back oldest first and replayed segments are removed."""
+    # Arrange
+    log = SpillLog(str(tmp_path), segment_size=32, max_bytes=1 << 20)
+    log.open()
+    batches = [[f"m,machine_id={i} speed={i}"] for i in range(5)]
+
+    # Act
+    for batch in batches:
+        log.append(batch)
+    log.sync()
+    segments = log.stats.segments
+    replayed = replay(log)
+
+    # Assert
+    assert segments == 5
+    assert replayed == batches
+    assert log.empty and log.stats.segments == 0
+    assert not list(tmp_path.glob("slot-0/*.log"))
+
+
+def test_reopen_resumes_after_cursor_and_drops_torn_tail(tmp_path):
+    """Test a restarted log skips replayed batches and cuts off a half-written record."""
+    # Arrange
+    log = SpillLog(str(tmp_path), segment_size=1 << 20, max_bytes=1 << 20)
+    log.open()
+    for name in ("a", "b", "c"):
+        log.append([name])
+    lines, cursor = log.peek()
+    log.commit(cursor)
+    log.close()
+    segment = next(tmp_path.glob("slot-0/*.log"))
+    with segment.open("ab") as f:
+        f.write(b"\x10\x00\x00\x00torn")
+
+    # Act
+    reopened = SpillLog(str(tmp_path), segment_size=1 << 20, max_bytes=1 << 20)
+    reopened.open()
+
+    # Assert
+    assert lines == ["a"]
+    assert replay(reopened) == [["b"], ["c"]]
+
+
+def test_full_log_drops_batches(tmp_path):
+    """Test appends beyond max_bytes are refused and counted."""
+    # Arrange
+    log = SpillLog(str(tmp_path), segment_size=1 << 20, max_bytes=40)
+    log.open()
+
+    # Act
+    results = [log.append(["x" * 20]) for _ in range(3)]
+
+    # Assert
+    assert results == [True, False, False]
+    assert log.stats.dropped_batches == 2
+
+
+def test_append_only_buffers_until_sync(tmp_path):
+    """Test appends stay off the disk until sync writes them out."""
+    # Arrange
+    log = SpillLog(str(tmp_path), segment_size=1 << 20, max_bytes=1 << 20)
+    log.open()
+
+    # Act
+    log.append(["a"])
+    buffered = list(tmp_path.glob("slot-0/*.log"))
+    log.sync()
+
+    # Assert
+    assert buffered == []
+    assert not log.empty
+    assert next(tmp_path.glob("slot-0/*.log")).read_bytes().endswith(b"a")
+
+
+def test_each_log_claims_its_own_slot(tmp_path):
+    """Test two open logs on one directory never share a slot."""
+    # Arrange
+    first = SpillLog(str(tmp_path))
+    second = SpillLog(str(tmp_path))
+
+    # Act
+    first.open()
+    second.open()
+    first.append(["a"])
+    second.append(["b"])
+
+    # Assert
+    assert replay(first) == [["a"]]
+    assert replay(second) == [["b"]]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["slot-0", "slot-1"]
@@ -0,0 +1,117 @@
+"""Unit tests for TelemetryService."""
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from app.modules.ingest.schema.ingest_schema import WriteStatus
+from app.modules.ingest.service import telemetry_service
+from app.modules.ingest.service.dedup import Deduplicator
+from app.modules.ingest.service.telemetry_service import TelemetryService, parse_topic
+from app.modules.machine.service.machine_registry import MachineRegistry
+
+
+def warm_registry(*machine_ids: int) -> MachineRegistry:
+    """Build a registry that already knows the given machines."""
+    registry = MachineRegistry()
+    registry.warm(machine_ids)
+    return registry
+
+
+def test_parse_topic():
+    """Test machine id and format extraction from the topic."""
+    assert parse_topic("/factory/A/machine/42/telemetry") == (42, None)
+    assert parse_topic("/factory/A/machine/42/telemetry/msgpack") == (42, "msgpack")
+    assert parse_topic("/factory/A/machine/42/telemetry/xml") is None
+    assert parse_topic("/factory/A/machine/abc/telemetry") is None
+    assert parse_topic("/factory/B/machine/42/telemetry") is None
+
+
+def test_handle_message_enqueues_points():
+    """Test a valid message is encoded and submitted to the writer."""
+    # Arrange
+    writer = Mock()
+    writer.submit.return_value = WriteStatus.accepted
+    payload = json.dumps({"timestamp": "2025-01-10T00:00:00Z", "temperature": 25.5, "speed": 3}).encode()
+
+    # Act
+    service = TelemetryService(writer=writer, registry=warm_registry(7))
+    result = asyncio.run(service.handle_message("/factory/A/machine/7/telemetry", payload))
+
+    # Assert
+    assert result is True
+    writer.submit.assert_called_once_with(
+        ["machine_sensor_data,machine_id=7 temperature=25.5,speed=3 1736467200000000000"]
+    )
+
+
+def test_handle_message_rejects_invalid_payload():
+    """Test invalid payloads are dropped before reaching the writer."""
+    # Arrange
+    writer = Mock()
+
+    # Act
+    service = TelemetryService(writer=writer, registry=warm_registry(7))
+    not_json = asyncio.run(service.handle_message("/factory/A/machine/7/telemetry", b"not-json"))
+    no_timestamp = asyncio.run(service.handle_message("/factory/A/machine/7/telemetry", b'{"temperature": 1}'))
+
+    # Assert
+    assert not_json is False
+    assert no_timestamp is False
+    writer.submit.assert_not_called()
+
+
+def test_handle_message_drops_unknown_machine():
+    """Test telemetry for a machine known to be missing is dropped."""
+    # Arrange
+    writer = Mock()
+    registry = warm_registry()
+    registry.add_missing(8)
+    payload = json.dumps({"timestamp": "2025-01-10T00:00:00Z", "temperature": 25.5}).encode()
+
+    # Act
+    service = TelemetryService(writer=writer, registry=registry)
+    result = asyncio.run(service.handle_message("/factory/A/machine/8/telemetry", payload))
+
+    # Assert
+    assert result is False
+    writer.submit.assert_not_called()
+
+
+def test_stale_registry_rechecks_machine_cached_as_missing():
+    """Test a machine cached as missing is looked up again through the service once the registry is stale."""
+    # Arrange
+    writer = Mock()
+    writer.submit.return_value = WriteStatus.accepted
+    registry = MachineRegistry(ttl=0)
+    registry.warm([])
+    registry.add_missing(8)
+    machines = MagicMock(machine_exists=AsyncMock(return_value=True))
+    payload = json.dumps({"timestamp": "2025-01-10T00:00:00Z", "temperature": 25.5}).encode()
+
+    # Act
+    with (
+        patch.object(telemetry_service, "SessionLocal", MagicMock()),
+        patch.object(telemetry_service, "MachineService", return_value=machines),
+    ):
+        service = TelemetryService(writer=writer, registry=registry)
+        result = asyncio.run(service.handle_message("/factory/A/machine/8/telemetry", payload))
+
+    # Assert
+    assert result is True
+    machines.machine_exists.assert_awaited_once_with(8)
+
+
+def test_redelivered_message_is_not_written_twice():
+    """Test a QoS 1 redelivery of the same reading is acknowledged without a second write."""
+    # Arrange
+    writer = Mock()
+    writer.submit.return_value = WriteStatus.accepted
+    payload = json.dumps({"timestamp": "2025-01-10T00:00:00Z", "temperature": 25.5}).encode()
+    service = TelemetryService(writer=writer, registry=warm_registry(7), dedup=Deduplicator(window=8))
+
+    # Act
+    results = [asyncio.run(service.handle_message("/factory/A/machine/7/telemetry", payload)) for _ in range(2)]
+
+    # Assert
+    assert results == [True, True]
+    writer.submit.assert_called_once()